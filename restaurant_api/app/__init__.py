@@ -1,9 +1,7 @@
-import logging
-from flask import request
+from flask import jsonify
 
 from flask import Flask
 from flask_jwt_extended import JWTManager
-from flask_mysqldb import MySQL
 from app.routes.tables import tables_bp
 from app.services.auth_service import auth_bp
 from app.routes.menu import menu_bp
@@ -14,14 +12,31 @@ from app.routes.payments import payments_bp
 from app.routes.order_item import order_items_bp
 from app.routes.order import orders_bp
 from app.routes.analytics import analytics_bp
+from app.routes.system import system_bp
+from app.routes.metrics import metrics_bp
 
-from app.models.db import mysql
+from app.models.db import db
+from app.models.pool import PoolTimeout
+from app.services.broadcast import broadcast
+from app.services.cache import entity_cache
+from app.services.menu_snapshot import menu_snapshot
+from app.services.kitchen_feed import kitchen_feed
+from app.services.table_registry import table_registry
+from app.services.availability import availability
+from app.services.hashing import password_hasher, HashPoolBusy
+from app.services.json_provider import JSONProvider
+from app.services.metrics import metrics
+from app.services.slow_queries import slow_queries, slow_queries_cli
+from app.services.rollups import rollups_cli
+from app.services.archive import archive_cli
+from app.migrations.migrate import migrations
 
 from dotenv import load_dotenv
+from datetime import timedelta
 import os
 # app/_init_.py
 
-def create_app():
+def create_app(test_config=None):
     app = Flask(__name__)
 
     # Load environment variables
@@ -29,15 +44,124 @@ def create_app():
 
     app.config['SECRET_KEY'] = os.getenv('SECRET_KEY')
     app.config['JWT_SECRET_KEY'] = os.getenv('SECRET_KEY')
-    app.config['MYSQL_HOST'] = 'localhost'
-    app.config['MYSQL_USER'] = 'root'
+
+    # Token lifetimes: terminals renew access tokens via /api/auth/refresh
+    app.config['JWT_ACCESS_TOKEN_EXPIRES'] = timedelta(minutes=int(os.getenv('JWT_ACCESS_TOKEN_MINUTES', 15)))
+    app.config['JWT_REFRESH_TOKEN_EXPIRES'] = timedelta(days=int(os.getenv('JWT_REFRESH_TOKEN_DAYS', 30)))
+
+    # Password hashing pool: hashes running at once, waiting, seconds to wait for one
+    app.config['PASSWORD_HASH_WORKERS'] = int(os.getenv('PASSWORD_HASH_WORKERS', os.cpu_count() or 1))
+    app.config['PASSWORD_HASH_QUEUE'] = int(os.getenv('PASSWORD_HASH_QUEUE', 32))
+    app.config['PASSWORD_HASH_TIMEOUT'] = float(os.getenv('PASSWORD_HASH_TIMEOUT', 5))
+
+    # Database engine: "mysql" (default) or "sqlite" for hermetic runs
+    app.config['DB_ENGINE'] = os.getenv('DB_ENGINE', 'mysql')
+    app.config['SQLITE_PATH'] = os.getenv('SQLITE_PATH', ':memory:')
+    app.config['MYSQL_HOST'] = os.getenv('MYSQL_HOST', 'localhost')
+    app.config['MYSQL_PORT'] = int(os.getenv('MYSQL_PORT', 3306))
+    app.config['MYSQL_USER'] = os.getenv('MYSQL_USER', 'root')
     app.config['MYSQL_PASSWORD'] = os.getenv('MYSQL_PASSWORD')
-    app.config['MYSQL_DB'] = 'restaurant_db'
+    app.config['MYSQL_DB'] = os.getenv('MYSQL_DB', 'restaurant_db')
+
+    # Connection pool, sized per worker process
+    app.config['MYSQL_POOL_MIN_SIZE'] = int(os.getenv('MYSQL_POOL_MIN_SIZE', 1))
+    app.config['MYSQL_POOL_MAX_SIZE'] = int(os.getenv('MYSQL_POOL_MAX_SIZE', 10))
+    app.config['MYSQL_POOL_IDLE_TIMEOUT'] = float(os.getenv('MYSQL_POOL_IDLE_TIMEOUT', 300))
+    app.config['MYSQL_POOL_CHECKOUT_TIMEOUT'] = float(os.getenv('MYSQL_POOL_CHECKOUT_TIMEOUT', 5))
+
+    # ASGI mode (asgi.py): async pool for the plan routes and threads for the
+    # routes served through WSGI, both per worker process
+    app.config['ASYNC_POOL_MIN_SIZE'] = int(os.getenv('ASYNC_POOL_MIN_SIZE', 1))
+    app.config['ASYNC_POOL_MAX_SIZE'] = int(os.getenv('ASYNC_POOL_MAX_SIZE', 20))
+    app.config['ASGI_WSGI_THREADS'] = int(os.getenv('ASGI_WSGI_THREADS', 32))
+
+    # Keyset pagination for list endpoints
+    app.config['PAGE_SIZE_DEFAULT'] = int(os.getenv('PAGE_SIZE_DEFAULT', 50))
+    app.config['PAGE_SIZE_MAX'] = int(os.getenv('PAGE_SIZE_MAX', 500))
+
+    # Rows per chunk for streaming exports
+    app.config['EXPORT_CHUNK_ROWS'] = int(os.getenv('EXPORT_CHUNK_ROWS', 1000))
+
+    # Most rows accepted by one /bulk request
+    app.config['BULK_MAX_ROWS'] = int(os.getenv('BULK_MAX_ROWS', 500))
+
+    # Get-by-id cache and the channel that carries its invalidations
+    app.config['ENTITY_CACHE_SIZE'] = int(os.getenv('ENTITY_CACHE_SIZE', 10000))
+    app.config['ENTITY_CACHE_TTL'] = float(os.getenv('ENTITY_CACHE_TTL', 30))
+    app.config['BROADCAST_BACKEND'] = os.getenv('BROADCAST_BACKEND', 'local')
+
+    # Seconds a prebuilt GET /api/menu response is reused
+    app.config['MENU_SNAPSHOT_TTL'] = float(os.getenv('MENU_SNAPSHOT_TTL', 30))
+
+    # Seconds before a worker rereads its copy of Tables
+    app.config['TABLE_REGISTRY_TTL'] = float(os.getenv('TABLE_REGISTRY_TTL', 30))
+
+    # Kitchen display stream: seconds between keep-alives, changes kept for reconnects
+    app.config['KITCHEN_FEED_HEARTBEAT'] = float(os.getenv('KITCHEN_FEED_HEARTBEAT', 15))
+    app.config['KITCHEN_FEED_BACKLOG'] = int(os.getenv('KITCHEN_FEED_BACKLOG', 1000))
+
+    # Table availability index: assumed length of a reservation (minutes), dates kept in memory,
+    # seconds before a date is read again
+    app.config['RESERVATION_DURATION'] = int(os.getenv('RESERVATION_DURATION', 120))
+    app.config['AVAILABILITY_INDEX_DAYS'] = int(os.getenv('AVAILABILITY_INDEX_DAYS', 60))
+    app.config['AVAILABILITY_INDEX_TTL'] = float(os.getenv('AVAILABILITY_INDEX_TTL', 30))
+
+    # JSON encoder for every response: "auto" (orjson when installed) or "json"
+    app.config['JSON_BACKEND'] = os.getenv('JSON_BACKEND', 'auto')
+
+    # Archival ("flask --app run archive run"): age cutoff, rows per transaction, seconds between chunks
+    app.config['ARCHIVE_AFTER_DAYS'] = int(os.getenv('ARCHIVE_AFTER_DAYS', 365))
+    app.config['ARCHIVE_CHUNK_SIZE'] = int(os.getenv('ARCHIVE_CHUNK_SIZE', 500))
+    app.config['ARCHIVE_PAUSE'] = float(os.getenv('ARCHIVE_PAUSE', 0.5))
+
+    # GET /metrics (Prometheus): on/off, directory shared by the workers of
+    # one server, seconds between a worker's writes, optional bearer token
+    app.config['METRICS_ENABLED'] = os.getenv('METRICS_ENABLED', '1') == '1'
+    app.config['METRICS_DIR'] = os.getenv('METRICS_DIR')
+    app.config['METRICS_FLUSH_INTERVAL'] = float(os.getenv('METRICS_FLUSH_INTERVAL', 1))
+    app.config['METRICS_TOKEN'] = os.getenv('METRICS_TOKEN')
+
+    # Slow-query log: statements over SLOW_QUERY_THRESHOLD seconds are logged,
+    # and the first of each kind gets an EXPLAIN saved in SLOW_QUERY_DIR
+    app.config['SLOW_QUERY_LOG'] = os.getenv('SLOW_QUERY_LOG', '1') == '1'
+    app.config['SLOW_QUERY_THRESHOLD'] = float(os.getenv('SLOW_QUERY_THRESHOLD', 0.5))
+    if os.getenv('SLOW_QUERY_DIR'):
+        app.config['SLOW_QUERY_DIR'] = os.getenv('SLOW_QUERY_DIR')
+
+    # Apply schema migrations at startup (default: SQLite only; MySQL runs
+    # "flask --app run migrations upgrade")
+    if os.getenv('DB_AUTO_MIGRATE') is not None:
+        app.config['DB_AUTO_MIGRATE'] = os.getenv('DB_AUTO_MIGRATE') == '1'
+
+    # Overrides from the caller (tests, benchmarks, profiling)
+    if test_config:
+        app.config.update(test_config)
+
+    # Encodes Decimal, dates, TIME columns and rows for jsonify
+    app.json = JSONProvider(app)
 
     # Initialize extensions
-    mysql.init_app(app)
+    db.init_app(app)
+    metrics.init_app(app)
+    slow_queries.init_app(app)
+    migrations.init_app(app)
+    broadcast.init_app(app)
+    entity_cache.init_app(app)
+    menu_snapshot.init_app(app)
+    kitchen_feed.init_app(app)
+    table_registry.init_app(app)
+    availability.init_app(app)
+    password_hasher.init_app(app)
     jwt = JWTManager(app)
 
+    @app.errorhandler(PoolTimeout)
+    def handle_pool_timeout(e):
+        return jsonify({"msg": f"Database busy: {str(e)}"}), 503
+
+    @app.errorhandler(HashPoolBusy)
+    def handle_hash_pool_busy(e):
+        return jsonify({"msg": str(e)}), 503, {"Retry-After": "1"}
+
     # Register blueprints
     app.register_blueprint(tables_bp, url_prefix='/api/tables')
     app.register_blueprint(auth_bp, url_prefix='/api/auth')
@@ -49,5 +173,14 @@ def create_app():
     app.register_blueprint(order_items_bp, url_prefix='/api/order_items')
     app.register_blueprint(orders_bp, url_prefix='/api/orders')
     app.register_blueprint(analytics_bp, url_prefix='/api/analytics')
+    app.register_blueprint(system_bp, url_prefix='/api/system')
+    app.register_blueprint(metrics_bp)
+
+    # CLI: flask --app run rollups rebuild, archive run|status, slow-queries
+    # list|show (migrations upgrade|status|check is registered by
+    # migrations.init_app)
+    app.cli.add_command(rollups_cli)
+    app.cli.add_command(archive_cli)
+    app.cli.add_command(slow_queries_cli)
 
     return app
\ No newline at end of file
@@ -0,0 +1,123 @@
+import sys
+from io import BytesIO
+from types import GeneratorType
+
+from a2wsgi import WSGIMiddleware
+from flask import g
+from flask.signals import request_started
+from werkzeug.exceptions import HTTPException
+
+from app import create_app
+from app.models.async_db import async_db
+
+# ASGI serving mode ("uvicorn asgi:app", see asgi.py next to run.py).
+# GET requests for plan views (@plan_view in app/models/plan.py: the order,
+# order item and reservation list / get-by-id routes and the analytics
+# routes) run on the event loop. The Flask request context is pushed around
+# the view, so jwt_required, argument checks, error handlers and jsonify are
+# the WSGI app's own and the responses are identical; only the statements
+# are awaited, through app.models.async_db.
+# Every other request (writes, exports, the kitchen stream, auth, the other
+# blueprints) goes to the same Flask app through a2wsgi, on a pool of
+# ASGI_WSGI_THREADS threads.
+
+
+def _environ(scope):
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', '').encode('utf-8').decode('latin-1'),
+        'PATH_INFO': scope['path'].encode('utf-8').decode('latin-1'),
+        'QUERY_STRING': scope['query_string'].decode('latin-1'),
+        'SERVER_PROTOCOL': f"HTTP/{scope['http_version']}",
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': BytesIO(),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+    server = scope.get('server') or ('localhost', 80)
+    environ['SERVER_NAME'], environ['SERVER_PORT'] = server[0], str(server[1])
+    if scope.get('client'):
+        environ['REMOTE_ADDR'], environ['REMOTE_PORT'] = scope['client'][0], str(scope['client'][1])
+
+    for name, value in scope['headers']:
+        name = name.decode('latin-1').upper().replace('-', '_')
+        if name not in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
+            name = f"HTTP_{name}"
+        value = value.decode('latin-1')
+        environ[name] = f"{environ[name]},{value}" if name in environ else value
+    return environ
+
+
+# True when the request routes to a plan view
+def _is_plan_request(flask_app, environ):
+    try:
+        endpoint, _ = flask_app.url_map.bind_to_environ(environ).match()
+    except HTTPException:
+        return False
+    return getattr(flask_app.view_functions.get(endpoint), 'plan_view', False)
+
+
+# Flask.full_dispatch_request with the plan awaited
+async def _dispatch(flask_app):
+    try:
+        request_started.send(flask_app)
+        rv = flask_app.preprocess_request()
+        if rv is None:
+            rv = flask_app.dispatch_request()
+            if isinstance(rv, GeneratorType):
+                rv = await async_db.run_plan(rv)
+    except Exception as e:
+        rv = flask_app.handle_user_exception(e)
+    return flask_app.finalize_request(rv)
+
+
+async def _serve_plan(flask_app, environ, send):
+    with flask_app.request_context(environ):
+        g.defer_plans = True
+        try:
+            response = await _dispatch(flask_app)
+        except Exception as e:
+            response = flask_app.handle_exception(e)
+        body = response.get_data()
+        headers = [(name.lower().encode('latin-1'), value.encode('latin-1')) for name, value in response.headers.items()]
+        status = response.status_code
+
+    await send({'type': 'http.response.start', 'status': status, 'headers': headers})
+    await send({'type': 'http.response.body', 'body': body})
+
+
+# The async pool is opened on the first query (the database may not be up
+# yet) and closed when the server shuts down
+async def _lifespan(engine, receive, send):
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            await engine.close()
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+def create_asgi_app(test_config=None):
+    flask_app = create_app(test_config)
+    async_db.init_app(flask_app)
+    engine = flask_app.extensions['async_db']
+    wsgi = WSGIMiddleware(flask_app, workers=flask_app.config['ASGI_WSGI_THREADS'])
+
+    async def app(scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await _lifespan(engine, receive, send)
+            return
+        if scope['type'] == 'http' and scope['method'] == 'GET':
+            environ = _environ(scope)
+            if _is_plan_request(flask_app, environ):
+                await _serve_plan(flask_app, environ, send)
+                return
+        await wsgi(scope, receive, send)
+
+    app.flask_app = flask_app
+    return app
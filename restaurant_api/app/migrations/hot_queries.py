@@ -0,0 +1,171 @@
+import re
+from collections import namedtuple
+
+from app.models.db import db
+
+# Queries the API runs on every request of a busy route, checked with
+# EXPLAIN by "flask --app run migrations check". A query fails the check when
+# the plan reads a whole table without an index it could have used, i.e. the
+# index it depends on is missing. Keep the SQL in step with the code it
+# stands for (named in the comment above each entry).
+#
+# `allow_scan` names tables (by alias, as the plan shows them) that the
+# query reads in full on purpose.
+
+HotQuery = namedtuple('HotQuery', ['name', 'sql', 'params', 'allow_scan'], defaults=((),))
+
+HOT_QUERIES = [
+    # auth_service.login / refresh
+    HotQuery('login', "SELECT * FROM users WHERE username = %s LIMIT 1", ('admin',)),
+    # GET /api/menu/<dish_name>
+    HotQuery('get_dish', "SELECT * FROM Menu WHERE dish_name = %s LIMIT 1", ('Soup',)),
+    # DELETE /api/tables/<id>: reservations still on the table
+    HotQuery('delete_table', "SELECT 1 FROM Reservations WHERE table_id = %s LIMIT 1", (1,)),
+    # POST /api/reservations: slot already taken
+    HotQuery(
+        'reservation_slot',
+        "SELECT 1 FROM Reservations WHERE table_id = %s AND reservation_date = %s AND reservation_time = %s",
+        (1, '2024-05-01', '19:30:00'),
+    ),
+    # availability index: one date's reservations
+    HotQuery(
+        'availability_day',
+        "SELECT reservation_id, table_id, reservation_time, status FROM Reservations WHERE reservation_date = %s",
+        ('2024-05-01',),
+    ),
+    # rollups.refresh_customer_spending
+    HotQuery(
+        'customer_spending_refresh',
+        """
+        SELECT r.customer_id, SUM(o.total_amount), COUNT(*), MAX(o.created_at)
+        FROM Reservations r
+        JOIN Orders o ON r.reservation_id = o.reservation_id
+        WHERE r.customer_id IN (%s, %s)
+        GROUP BY r.customer_id
+        """,
+        (1, 2),
+    ),
+    # rollups.sales_of_order (order delete)
+    HotQuery(
+        'sales_of_order',
+        """
+        SELECT DATE(oi.created_at), oi.dish_id, SUM(oi.quantity), SUM(oi.quantity * oi.unit_price), COUNT(*)
+        FROM Order_Items oi
+        JOIN Orders o ON o.order_id = oi.order_id
+        JOIN Reservations r ON r.reservation_id = o.reservation_id
+        WHERE oi.order_id = %s
+        GROUP BY DATE(oi.created_at), oi.dish_id
+        """,
+        (1,),
+    ),
+    # rollups.sales_of_reservation (reservation delete)
+    HotQuery(
+        'sales_of_reservation',
+        """
+        SELECT DATE(oi.created_at), oi.dish_id, SUM(oi.quantity), SUM(oi.quantity * oi.unit_price), COUNT(*)
+        FROM Order_Items oi
+        JOIN Orders o ON o.order_id = oi.order_id
+        JOIN Reservations r ON r.reservation_id = o.reservation_id
+        WHERE o.reservation_id = %s
+        GROUP BY DATE(oi.created_at), oi.dish_id
+        """,
+        (1,),
+    ),
+    # GET /api/analytics/pending_orders_details
+    HotQuery(
+        'pending_orders_details',
+        """
+        SELECT o.order_id, m.dish_name, oi.quantity
+        FROM Orders o
+        JOIN Order_Items oi ON o.order_id = oi.order_id
+        JOIN Menu m ON oi.dish_id = m.dish_id
+        WHERE o.order_status = 'Pending'
+        ORDER BY o.order_id
+        """,
+        (),
+    ),
+    # kitchen feed load
+    HotQuery(
+        'kitchen_feed',
+        """
+        SELECT o.order_id, o.reservation_id, o.order_status, o.created_at,
+               oi.order_item_id, oi.dish_id, m.dish_name, oi.quantity
+        FROM Orders o
+        LEFT JOIN Order_Items oi ON oi.order_id = o.order_id
+        LEFT JOIN Menu m ON m.dish_id = oi.dish_id
+        WHERE o.order_status IN (%s)
+        ORDER BY o.order_id, oi.order_item_id
+        """,
+        ('Pending',),
+    ),
+    # GET /api/analytics/popular_dishes?from=&to=
+    HotQuery(
+        'popular_dishes_window',
+        """
+        SELECT d.dish_id, m.dish_name, m.category, SUM(d.quantity) AS quantity
+        FROM Dish_Daily_Sales d
+        JOIN Menu m ON m.dish_id = d.dish_id
+        WHERE d.sales_date >= %s AND d.sales_date <= %s
+        GROUP BY d.dish_id, m.dish_name, m.category
+        ORDER BY quantity DESC, d.dish_id LIMIT %s
+        """,
+        ('2024-05-01', '2024-05-01', 10),
+    ),
+    # GET /api/orders?order_status=, /api/payments?order_id=, /api/order_items?dish_id=
+    HotQuery('orders_by_status', "SELECT * FROM Orders WHERE order_status = %s ORDER BY order_id LIMIT %s", ('Pending', 51)),
+    HotQuery('orders_of_reservation', "SELECT * FROM Orders WHERE reservation_id = %s", (1,)),
+    HotQuery('items_of_order', "SELECT * FROM Order_Items WHERE order_id = %s", (1,)),
+    HotQuery('items_of_dish', "SELECT * FROM Order_Items WHERE dish_id = %s", (1,)),
+    HotQuery('payments_of_order', "SELECT * FROM Payments WHERE order_id = %s", (1,)),
+]
+
+# SQLite: "SCAN t" (a table read in full), but not "SCAN t USING [COVERING] INDEX ..."
+_SQLITE_SCAN = re.compile(r"^SCAN (?:TABLE )?(\w+)(?: AS (\w+))?$")
+
+
+# EXPLAIN one statement with its parameters (also used by
+# app/services/slow_queries.py). Returns (plan lines, tables read in full).
+def explain_statement(sql, params=()):
+    cursor = db.cursor(dictionary=True)
+    try:
+        if db.dialect == 'sqlite':
+            cursor.execute("EXPLAIN QUERY PLAN " + sql, params)
+            plan = [row['detail'] for row in cursor.fetchall()]
+            scans = []
+            for detail in plan:
+                match = _SQLITE_SCAN.match(detail)
+                if match:
+                    scans.append(match.group(2) or match.group(1))
+        else:
+            cursor.execute("EXPLAIN " + sql, params)
+            rows = cursor.fetchall()
+            plan = [
+                f"{row['table']}: type={row['type']} possible_keys={row['possible_keys']} key={row['key']}"
+                for row in rows
+            ]
+            # type ALL with possible keys is the optimizer preferring a scan
+            # of a small table, not a missing index
+            scans = [row['table'] for row in rows if row['type'] == 'ALL' and not row['possible_keys']]
+    finally:
+        cursor.close()
+    return plan, scans
+
+
+def explain(query):
+    plan, scans = explain_statement(query.sql, query.params)
+    return plan, [table for table in scans if table not in query.allow_scan]
+
+
+# [(name, problem or None, plan)] for every hot query
+def check():
+    results = []
+    for query in HOT_QUERIES:
+        try:
+            plan, scans = explain(query)
+        except Exception as e:
+            # e.g. a column a pending migration adds
+            results.append((query.name, f"EXPLAIN failed: {e}", []))
+            continue
+        problem = f"full scan of {', '.join(scans)}" if scans else None
+        results.append((query.name, problem, plan))
+    return results
@@ -0,0 +1,141 @@
+import click
+from flask.cli import AppGroup, with_appcontext
+
+from app.models.db import db
+from app.migrations.versions import MIGRATIONS, AddColumn, CreateIndex, Sql
+from app.migrations import hot_queries
+
+# Applies app/migrations/versions.py to the current database.
+# MySQL databases are upgraded explicitly ("flask --app run migrations
+# upgrade"), since several workers starting at once must not race on DDL;
+# the embedded SQLite engine upgrades itself at startup (DB_AUTO_MIGRATE).
+
+HISTORY_TABLE = """
+CREATE TABLE IF NOT EXISTS schema_migrations (
+    version INT PRIMARY KEY,
+    description VARCHAR(255) NOT NULL,
+    applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+)
+"""
+
+INDEX_EXISTS = {
+    'mysql': "SELECT 1 FROM information_schema.statistics "
+             "WHERE table_schema = DATABASE() AND table_name = %s AND index_name = %s LIMIT 1",
+    'sqlite': "SELECT 1 FROM sqlite_master WHERE type = 'index' AND tbl_name = %s AND name = %s",
+}
+
+COLUMN_EXISTS = {
+    'mysql': "SELECT 1 FROM information_schema.columns "
+             "WHERE table_schema = DATABASE() AND table_name = %s AND column_name = %s LIMIT 1",
+    'sqlite': "SELECT 1 FROM pragma_table_info(%s) WHERE name = %s",
+}
+
+
+# {version: applied_at} of the migrations already applied
+def applied_versions():
+    cursor = db.cursor()
+    try:
+        cursor.execute(HISTORY_TABLE)
+        cursor.execute("SELECT version, applied_at FROM schema_migrations")
+        return dict(cursor.fetchall())
+    finally:
+        cursor.close()
+
+
+def _apply(cursor, step):
+    dialect = db.dialect
+    if isinstance(step, Sql):
+        for statement in getattr(step, dialect):
+            cursor.execute(statement)
+    elif isinstance(step, CreateIndex):
+        cursor.execute(INDEX_EXISTS[dialect], (step.table, step.name))
+        if cursor.fetchone() is None:
+            cursor.execute(f"CREATE INDEX {step.name} ON {step.table} ({', '.join(step.columns)})")
+    elif isinstance(step, AddColumn):
+        definition = getattr(step, dialect)
+        if definition is None:
+            return
+        cursor.execute(COLUMN_EXISTS[dialect], (step.table, step.column))
+        if cursor.fetchone() is None:
+            cursor.execute(f"ALTER TABLE {step.table} ADD COLUMN {step.column} {definition}")
+    else:
+        raise TypeError(f"Unknown migration step {step!r}")
+
+
+# Apply every migration not applied yet (up to `target`), each committed
+# with its schema_migrations row. Returns the versions applied.
+def upgrade(target=None):
+    done = applied_versions()
+    applied = []
+    for migration in MIGRATIONS:
+        if migration.version in done or (target is not None and migration.version > target):
+            continue
+        cursor = db.cursor()
+        try:
+            for step in migration.steps:
+                _apply(cursor, step)
+            cursor.execute(
+                "INSERT INTO schema_migrations (version, description) VALUES (%s, %s)",
+                (migration.version, migration.description),
+            )
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            cursor.close()
+        applied.append(migration.version)
+    return applied
+
+
+class Migrations:
+    def init_app(self, app):
+        app.config.setdefault('DB_AUTO_MIGRATE', app.config['DB_ENGINE'] == 'sqlite')
+        app.cli.add_command(migrations_cli)
+        if app.config['DB_AUTO_MIGRATE']:
+            with app.app_context():
+                upgrade()
+
+
+migrations = Migrations()
+
+
+# -------------------- CLI --------------------
+
+migrations_cli = AppGroup('migrations', help='Create and upgrade the database schema.')
+
+
+@migrations_cli.command('upgrade', help='Apply the migrations this database has not seen yet.')
+@click.option('--to', 'target', type=int, default=None, help='Stop after this version.')
+@with_appcontext
+def upgrade_command(target):
+    applied = upgrade(target)
+    for version in applied:
+        click.echo(f"Applied {version}")
+    if not applied:
+        click.echo("Already up to date")
+
+
+@migrations_cli.command('status', help='List the migrations and whether each is applied.')
+@with_appcontext
+def status_command():
+    done = applied_versions()
+    for migration in MIGRATIONS:
+        state = f"applied {done[migration.version]}" if migration.version in done else "pending"
+        click.echo(f"{migration.version:>4}  {migration.description}  ({state})")
+
+
+@migrations_cli.command('check', help='EXPLAIN the hot queries; fail if any scans a whole table.')
+@with_appcontext
+def check_command():
+    failures = 0
+    for name, problem, plan in hot_queries.check():
+        if problem:
+            failures += 1
+            click.echo(f"FAIL  {name}: {problem}")
+            for line in plan:
+                click.echo(f"        {line}")
+        else:
+            click.echo(f"ok    {name}")
+    if failures:
+        raise click.ClickException(f"{failures} hot queries failed the check")
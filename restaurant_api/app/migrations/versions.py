@@ -0,0 +1,380 @@
+from collections import namedtuple
+
+# The database schema, as an ordered list of versioned migrations.
+# app/migrations/migrate.py applies the ones a database has not seen yet and
+# records each in schema_migrations. Every step is safe to run again (tables
+# are created IF NOT EXISTS, indexes and columns only when missing), so a
+# version that stopped halfway (MySQL commits each DDL statement on its own)
+# is simply rerun. Add new versions at the end; never edit an applied one.
+
+# Raw statements per dialect
+Sql = namedtuple('Sql', ['mysql', 'sqlite'])
+# Secondary index, created when no index of that name exists on the table
+CreateIndex = namedtuple('CreateIndex', ['name', 'table', 'columns'])
+# Column added to an existing table when missing; None skips a dialect
+AddColumn = namedtuple('AddColumn', ['table', 'column', 'mysql', 'sqlite'])
+
+Migration = namedtuple('Migration', ['version', 'description', 'steps'])
+
+
+MYSQL_TABLES = [
+    """
+    CREATE TABLE IF NOT EXISTS users (
+        id INT AUTO_INCREMENT PRIMARY KEY,
+        username VARCHAR(255) NOT NULL,
+        password VARCHAR(255) NOT NULL,
+        role VARCHAR(50) DEFAULT 'user',  -- 'admin' or 'user'
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    ) ENGINE=InnoDB
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS Tables (
+        table_id INT AUTO_INCREMENT PRIMARY KEY,
+        capacity INT NOT NULL CHECK (capacity > 0),
+        location VARCHAR(50) NOT NULL
+    ) ENGINE=InnoDB
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS Customers (
+        customer_id INT AUTO_INCREMENT PRIMARY KEY,
+        name VARCHAR(100) NOT NULL,
+        contact_details VARCHAR(100) UNIQUE NOT NULL
+    ) ENGINE=InnoDB
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS Reservations (
+        reservation_id INT AUTO_INCREMENT PRIMARY KEY,
+        customer_id INT NOT NULL,
+        table_id INT NOT NULL,
+        reservation_date DATE NOT NULL,
+        reservation_time TIME NOT NULL,
+        person_count INT NOT NULL CHECK (person_count > 0),
+        status ENUM('Pending', 'Confirmed', 'Completed', 'Cancelled') DEFAULT 'Pending',
+        -- A table can only be reserved once for the same time slot
+        CONSTRAINT unique_table_time UNIQUE (table_id, reservation_date, reservation_time),
+        FOREIGN KEY (customer_id) REFERENCES Customers(customer_id) ON DELETE CASCADE,
+        FOREIGN KEY (table_id) REFERENCES Tables(table_id) ON DELETE CASCADE
+    ) ENGINE=InnoDB
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS Menu (
+        dish_id INT AUTO_INCREMENT PRIMARY KEY,
+        dish_name VARCHAR(100) NOT NULL,
+        category ENUM('Appetizer', 'Main Course', 'Dessert', 'Beverage') NOT NULL,
+        price DECIMAL(10, 2) NOT NULL CHECK (price >= 0)
+    ) ENGINE=InnoDB
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS Orders (
+        order_id INT AUTO_INCREMENT PRIMARY KEY,
+        reservation_id INT NOT NULL,
+        total_amount DECIMAL(10, 2) NOT NULL CHECK (total_amount >= 0),
+        order_status ENUM('Pending', 'In Progress', 'Completed', 'Cancelled') DEFAULT 'Pending',
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (reservation_id) REFERENCES Reservations(reservation_id) ON DELETE CASCADE
+    ) ENGINE=InnoDB
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS Order_Items (
+        order_item_id INT AUTO_INCREMENT PRIMARY KEY,
+        order_id INT NOT NULL,
+        dish_id INT NOT NULL,
+        quantity INT NOT NULL CHECK (quantity > 0),
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        -- Unique dishes in an order
+        CONSTRAINT unique_order_menu UNIQUE (order_id, dish_id),
+        FOREIGN KEY (order_id) REFERENCES Orders(order_id) ON DELETE CASCADE,
+        FOREIGN KEY (dish_id) REFERENCES Menu(dish_id) ON DELETE CASCADE
+    ) ENGINE=InnoDB
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS Staff (
+        staff_id INT AUTO_INCREMENT PRIMARY KEY,
+        name VARCHAR(100) NOT NULL,
+        role ENUM('Waiter', 'Chef', 'Manager', 'Host') NOT NULL,
+        shift ENUM('Morning', 'Afternoon', 'Evening') NOT NULL
+    ) ENGINE=InnoDB
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS Payments (
+        payment_id INT AUTO_INCREMENT PRIMARY KEY,
+        order_id INT NOT NULL,
+        amount_paid DECIMAL(10, 2) NOT NULL CHECK (amount_paid >= 0),
+        payment_method ENUM('Cash', 'Credit Card', 'Mobile Payment') NOT NULL,
+        payment_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (order_id) REFERENCES Orders(order_id) ON DELETE CASCADE
+    ) ENGINE=InnoDB
+    """,
+    # Rollup of Orders per customer, kept up to date by the order routes
+    """
+    CREATE TABLE IF NOT EXISTS Customer_Spending (
+        customer_id INT PRIMARY KEY,
+        total_spent DECIMAL(12, 2) NOT NULL DEFAULT 0,
+        order_count INT NOT NULL DEFAULT 0,
+        last_order_at TIMESTAMP NULL,
+        FOREIGN KEY (customer_id) REFERENCES Customers(customer_id) ON DELETE CASCADE
+    ) ENGINE=InnoDB
+    """,
+    # Per dish and day rollup of Order_Items, kept up to date by the order item routes
+    """
+    CREATE TABLE IF NOT EXISTS Dish_Daily_Sales (
+        sales_date DATE NOT NULL,
+        dish_id INT NOT NULL,
+        quantity INT NOT NULL DEFAULT 0,
+        revenue DECIMAL(12, 2) NOT NULL DEFAULT 0,
+        order_lines INT NOT NULL DEFAULT 0,
+        PRIMARY KEY (sales_date, dish_id),
+        FOREIGN KEY (dish_id) REFERENCES Menu(dish_id) ON DELETE CASCADE
+    ) ENGINE=InnoDB
+    """,
+]
+
+# SQLite translation of MYSQL_TABLES, used by the embedded engine.
+# ENUM columns become CHECK constraints; everything else maps one to one.
+SQLITE_TABLES = [
+    """
+    CREATE TABLE IF NOT EXISTS users (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        username VARCHAR(255) NOT NULL,
+        password VARCHAR(255) NOT NULL,
+        role VARCHAR(50) DEFAULT 'user',
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS Tables (
+        table_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        capacity INT NOT NULL CHECK (capacity > 0),
+        location VARCHAR(50) NOT NULL
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS Customers (
+        customer_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name VARCHAR(100) NOT NULL,
+        contact_details VARCHAR(100) UNIQUE NOT NULL
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS Reservations (
+        reservation_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        customer_id INT NOT NULL,
+        table_id INT NOT NULL,
+        reservation_date DATE NOT NULL,
+        reservation_time TIME NOT NULL,
+        person_count INT NOT NULL CHECK (person_count > 0),
+        status VARCHAR(20) DEFAULT 'Pending' CHECK (status IN ('Pending', 'Confirmed', 'Completed', 'Cancelled')),
+        FOREIGN KEY (customer_id) REFERENCES Customers(customer_id) ON DELETE CASCADE,
+        FOREIGN KEY (table_id) REFERENCES Tables(table_id) ON DELETE CASCADE,
+        CONSTRAINT unique_table_time UNIQUE (table_id, reservation_date, reservation_time)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS Menu (
+        dish_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        dish_name VARCHAR(100) NOT NULL,
+        category VARCHAR(20) NOT NULL CHECK (category IN ('Appetizer', 'Main Course', 'Dessert', 'Beverage')),
+        price DECIMAL(10, 2) NOT NULL CHECK (price >= 0)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS Orders (
+        order_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        reservation_id INT NOT NULL,
+        total_amount DECIMAL(10, 2) NOT NULL CHECK (total_amount >= 0),
+        order_status VARCHAR(20) DEFAULT 'Pending' CHECK (order_status IN ('Pending', 'In Progress', 'Completed', 'Cancelled')),
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (reservation_id) REFERENCES Reservations(reservation_id) ON DELETE CASCADE
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS Order_Items (
+        order_item_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        order_id INT NOT NULL,
+        dish_id INT NOT NULL,
+        quantity INT NOT NULL CHECK (quantity > 0),
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (order_id) REFERENCES Orders(order_id) ON DELETE CASCADE,
+        FOREIGN KEY (dish_id) REFERENCES Menu(dish_id) ON DELETE CASCADE,
+        CONSTRAINT unique_order_menu UNIQUE (order_id, dish_id)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS Staff (
+        staff_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name VARCHAR(100) NOT NULL,
+        role VARCHAR(20) NOT NULL CHECK (role IN ('Waiter', 'Chef', 'Manager', 'Host')),
+        shift VARCHAR(20) NOT NULL CHECK (shift IN ('Morning', 'Afternoon', 'Evening'))
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS Payments (
+        payment_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        order_id INT NOT NULL,
+        amount_paid DECIMAL(10, 2) NOT NULL CHECK (amount_paid >= 0),
+        payment_method VARCHAR(20) NOT NULL CHECK (payment_method IN ('Cash', 'Credit Card', 'Mobile Payment')),
+        payment_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (order_id) REFERENCES Orders(order_id) ON DELETE CASCADE
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS Customer_Spending (
+        customer_id INTEGER PRIMARY KEY,
+        total_spent DECIMAL(12, 2) NOT NULL DEFAULT 0,
+        order_count INT NOT NULL DEFAULT 0,
+        last_order_at TIMESTAMP NULL,
+        FOREIGN KEY (customer_id) REFERENCES Customers(customer_id) ON DELETE CASCADE
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS Dish_Daily_Sales (
+        sales_date DATE NOT NULL,
+        dish_id INT NOT NULL,
+        quantity INT NOT NULL DEFAULT 0,
+        revenue DECIMAL(12, 2) NOT NULL DEFAULT 0,
+        order_lines INT NOT NULL DEFAULT 0,
+        PRIMARY KEY (sales_date, dish_id),
+        FOREIGN KEY (dish_id) REFERENCES Menu(dish_id) ON DELETE CASCADE
+    )
+    """,
+]
+
+
+# Where app/services/archive.py moves finished orders (with their items and
+# payments) and past reservations. Rows keep their ids; there are no foreign
+# keys back to the live tables, which the archived rows have left. The same
+# DDL runs on both dialects.
+ARCHIVE_TABLES = [
+    """
+    CREATE TABLE IF NOT EXISTS Reservations_Archive (
+        reservation_id INT PRIMARY KEY,
+        customer_id INT NOT NULL,
+        table_id INT NOT NULL,
+        reservation_date DATE NOT NULL,
+        reservation_time TIME NOT NULL,
+        person_count INT NOT NULL,
+        status VARCHAR(20),
+        archived_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    """,
+    # customer_id is copied from the reservation, which may be archived or
+    # deleted later
+    """
+    CREATE TABLE IF NOT EXISTS Orders_Archive (
+        order_id INT PRIMARY KEY,
+        reservation_id INT NOT NULL,
+        customer_id INT NOT NULL,
+        total_amount DECIMAL(10, 2) NOT NULL,
+        order_status VARCHAR(20),
+        created_at TIMESTAMP NULL,
+        archived_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS Order_Items_Archive (
+        order_item_id INT PRIMARY KEY,
+        order_id INT NOT NULL,
+        dish_id INT NOT NULL,
+        quantity INT NOT NULL,
+        created_at TIMESTAMP NULL,
+        archived_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS Payments_Archive (
+        payment_id INT PRIMARY KEY,
+        order_id INT NOT NULL,
+        amount_paid DECIMAL(10, 2) NOT NULL,
+        payment_method VARCHAR(20) NOT NULL,
+        payment_date TIMESTAMP NULL,
+        archived_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    """,
+    # The rollups' share of the archived orders, added back by
+    # ?include_archived=1 on the analytics routes
+    """
+    CREATE TABLE IF NOT EXISTS Customer_Spending_Archive (
+        customer_id INT PRIMARY KEY,
+        total_spent DECIMAL(12, 2) NOT NULL DEFAULT 0,
+        order_count INT NOT NULL DEFAULT 0,
+        last_order_at TIMESTAMP NULL,
+        FOREIGN KEY (customer_id) REFERENCES Customers(customer_id) ON DELETE CASCADE
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS Dish_Daily_Sales_Archive (
+        sales_date DATE NOT NULL,
+        dish_id INT NOT NULL,
+        quantity INT NOT NULL DEFAULT 0,
+        revenue DECIMAL(12, 2) NOT NULL DEFAULT 0,
+        order_lines INT NOT NULL DEFAULT 0,
+        PRIMARY KEY (sales_date, dish_id),
+        FOREIGN KEY (dish_id) REFERENCES Menu(dish_id) ON DELETE CASCADE
+    )
+    """,
+]
+
+
+# Items without a unit_price get their dish's current menu price
+PRICE_ORDER_ITEMS = """
+    UPDATE Order_Items SET unit_price = (SELECT price FROM Menu m WHERE m.dish_id = Order_Items.dish_id)
+    WHERE unit_price IS NULL
+"""
+
+PRICE_ARCHIVED_ORDER_ITEMS = """
+    UPDATE Order_Items_Archive SET unit_price = (SELECT price FROM Menu m WHERE m.dish_id = Order_Items_Archive.dish_id)
+    WHERE unit_price IS NULL
+"""
+
+
+MIGRATIONS = [
+    Migration(1, 'Base tables', [Sql(MYSQL_TABLES, SQLITE_TABLES)]),
+
+    # MySQL databases created before the analytics rollups. SQLite cannot add
+    # a column defaulting to CURRENT_TIMESTAMP, and its tables always had it.
+    Migration(2, 'created_at on Orders and Order_Items', [
+        AddColumn('Orders', 'created_at', 'TIMESTAMP DEFAULT CURRENT_TIMESTAMP', None),
+        AddColumn('Order_Items', 'created_at', 'TIMESTAMP DEFAULT CURRENT_TIMESTAMP', None),
+    ]),
+
+    # Indexes behind the queries in app/migrations/hot_queries.py.
+    # Order_Items(order_id) and Reservations(table_id, ...) are covered by
+    # the unique_order_menu and unique_table_time constraints.
+    Migration(3, 'Indexes for the hot query paths', [
+        CreateIndex('idx_users_username', 'users', ('username',)),
+        CreateIndex('idx_reservations_date', 'Reservations', ('reservation_date', 'table_id')),
+        CreateIndex('idx_reservations_customer', 'Reservations', ('customer_id',)),
+        CreateIndex('idx_menu_dish_name', 'Menu', ('dish_name',)),
+        CreateIndex('idx_menu_category', 'Menu', ('category',)),
+        CreateIndex('idx_orders_reservation', 'Orders', ('reservation_id',)),
+        CreateIndex('idx_orders_status', 'Orders', ('order_status',)),
+        CreateIndex('idx_orders_created', 'Orders', ('created_at',)),
+        CreateIndex('idx_order_items_dish', 'Order_Items', ('dish_id',)),
+        CreateIndex('idx_payments_order', 'Payments', ('order_id',)),
+        CreateIndex('idx_payments_date', 'Payments', ('payment_date',)),
+        CreateIndex('idx_spending_total', 'Customer_Spending', ('total_spent', 'customer_id')),
+        CreateIndex('idx_sales_dish', 'Dish_Daily_Sales', ('dish_id',)),
+    ]),
+
+    Migration(4, 'Archive tables', [
+        Sql(ARCHIVE_TABLES, ARCHIVE_TABLES),
+        CreateIndex('idx_reservations_archive_customer', 'Reservations_Archive', ('customer_id',)),
+        CreateIndex('idx_orders_archive_customer', 'Orders_Archive', ('customer_id',)),
+        CreateIndex('idx_order_items_archive_order', 'Order_Items_Archive', ('order_id',)),
+        CreateIndex('idx_payments_archive_order', 'Payments_Archive', ('order_id',)),
+    ]),
+
+    # Menu price of each item when it was ordered, so a later price change
+    # does not re-value past sales. Existing items get today's price.
+    Migration(5, 'unit_price on Order_Items', [
+        AddColumn('Order_Items', 'unit_price', 'DECIMAL(10, 2) NULL', 'DECIMAL(10, 2) NULL'),
+        Sql([PRICE_ORDER_ITEMS], [PRICE_ORDER_ITEMS]),
+    ]),
+
+    # Archived items keep the price they were sold at (app/services/archive.py
+    # copies it). Items archived before this get today's price.
+    Migration(6, 'unit_price on Order_Items_Archive', [
+        AddColumn('Order_Items_Archive', 'unit_price', 'DECIMAL(10, 2) NULL', 'DECIMAL(10, 2) NULL'),
+        Sql([PRICE_ARCHIVED_ORDER_ITEMS], [PRICE_ARCHIVED_ORDER_ITEMS]),
+    ]),
+]
@@ -0,0 +1,156 @@
+import asyncio
+import time
+from flask import current_app
+
+from app.models.db import db
+from app.models.pool import PoolTimeout
+
+# Event-loop counterpart of app.models.db for app/asgi.py.
+# It runs the same plans (app/models/plan.py) as the WSGI app, but a request
+# waiting on MySQL holds a coroutine, not a thread, so one process keeps as
+# many requests in flight as ASYNC_POOL_MAX_SIZE connections can serve.
+# Every statement checks a connection out of the async pool, runs in
+# autocommit (plans only read) and returns it.
+#   mysql  - aiomysql; the pool is created on first use, inside the event loop
+#   sqlite - the app's SQLiteEngine, one statement per worker thread
+
+
+class AsyncMySQLEngine:
+    dialect = 'mysql'
+
+    def __init__(self, config):
+        self.config = config
+        self._pool = None
+        self._lock = None
+
+    async def _create_pool(self):
+        import aiomysql
+        from pymysql.constants import CLIENT
+
+        config = self.config
+        kwargs = {
+            'host': config['MYSQL_HOST'],
+            'port': config['MYSQL_PORT'],
+            'charset': config['MYSQL_CHARSET'],
+            'connect_timeout': config['MYSQL_CONNECT_TIMEOUT'],
+            'client_flag': CLIENT.FOUND_ROWS,
+            'autocommit': True,
+            'minsize': int(config['ASYNC_POOL_MIN_SIZE']),
+            'maxsize': int(config['ASYNC_POOL_MAX_SIZE']),
+            # Reconnect before the server's wait_timeout drops an idle connection
+            'pool_recycle': float(config['MYSQL_POOL_IDLE_TIMEOUT']),
+        }
+        if config['MYSQL_USER']:
+            kwargs['user'] = config['MYSQL_USER']
+        if config['MYSQL_PASSWORD']:
+            kwargs['password'] = config['MYSQL_PASSWORD']
+        if config['MYSQL_DB']:
+            kwargs['db'] = config['MYSQL_DB']
+        return await aiomysql.create_pool(**kwargs)
+
+    async def _get_pool(self):
+        if self._pool is None:
+            if self._lock is None:
+                self._lock = asyncio.Lock()
+            async with self._lock:
+                if self._pool is None:
+                    self._pool = await self._create_pool()
+        return self._pool
+
+    async def run(self, query):
+        import aiomysql
+
+        pool = await self._get_pool()
+        timeout = float(self.config['MYSQL_POOL_CHECKOUT_TIMEOUT'])
+        try:
+            conn = await asyncio.wait_for(pool.acquire(), timeout)
+        except asyncio.TimeoutError:
+            raise PoolTimeout(
+                f"Timed out after {timeout}s waiting for a database connection "
+                f"({pool.size - pool.freesize}/{pool.maxsize} in use)"
+            )
+        try:
+            async with conn.cursor(aiomysql.DictCursor if query.dictionary else aiomysql.Cursor) as cursor:
+                await cursor.execute(query.sql, query.params)
+                if query.fetch == 'all':
+                    return await cursor.fetchall()
+                return await cursor.fetchone()
+        finally:
+            pool.release(conn)
+
+    async def close(self):
+        if self._pool is not None:
+            self._pool.close()
+            await self._pool.wait_closed()
+            self._pool = None
+
+
+# sqlite3 has no async API. Statements go to worker threads on the app's own
+# engine, so the event loop stays free and ":memory:" data is shared with the
+# routes served through WSGI.
+class AsyncSQLiteEngine:
+    dialect = 'sqlite'
+
+    def __init__(self, engine):
+        self.engine = engine
+
+    def _run(self, query):
+        engine = self.engine
+        conn = engine.acquire()
+        try:
+            cursor = engine.cursor(conn, dictionary=query.dictionary)
+            cursor.execute(query.sql, query.params)
+            return cursor.fetchall() if query.fetch == 'all' else cursor.fetchone()
+        finally:
+            engine.release(conn)
+
+    async def run(self, query):
+        return await asyncio.to_thread(self._run, query)
+
+    async def close(self):
+        pass
+
+
+class AsyncDatabase:
+    def init_app(self, app):
+        app.config.setdefault('ASYNC_POOL_MIN_SIZE', 1)
+        app.config.setdefault('ASYNC_POOL_MAX_SIZE', 20)
+
+        if app.config['DB_ENGINE'] == 'sqlite':
+            engine = AsyncSQLiteEngine(app.extensions['db'])
+        else:
+            engine = AsyncMySQLEngine(app.config)
+        app.extensions['async_db'] = engine
+
+    @property
+    def engine(self):
+        return current_app.extensions['async_db']
+
+    # app.models.plan.run_plan, awaiting each statement. db's statement
+    # hooks see the time from checkout to the last row and the rows fetched.
+    async def run_plan(self, plan):
+        engine = self.engine
+        hooks = db.statement_hooks
+        result, error = None, None
+        while True:
+            try:
+                query = plan.throw(error) if error is not None else plan.send(result)
+            except StopIteration as stop:
+                return stop.value
+            start = time.perf_counter()
+            try:
+                result, error = await engine.run(query), None
+            except Exception as e:
+                result, error = None, e
+            seconds = time.perf_counter() - start
+            if error is not None:
+                rowcount = -1
+            elif query.fetch == 'all':
+                rowcount = len(result)
+            else:
+                rowcount = 0 if result is None else 1
+            for hook in hooks:
+                hook(query.sql, query.params, seconds, rowcount)
+
+
+async_db = AsyncDatabase()
@@ -1,22 +1,125 @@
-from flask_mysqldb import MySQL
-import os
-from dotenv import load_dotenv
+import time
+from flask import current_app, g
 
-mysql = MySQL()
+from app.models.engines import ENGINES
 
+# Data-access entry point for the blueprints.
+# DB_ENGINE selects the engine ("mysql" by default, or "sqlite" for an
+# embedded database with the same schema). Routes only talk to `db`:
+# db.cursor(dictionary=..., unbuffered=...), db.commit(), db.rollback(),
+# and the per-context db.connection underneath them.
+#
+# Statement hooks (db.add_statement_hook) are called as hook(sql, params,
+# seconds, rowcount) after every execute / executemany, failed ones included,
+# e.g. by app.services.metrics and app.services.slow_queries. rowcount is the
+# cursor's: rows returned by a buffered MySQL SELECT or changed by a write,
+# -1 when the driver cannot tell yet (SQLite SELECTs, unbuffered cursors) or
+# the statement failed. Without hooks, routes get the engine's cursors
+# unwrapped.
 
 
-def init_db(app):
+class HookedCursor:
+    def __init__(self, cursor, hooks):
+        self._cursor = cursor
+        self._hooks = hooks
 
-    load_dotenv()
+    def _timed(self, method, query, args):
+        start = time.perf_counter()
+        rowcount = -1
+        try:
+            result = method(query, args)
+            rowcount = self._cursor.rowcount
+            return result
+        finally:
+            seconds = time.perf_counter() - start
+            for hook in self._hooks:
+                hook(query, args, seconds, rowcount)
 
-    app.config['MYSQL_HOST'] = app.config['MYSQL_HOST']
-    app.config['MYSQL_USER'] = app.config['MYSQL_USER']
-    app.config['MYSQL_PASSWORD'] = os.getenv('MYSQL_PASSWORD')
-    app.config['MYSQL_DB'] = app.config['MYSQL_DB']
+    def execute(self, query, args=None):
+        return self._timed(self._cursor.execute, query, args)
 
-    app.config['SECRET_KEY'] = os.getenv('SECRET_KEY')
-    app.config['JWT_SECRET_KEY'] = os.getenv('SECRET_KEY')
+    def executemany(self, query, args):
+        return self._timed(self._cursor.executemany, query, args)
 
-    mysql.init_app(app)
-    return mysql
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+class Database:
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('DB_ENGINE', 'mysql')
+
+        app.config.setdefault('MYSQL_HOST', 'localhost')
+        app.config.setdefault('MYSQL_USER', None)
+        app.config.setdefault('MYSQL_PASSWORD', None)
+        app.config.setdefault('MYSQL_DB', None)
+        app.config.setdefault('MYSQL_PORT', 3306)
+        app.config.setdefault('MYSQL_CHARSET', 'utf8mb4')
+        app.config.setdefault('MYSQL_CONNECT_TIMEOUT', 10)
+        app.config.setdefault('MYSQL_POOL_MIN_SIZE', 1)
+        app.config.setdefault('MYSQL_POOL_MAX_SIZE', 10)
+        app.config.setdefault('MYSQL_POOL_IDLE_TIMEOUT', 300)
+        app.config.setdefault('MYSQL_POOL_CHECKOUT_TIMEOUT', 5)
+        app.config.setdefault('MYSQL_POOL_PING', True)
+
+        app.config.setdefault('SQLITE_PATH', ':memory:')
+        app.config.setdefault('SQLITE_BUSY_TIMEOUT', 5000)
+
+        engine_name = app.config['DB_ENGINE']
+        if engine_name not in ENGINES:
+            raise ValueError(f"Unknown DB_ENGINE {engine_name!r}. Allowed values: {', '.join(ENGINES)}")
+
+        app.extensions['db'] = ENGINES[engine_name](app.config)
+        app.extensions['db_statement_hooks'] = []
+        app.teardown_appcontext(self.teardown)
+
+    def add_statement_hook(self, app, hook):
+        app.extensions['db_statement_hooks'].append(hook)
+
+    @property
+    def statement_hooks(self):
+        return current_app.extensions['db_statement_hooks']
+
+    @property
+    def engine(self):
+        return current_app.extensions['db']
+
+    @property
+    def dialect(self):
+        return self.engine.dialect
+
+    # The connection for the current app context, acquired on first use
+    @property
+    def connection(self):
+        if 'db_connection' not in g:
+            g.db_connection = self.engine.acquire()
+        return g.db_connection
+
+    def cursor(self, dictionary=False, unbuffered=False):
+        cursor = self.engine.cursor(self.connection, dictionary=dictionary, unbuffered=unbuffered)
+        hooks = self.statement_hooks
+        return HookedCursor(cursor, hooks) if hooks else cursor
+
+    def commit(self):
+        self.connection.commit()
+
+    def rollback(self):
+        self.connection.rollback()
+
+    def stats(self):
+        return self.engine.stats()
+
+    def teardown(self, exception):
+        conn = g.pop('db_connection', None)
+        if conn is not None:
+            self.engine.release(conn)
+
+
+db = Database()
@@ -0,0 +1,222 @@
+import os
+import re
+import sqlite3
+import threading
+from decimal import Decimal
+
+from app.models.pool import ConnectionPool
+
+# Database engines behind app.models.db.
+# Every engine hands out one connection per app context (acquire/release) and
+# builds cursors for it. Cursors follow the MySQLdb DB-API surface the
+# blueprints already use: %s placeholders, fetchone/fetchall/fetchmany,
+# rowcount, lastrowid and description.
+
+
+class MySQLEngine:
+    dialect = 'mysql'
+
+    def __init__(self, config):
+        self.config = config
+        self._pools = {}
+        self._lock = threading.Lock()
+
+    # Pools are kept per process: gunicorn forks workers after create_app(),
+    # and a connection must never be shared across a fork, so each worker
+    # lazily builds (and sizes) its own pool the first time it needs one.
+    def _pool(self):
+        pid = os.getpid()
+        pool = self._pools.get(pid)
+        if pool is None:
+            with self._lock:
+                pool = self._pools.get(pid)
+                if pool is None:
+                    pool = self._create_pool()
+                    self._pools = {pid: pool}
+        return pool
+
+    def _connect(self):
+        import MySQLdb
+        from MySQLdb.constants import CLIENT
+
+        config = self.config
+        kwargs = {
+            'host': config['MYSQL_HOST'],
+            'port': config['MYSQL_PORT'],
+            'charset': config['MYSQL_CHARSET'],
+            'connect_timeout': config['MYSQL_CONNECT_TIMEOUT'],
+            # rowcount of an UPDATE counts matched rows, as on SQLite, so
+            # repository.update_by_id can tell "not found" from "unchanged"
+            'client_flag': CLIENT.FOUND_ROWS,
+        }
+        if config['MYSQL_USER']:
+            kwargs['user'] = config['MYSQL_USER']
+        if config['MYSQL_PASSWORD']:
+            kwargs['passwd'] = config['MYSQL_PASSWORD']
+        if config['MYSQL_DB']:
+            kwargs['db'] = config['MYSQL_DB']
+        return MySQLdb.connect(**kwargs)
+
+    def _create_pool(self):
+        config = self.config
+        pool = ConnectionPool(
+            self._connect,
+            min_size=int(config['MYSQL_POOL_MIN_SIZE']),
+            max_size=int(config['MYSQL_POOL_MAX_SIZE']),
+            idle_timeout=float(config['MYSQL_POOL_IDLE_TIMEOUT']),
+            checkout_timeout=float(config['MYSQL_POOL_CHECKOUT_TIMEOUT']),
+            ping=bool(config['MYSQL_POOL_PING']),
+        )
+        try:
+            pool.prefill()
+        except Exception:
+            # The database may not be up yet; connections are opened on demand.
+            pass
+        return pool
+
+    def acquire(self):
+        return self._pool().checkout()
+
+    def release(self, conn):
+        discard = False
+        try:
+            # Never hand uncommitted work to the next request
+            conn.rollback()
+        except Exception:
+            discard = True
+        self._pool().checkin(conn, discard=discard)
+
+    def cursor(self, conn, dictionary=False, unbuffered=False):
+        from MySQLdb import cursors
+
+        if unbuffered:
+            cursor_class = cursors.SSDictCursor if dictionary else cursors.SSCursor
+        else:
+            cursor_class = cursors.DictCursor if dictionary else cursors.Cursor
+        return conn.cursor(cursor_class)
+
+    def stats(self):
+        return dict(self._pool().stats(), engine=self.dialect)
+
+
+# SQLite stores DECIMAL columns with NUMERIC affinity; hand it strings so
+# amounts are not rounded through float on the way in.
+sqlite3.register_adapter(Decimal, str)
+
+_PLACEHOLDER = re.compile(r"%([s%])")
+
+
+# Translate MySQLdb paramstyle (%s, %%) into sqlite3 paramstyle (?, %)
+def _translate(query):
+    return _PLACEHOLDER.sub(lambda m: '?' if m.group(1) == 's' else '%', query)
+
+
+class SQLiteCursor:
+    def __init__(self, cursor, dictionary=False):
+        self._cursor = cursor
+        self._dictionary = dictionary
+
+    @property
+    def description(self):
+        return self._cursor.description
+
+    @property
+    def rowcount(self):
+        return self._cursor.rowcount
+
+    @property
+    def lastrowid(self):
+        return self._cursor.lastrowid
+
+    def execute(self, query, args=None):
+        self._cursor.execute(_translate(query), tuple(args) if args is not None else ())
+        return self._cursor.rowcount
+
+    def executemany(self, query, args):
+        self._cursor.executemany(_translate(query), [tuple(row) for row in args])
+        return self._cursor.rowcount
+
+    def _row(self, row):
+        if row is None or not self._dictionary:
+            return row
+        return dict(zip((column[0] for column in self._cursor.description), row))
+
+    def fetchone(self):
+        return self._row(self._cursor.fetchone())
+
+    def fetchmany(self, size=None):
+        rows = self._cursor.fetchmany(size) if size else self._cursor.fetchmany()
+        return tuple(self._row(row) for row in rows)
+
+    def fetchall(self):
+        return tuple(self._row(row) for row in self._cursor.fetchall())
+
+    def __iter__(self):
+        for row in self._cursor:
+            yield self._row(row)
+
+    def close(self):
+        self._cursor.close()
+
+
+# Embedded engine for hermetic runs (benchmarks, profiling, CI).
+# SQLITE_PATH=":memory:" keeps one shared in-process database; requests take
+# turns on its single connection. A file path gives every app context its own
+# connection in WAL mode, which allows concurrent readers.
+class SQLiteEngine:
+    dialect = 'sqlite'
+
+    def __init__(self, config):
+        self.path = config['SQLITE_PATH']
+        self.busy_timeout = int(config['SQLITE_BUSY_TIMEOUT'])
+        self._memory = self.path == ':memory:'
+        self._shared = None
+        self._lock = threading.RLock()
+        self._opened = 0
+
+        # The schema itself comes from app/migrations (DB_AUTO_MIGRATE)
+        if self._memory:
+            self._shared = self._connect()
+        else:
+            conn = self._connect()
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.close()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, check_same_thread=False, timeout=self.busy_timeout / 1000)
+        conn.execute("PRAGMA foreign_keys = ON")
+        conn.execute(f"PRAGMA busy_timeout = {self.busy_timeout}")
+        self._opened += 1
+        return conn
+
+    def acquire(self):
+        if self._memory:
+            self._lock.acquire()
+            return self._shared
+        return self._connect()
+
+    def release(self, conn):
+        try:
+            conn.rollback()
+        finally:
+            if self._memory:
+                self._lock.release()
+            else:
+                conn.close()
+
+    def cursor(self, conn, dictionary=False, unbuffered=False):
+        # sqlite3 cursors already step through results lazily
+        return SQLiteCursor(conn.cursor(), dictionary=dictionary)
+
+    def stats(self):
+        return {
+            "engine": self.dialect,
+            "path": self.path,
+            "connections_opened": self._opened,
+        }
+
+
+ENGINES = {
+    'mysql': MySQLEngine,
+    'sqlite': SQLiteEngine,
+}
@@ -0,0 +1,57 @@
+from collections import namedtuple
+from functools import wraps
+from flask import g
+
+from app.models.db import db
+
+# Read routes written once for both servers.
+# A plan is a generator that yields a Query for every statement it needs and
+# is sent back the result: all rows (fetch='all') or the first row or None
+# (fetch='one'). A failed statement is raised inside the plan, so its own
+# try/except still turns it into a response. The plan's return value is the
+# result.
+#
+# run_plan executes a plan on `db` (the WSGI app, one blocking statement at a
+# time); app.models.async_db awaits the same plans on the event loop
+# (app/asgi.py). Plans only read: routes that write stay on `db`.
+
+Query = namedtuple('Query', ['sql', 'params', 'dictionary', 'fetch'], defaults=((), False, 'all'))
+
+
+def execute(query):
+    cursor = db.cursor(dictionary=query.dictionary)
+    try:
+        cursor.execute(query.sql, query.params)
+        return cursor.fetchall() if query.fetch == 'all' else cursor.fetchone()
+    finally:
+        cursor.close()
+
+
+def run_plan(plan):
+    result, error = None, None
+    while True:
+        try:
+            query = plan.throw(error) if error is not None else plan.send(result)
+        except StopIteration as stop:
+            return stop.value
+        try:
+            result, error = execute(query), None
+        except Exception as e:
+            result, error = None, e
+
+
+# Decorator for a view written as a plan. Flask runs it with run_plan; under
+# app/asgi.py (g.defer_plans) the view returns the plan unstarted, after
+# the decorators above it (jwt_required) have run, for the event loop to
+# drive. The `plan_view` attribute survives functools.wraps, so
+# app.view_functions tells which endpoints are plans.
+def plan_view(view):
+    @wraps(view)
+    def run(*args, **kwargs):
+        plan = view(*args, **kwargs)
+        if g.get('defer_plans'):
+            return plan
+        return run_plan(plan)
+
+    run.plan_view = True
+    return run
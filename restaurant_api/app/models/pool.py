@@ -0,0 +1,179 @@
+import threading
+import time
+
+# Thread-safe connection pool used by the MySQL engine.
+# Connections are checked out per app context and returned at teardown, so a
+# worker pays the TCP + auth handshake only when the pool has to grow.
+
+
+class PoolTimeout(Exception):
+    pass
+
+
+class ConnectionPool:
+    def __init__(self, connect, min_size=1, max_size=10, idle_timeout=300, checkout_timeout=5, ping=True):
+        self._connect = connect
+        self.min_size = min_size
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.checkout_timeout = checkout_timeout
+        self.ping = ping
+
+        self._cond = threading.Condition()
+        self._idle = []  # (connection, returned_at); most recently used last
+        self._size = 0  # open connections, idle + in use
+        self._in_use = 0
+        self._waiting = 0
+
+        self._checkouts = 0
+        self._timeouts = 0
+        self._created = 0
+        self._evicted = 0
+        self._ping_failures = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+
+    # Open connections until the pool holds min_size of them
+    def prefill(self):
+        while True:
+            with self._cond:
+                if self._size >= self.min_size:
+                    return
+                self._size += 1
+            try:
+                conn = self._new_connection()
+            except Exception:
+                with self._cond:
+                    self._size -= 1
+                raise
+            with self._cond:
+                self._idle.append((conn, time.monotonic()))
+                self._cond.notify()
+
+    def checkout(self):
+        start = time.monotonic()
+        deadline = start + self.checkout_timeout
+        conn = None
+
+        stale = []
+        try:
+            with self._cond:
+                stale = self._evict_idle()
+                while True:
+                    if self._idle:
+                        conn = self._idle.pop()[0]
+                        break
+                    if self._size < self.max_size:
+                        # Reserve a slot; the connection is opened outside the lock
+                        self._size += 1
+                        break
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._timeouts += 1
+                        raise PoolTimeout(
+                            f"Timed out after {self.checkout_timeout}s waiting for a database connection "
+                            f"({self._in_use}/{self.max_size} in use)"
+                        )
+                    self._waiting += 1
+                    try:
+                        self._cond.wait(remaining)
+                    finally:
+                        self._waiting -= 1
+
+                self._in_use += 1
+                self._checkouts += 1
+                waited = time.monotonic() - start
+                self._wait_total += waited
+                self._wait_max = max(self._wait_max, waited)
+        finally:
+            for stale_conn in stale:
+                self._close(stale_conn)
+
+        try:
+            if conn is None:
+                conn = self._new_connection()
+            elif self.ping and not self._is_alive(conn):
+                self._close(conn)
+                conn = self._new_connection()
+        except Exception:
+            with self._cond:
+                self._size -= 1
+                self._in_use -= 1
+                self._cond.notify()
+            raise
+
+        return conn
+
+    def checkin(self, conn, discard=False):
+        with self._cond:
+            self._in_use -= 1
+            if discard:
+                self._size -= 1
+            else:
+                self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+        if discard:
+            self._close(conn)
+
+    def stats(self):
+        with self._cond:
+            return {
+                "size": self._size,
+                "idle": len(self._idle),
+                "in_use": self._in_use,
+                "waiting": self._waiting,
+                "min_size": self.min_size,
+                "max_size": self.max_size,
+                "checkouts": self._checkouts,
+                "timeouts": self._timeouts,
+                "created": self._created,
+                "evicted": self._evicted,
+                "ping_failures": self._ping_failures,
+                "wait_time_total": round(self._wait_total, 6),
+                "wait_time_max": round(self._wait_max, 6),
+                "wait_time_avg": round(self._wait_total / self._checkouts, 6) if self._checkouts else 0.0,
+            }
+
+    def close_all(self):
+        with self._cond:
+            idle = [conn for conn, _ in self._idle]
+            self._size -= len(idle)
+            self._idle = []
+        for conn in idle:
+            self._close(conn)
+
+    # Must be called with the lock held. Removes connections that have been
+    # idle longer than idle_timeout (oldest first), never going below
+    # min_size, and returns them so they can be closed outside the lock.
+    def _evict_idle(self):
+        stale = []
+        if not self.idle_timeout:
+            return stale
+        cutoff = time.monotonic() - self.idle_timeout
+        while self._idle and self._size > self.min_size and self._idle[0][1] < cutoff:
+            stale.append(self._idle.pop(0)[0])
+            self._size -= 1
+            self._evicted += 1
+        return stale
+
+    def _new_connection(self):
+        conn = self._connect()
+        with self._cond:
+            self._created += 1
+        return conn
+
+    def _is_alive(self, conn):
+        try:
+            conn.ping()
+            return True
+        except Exception:
+            with self._cond:
+                self._ping_failures += 1
+            return False
+
+    @staticmethod
+    def _close(conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
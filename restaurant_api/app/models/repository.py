@@ -0,0 +1,198 @@
+from app.models.db import db
+from app.models.plan import Query, run_plan
+from app.models.schema import TABLES
+from app.services.pagination import encode_cursor, project_row
+
+# Generic table access used by the blueprints.
+# Functions take the table name from app.models.schema.TABLES and never
+# commit; the calling route decides when its transaction ends (db.commit()).
+
+
+# Explicit SELECT list for `fields` (validated column names), or * for all
+def _select_list(fields):
+    return ", ".join(fields) if fields else "*"
+
+
+# WHERE clause for (column, op, value) conditions from
+# filtering.get_filter_args (whitelisted columns and operators only)
+def _where(conditions):
+    clauses, params = [], []
+    for column, op, value in conditions:
+        if op == 'IN':
+            clauses.append(f"{column} IN ({', '.join(['%s'] * len(value))})")
+            params.extend(value)
+        else:
+            clauses.append(f"{column} {op} %s")
+            params.append(value)
+    return clauses, params
+
+
+# Fetch one page of a table ordered by its primary key (keyset pagination).
+# One extra row is read to know whether another page exists, so next_cursor
+# is None exactly when the client has reached the end.
+# `fields` must start with the primary key (see pagination.get_fields_arg).
+# `where` narrows the rows (filtering.get_filter_args). With `sort`
+# (column, descending) rows are ordered by that column and then the primary
+# key, and after / next_cursor are [sort value, primary key] pairs.
+def list_page(table, limit, after, dictionary=True, fields=None, where=None, sort=None):
+    return run_plan(list_page_plan(table, limit, after, dictionary, fields, where, sort))
+
+
+# list_page as a plan (app/models/plan.py)
+def list_page_plan(table, limit, after, dictionary=True, fields=None, where=None, sort=None):
+    t = TABLES[table]
+    select = list(fields) if fields else None
+    if select and sort is not None and sort[0] not in select:
+        # Needed for next_cursor, dropped again below
+        select.append(sort[0])
+    clauses, params = _where(where or [])
+
+    if sort is None:
+        if after is not None:
+            clauses.append(f"{t.pk} > %s")
+            params.append(after)
+        order = t.pk
+    else:
+        column, descending = sort
+        op, direction = ('<', 'DESC') if descending else ('>', 'ASC')
+        if after is not None:
+            clauses.append(f"({column} {op} %s OR ({column} = %s AND {t.pk} {op} %s))")
+            params.extend([after[0], after[0], after[1]])
+        order = f"{column} {direction}, {t.pk} {direction}"
+
+    query = f"SELECT {_select_list(select)} FROM {t.name}"
+    if clauses:
+        query += " WHERE " + " AND ".join(clauses)
+    query += f" ORDER BY {order} LIMIT %s"
+    params.append(limit + 1)
+
+    rows = list((yield Query(query, tuple(params), dictionary)))
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        pk = last[t.pk] if dictionary else last[0]
+        if sort is None:
+            next_cursor = pk
+        else:
+            value = last[sort[0]] if dictionary else last[(select or t.columns).index(sort[0])]
+            next_cursor = encode_cursor([value, pk])
+
+    if select and len(select) > len(fields):
+        rows = [project_row(table, row, fields, select) for row in rows]
+    return rows, next_cursor
+
+
+# for_update=True locks the row until the transaction ends on MySQL, for a
+# read-modify-write (SQLite serialises writers, so it needs no lock)
+def get_by_id(table, row_id, dictionary=True, fields=None, for_update=False):
+    return run_plan(get_by_id_plan(table, row_id, dictionary, fields, for_update))
+
+
+def get_by_id_plan(table, row_id, dictionary=True, fields=None, for_update=False):
+    t = TABLES[table]
+    sql = f"SELECT {_select_list(fields)} FROM {t.name} WHERE {t.pk} = %s"
+    if for_update and db.dialect == 'mysql':
+        sql += " FOR UPDATE"
+    return (yield Query(sql, (row_id,), dictionary, 'one'))
+
+
+# First row whose columns equal the given values, e.g. find_one('Menu', dish_name=name)
+def find_one(table, dictionary=False, fields=None, **where):
+    t = TABLES[table]
+    conditions = " AND ".join(f"{column} = %s" for column in where)
+    cursor = db.cursor(dictionary=dictionary)
+    try:
+        cursor.execute(f"SELECT {_select_list(fields)} FROM {t.name} WHERE {conditions} LIMIT 1", tuple(where.values()))
+        return cursor.fetchone()
+    finally:
+        cursor.close()
+
+
+def exists(table, **where):
+    t = TABLES[table]
+    conditions = " AND ".join(f"{column} = %s" for column in where)
+    cursor = db.cursor()
+    try:
+        cursor.execute(f"SELECT 1 FROM {t.name} WHERE {conditions} LIMIT 1", tuple(where.values()))
+        return cursor.fetchone() is not None
+    finally:
+        cursor.close()
+
+
+# Insert one row and return its generated primary key
+def insert(table, values):
+    t = TABLES[table]
+    columns = ", ".join(values)
+    placeholders = ", ".join(["%s"] * len(values))
+    cursor = db.cursor()
+    try:
+        cursor.execute(f"INSERT INTO {t.name} ({columns}) VALUES ({placeholders})", tuple(values.values()))
+        return cursor.lastrowid
+    finally:
+        cursor.close()
+
+
+# Insert many rows with multi-row INSERT ... VALUES statements and return
+# their generated primary keys in input order. Every row must have the same
+# columns. Rows are sent in statements of at most `chunk` rows to stay under
+# driver/placeholder limits; the caller still commits them as one transaction.
+def insert_many(table, rows, chunk=200):
+    t = TABLES[table]
+    if not rows:
+        return []
+    columns = list(rows[0])
+    row_placeholders = "(" + ", ".join(["%s"] * len(columns)) + ")"
+
+    ids = []
+    cursor = db.cursor()
+    try:
+        # Keys are auto_increment_increment apart (greater than 1 under
+        # Galera / group replication)
+        step = 1
+        if db.dialect == 'mysql':
+            cursor.execute("SELECT @@auto_increment_increment")
+            step = int(cursor.fetchone()[0])
+        for start in range(0, len(rows), chunk):
+            batch = rows[start:start + chunk]
+            params = [row[column] for row in batch for column in columns]
+            cursor.execute(
+                f"INSERT INTO {t.name} ({', '.join(columns)}) VALUES {', '.join([row_placeholders] * len(batch))}",
+                tuple(params),
+            )
+            # One statement gets evenly spaced keys. MySQL reports the first
+            # one, SQLite the last one.
+            if db.dialect == 'sqlite':
+                first = cursor.lastrowid - len(batch) + 1
+            else:
+                first = cursor.lastrowid
+            ids.extend(range(first, first + len(batch) * step, step))
+        return ids
+    finally:
+        cursor.close()
+
+
+# Set only the given columns of one row in a single UPDATE and return the
+# number of rows matched (0 when there is no such row; MySQL connections use
+# CLIENT.FOUND_ROWS so an update that changes nothing still counts).
+def update_by_id(table, row_id, values):
+    t = TABLES[table]
+    assignments = ", ".join(f"{column} = %s" for column in values)
+    cursor = db.cursor()
+    try:
+        cursor.execute(f"UPDATE {t.name} SET {assignments} WHERE {t.pk} = %s", (*values.values(), row_id))
+        return cursor.rowcount
+    finally:
+        cursor.close()
+
+
+# Delete one row by primary key and return the number of rows removed
+def delete_by_id(table, row_id):
+    t = TABLES[table]
+    cursor = db.cursor()
+    try:
+        cursor.execute(f"DELETE FROM {t.name} WHERE {t.pk} = %s", (row_id,))
+        return cursor.rowcount
+    finally:
+        cursor.close()
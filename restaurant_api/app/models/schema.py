@@ -0,0 +1,28 @@
+from collections import namedtuple
+
+# Table registry used by the repository (the DDL is in app/migrations/versions.py).
+# `columns` is the full column list in table order (primary key first).
+Table = namedtuple('Table', ['name', 'pk', 'columns'])
+
+TABLES = {
+    'users': Table('users', 'id', ('id', 'username', 'password', 'role', 'created_at')),
+    'Tables': Table('Tables', 'table_id', ('table_id', 'capacity', 'location')),
+    'Customers': Table('Customers', 'customer_id', ('customer_id', 'name', 'contact_details')),
+    'Reservations': Table('Reservations', 'reservation_id', (
+        'reservation_id', 'customer_id', 'table_id', 'reservation_date',
+        'reservation_time', 'person_count', 'status',
+    )),
+    'Menu': Table('Menu', 'dish_id', ('dish_id', 'dish_name', 'category', 'price')),
+    'Orders': Table('Orders', 'order_id', ('order_id', 'reservation_id', 'total_amount', 'order_status', 'created_at')),
+    'Order_Items': Table('Order_Items', 'order_item_id', (
+        'order_item_id', 'order_id', 'dish_id', 'quantity', 'created_at', 'unit_price',
+    )),
+    'Staff': Table('Staff', 'staff_id', ('staff_id', 'name', 'role', 'shift')),
+    'Payments': Table('Payments', 'payment_id', (
+        'payment_id', 'order_id', 'amount_paid', 'payment_method', 'payment_date',
+    )),
+    'Customer_Spending': Table('Customer_Spending', 'customer_id', (
+        'customer_id', 'total_spent', 'order_count', 'last_order_at',
+    )),
+}
+
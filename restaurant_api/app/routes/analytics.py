@@ -1,52 +1,200 @@
-from flask import Blueprint, request, jsonify
+import math
+from datetime import date
+from flask import Blueprint, current_app, request, jsonify
 from flask_jwt_extended import jwt_required
-from app.models.db import mysql
+from app.models.plan import Query, plan_view
+from app.services.pagination import get_limit_arg, encode_cursor, decode_cursor
+from app.services.rollups import dish_sales_table, spending_table
 
 # Create a Blueprint for analytics routes
 analytics_bp = Blueprint('analytics', __name__)
 
+DISH_CATEGORIES = ['Appetizer', 'Main Course', 'Dessert', 'Beverage']
+
+# ?by= values of popular_dishes and the column each one sorts on
+POPULAR_DISHES_ORDER = {'quantity': 'quantity', 'revenue': 'revenue', 'orders': 'orders'}
+
+
+# ?include_archived=1 adds the orders moved out by app/services/archive.py
+# back into the rollups. Returns (include_archived, error).
+def get_include_archived_arg():
+    value = request.args.get('include_archived', '0')
+    if value not in ('0', '1'):
+        return None, 'include_archived must be 0 or 1'
+    return value == '1', None
+
+# One page of Customer_Spending rows (customers with at least one order),
+# biggest spenders first, optionally only those above `threshold`.
+# Keyset on (total_spent, customer_id), both descending; `after` is a decoded
+# cursor. With include_archived the archived orders count too.
+# A plan (app/models/plan.py) returning (rows, next_cursor).
+def _spending_page(limit, after, threshold=None, include_archived=False):
+    query = f"""
+    SELECT cs.customer_id, c.name AS customer_name, cs.total_spent, cs.order_count, cs.last_order_at
+    FROM {spending_table(include_archived)} cs
+    JOIN Customers c ON c.customer_id = cs.customer_id
+    WHERE cs.order_count > 0
+    """
+    params = []
+    if threshold is not None:
+        query += " AND cs.total_spent > %s"
+        params.append(threshold)
+    if after is not None:
+        query += " AND (cs.total_spent < %s OR (cs.total_spent = %s AND cs.customer_id < %s))"
+        params.extend([after[0], after[0], after[1]])
+    query += " ORDER BY cs.total_spent DESC, cs.customer_id DESC LIMIT %s"
+    params.append(limit + 1)
+
+    rows = list((yield Query(query, tuple(params), dictionary=True)))
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor([rows[-1]['total_spent'], rows[-1]['customer_id']])
+    return rows, next_cursor
+
+
 # Route 1: Customer Spending
+# Served from the Customer_Spending rollup (see app/services/rollups.py).
+#   no parameters     -> every customer as [customer_name, total_spent], highest first
+#   ?top=N            -> the N biggest spenders
+#   ?limit=&after=    -> one page; after is the next_cursor of the previous page
+#   ?include_archived=1 with any of them -> archived orders count too
 @analytics_bp.route('/customer_spending', methods=['GET'])
 @jwt_required()
+@plan_view
 def customer_spending():
+    include_archived, error = get_include_archived_arg()
+    if error:
+        return jsonify({'msg': error}), 400
+    top = request.args.get('top')
+    paged = 'limit' in request.args or 'after' in request.args
+
+    if top is None and not paged:
+        try:
+            query = f"""
+            SELECT c.name AS customer_name,
+                   cs.total_spent
+            FROM {spending_table(include_archived)} cs
+            JOIN Customers c ON c.customer_id = cs.customer_id
+            WHERE cs.order_count > 0
+            ORDER BY cs.total_spent DESC, cs.customer_id DESC;
+            """
+            result = yield Query(query)
+            return jsonify(result)
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
+
+    if top is not None:
+        try:
+            limit = int(top)
+        except ValueError:
+            return jsonify({'msg': 'top must be a positive integer'}), 400
+        if limit < 1:
+            return jsonify({'msg': 'top must be a positive integer'}), 400
+        limit = min(limit, current_app.config['PAGE_SIZE_MAX'])
+        after = None
+    else:
+        limit, error = get_limit_arg()
+        if error:
+            return jsonify({'msg': error}), 400
+        after = request.args.get('after')
+        if after is not None:
+            after = decode_cursor(after, 2)
+            if after is None:
+                return jsonify({'msg': 'after must be a next_cursor from a previous page'}), 400
+
     try:
-        query = """
-        SELECT c.name AS customer_name, 
-               SUM(o.total_amount) AS total_spent
-        FROM Customers c
-        JOIN Reservations r ON c.customer_id = r.customer_id
-        JOIN Orders o ON r.reservation_id = o.reservation_id
-        GROUP BY c.customer_id
-        ORDER BY total_spent DESC;
-        """
-        cursor = mysql.connection.cursor()
-        cursor.execute(query)
-        result = cursor.fetchall()
-        cursor.close()
-        return jsonify(result)
+        rows, next_cursor = yield from _spending_page(limit, after, include_archived=include_archived)
+        if top is not None:
+            next_cursor = None
+        return jsonify({'customer_spending': rows, 'next_cursor': next_cursor})
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 
 # Route 2: Popular Dishes
+# Served from the Dish_Daily_Sales rollup (see app/services/rollups.py).
+#   no parameters -> the 5 dishes on the most order lines, as [dish_name, total_orders]
+#   ?from=YYYY-MM-DD&to=YYYY-MM-DD&category=...&by=quantity|revenue|orders&k=N
+#                 -> top k dishes in that window (dates inclusive, either may be left open)
+#   ?include_archived=1 with either -> archived order items count too
 @analytics_bp.route('/popular_dishes', methods=['GET'])
 @jwt_required()
+@plan_view
 def popular_dishes():
+    include_archived, error = get_include_archived_arg()
+    if error:
+        return jsonify({'msg': error}), 400
+
+    if not any(arg in request.args for arg in ('from', 'to', 'category', 'by', 'k')):
+        try:
+            query = f"""
+            SELECT m.dish_name,
+                   SUM(d.order_lines) AS total_orders
+            FROM {dish_sales_table(include_archived)} d
+            JOIN Menu m ON m.dish_id = d.dish_id
+            GROUP BY m.dish_id, m.dish_name
+            ORDER BY total_orders DESC
+            LIMIT 5;
+            """
+            result = yield Query(query)
+            return jsonify(result)
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
+
+    date_from, date_to = request.args.get('from'), request.args.get('to')
+    for value in (date_from, date_to):
+        if value is not None:
+            try:
+                date.fromisoformat(value)
+            except ValueError:
+                return jsonify({'msg': 'from and to must be dates (YYYY-MM-DD)'}), 400
+
+    category = request.args.get('category')
+    if category is not None and category not in DISH_CATEGORIES:
+        return jsonify({'msg': f"Invalid category. Allowed values: {', '.join(DISH_CATEGORIES)}"}), 400
+
+    by = request.args.get('by', 'quantity')
+    if by not in POPULAR_DISHES_ORDER:
+        return jsonify({'msg': f"Invalid by. Allowed values: {', '.join(POPULAR_DISHES_ORDER)}"}), 400
+
     try:
-        query = """
-        SELECT m.dish_name, 
-               COUNT(oi.dish_id) AS total_orders
-        FROM Menu m
-        JOIN Order_Items oi ON m.dish_id = oi.dish_id
-        GROUP BY m.dish_id
-        ORDER BY total_orders DESC
-        LIMIT 5;
+        k = int(request.args.get('k', 5))
+    except ValueError:
+        return jsonify({'msg': 'k must be a positive integer'}), 400
+    if k < 1:
+        return jsonify({'msg': 'k must be a positive integer'}), 400
+    k = min(k, current_app.config['PAGE_SIZE_MAX'])
+
+    try:
+        conditions, params = [], []
+        if date_from is not None:
+            conditions.append("d.sales_date >= %s")
+            params.append(date_from)
+        if date_to is not None:
+            conditions.append("d.sales_date <= %s")
+            params.append(date_to)
+        if category is not None:
+            conditions.append("m.category = %s")
+            params.append(category)
+
+        query = f"""
+        SELECT d.dish_id, m.dish_name, m.category,
+               SUM(d.quantity) AS quantity,
+               SUM(d.revenue) AS revenue,
+               SUM(d.order_lines) AS orders
+        FROM {dish_sales_table(include_archived)} d
+        JOIN Menu m ON m.dish_id = d.dish_id
         """
-        cursor = mysql.connection.cursor()
-        cursor.execute(query)
-        result = cursor.fetchall()
-        cursor.close()
-        return jsonify(result)
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += f" GROUP BY d.dish_id, m.dish_name, m.category ORDER BY {POPULAR_DISHES_ORDER[by]} DESC, d.dish_id LIMIT %s"
+        params.append(k)
+
+        result = yield Query(query, tuple(params), dictionary=True)
+
+        return jsonify({'popular_dishes': result, 'from': date_from, 'to': date_to, 'by': by})
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -54,6 +202,7 @@ def popular_dishes():
 # Route 3: Get Pending Orders with Dish Names and Quantities
 @analytics_bp.route('/pending_orders_details', methods=['GET'])
 @jwt_required()
+@plan_view
 def pending_orders_details():
     try:
         # SQL Query to get pending orders with dish names and quantities
@@ -68,10 +217,7 @@ def pending_orders_details():
         WHERE o.order_status = 'Pending'
         ORDER BY o.order_id;
         """
-        cursor = mysql.connection.cursor()
-        cursor.execute(query)
-        result = cursor.fetchall()
-        cursor.close()
+        result = yield Query(query)
 
         # Return result
         return jsonify(result)
@@ -80,37 +226,84 @@ def pending_orders_details():
         return jsonify({'error': str(e)}), 500
 
 # Route: Customers Who Spent Above Average
+# Served from the Customer_Spending rollup: the average (or percentile) is
+# read from the same per-customer totals the rows come from, so no request
+# aggregates Orders.
+#   no parameters        -> every customer above the average as [customer_name, total_spent]
+#   ?above_percentile=P  -> customers who spent more than the P-th percentile (0 <= P < 100)
+#   ?limit=&after=       -> one page; after is the next_cursor of the previous page
+#   ?include_archived=1 with any of them -> archived orders count too
 @analytics_bp.route('/above_average_spenders', methods=['GET'])
 @jwt_required()
+@plan_view
 def above_average_spenders():
+    include_archived, error = get_include_archived_arg()
+    if error:
+        return jsonify({'msg': error}), 400
+    spending = spending_table(include_archived)
+
+    if not any(arg in request.args for arg in ('above_percentile', 'limit', 'after')):
+        try:
+            query = f"""
+            SELECT c.name AS customer_name,
+                   cs.total_spent
+            FROM {spending} cs
+            JOIN Customers c ON c.customer_id = cs.customer_id
+            WHERE cs.order_count > 0
+              AND cs.total_spent > (SELECT AVG(total_spent) FROM {spending} s WHERE order_count > 0)
+            ORDER BY cs.total_spent DESC, cs.customer_id DESC;
+            """
+            result = yield Query(query)
+
+            return jsonify(result)
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
+
+    percentile = request.args.get('above_percentile')
+    if percentile is not None:
+        try:
+            percentile = float(percentile)
+        except ValueError:
+            return jsonify({'msg': 'above_percentile must be a number from 0 to 100 (exclusive)'}), 400
+        if not 0 <= percentile < 100:
+            return jsonify({'msg': 'above_percentile must be a number from 0 to 100 (exclusive)'}), 400
+
+    limit, error = get_limit_arg()
+    if error:
+        return jsonify({'msg': error}), 400
+    after = request.args.get('after')
+    if after is not None:
+        after = decode_cursor(after, 2)
+        if after is None:
+            return jsonify({'msg': 'after must be a next_cursor from a previous page'}), 400
+
     try:
-        query = """
-        SELECT c.name AS customer_name, 
-               total_spent
-        FROM (
-            SELECT r.customer_id, 
-                   SUM(o.total_amount) AS total_spent
-            FROM Reservations r
-            JOIN Orders o ON r.reservation_id = o.reservation_id
-            GROUP BY r.customer_id
-        ) AS spending
-        JOIN Customers c ON c.customer_id = spending.customer_id
-        WHERE spending.total_spent > (
-            SELECT AVG(total_spent) 
-            FROM (
-                SELECT SUM(o.total_amount) AS total_spent
-                FROM Reservations r
-                JOIN Orders o ON r.reservation_id = o.reservation_id
-                GROUP BY r.customer_id
-            ) AS avg_spending
-        );
-        """
-        cursor = mysql.connection.cursor()
-        cursor.execute(query)
-        result = cursor.fetchall()
-        cursor.close()
+        customers, average = yield Query(
+            f"SELECT COUNT(*), AVG(total_spent) FROM {spending} s WHERE order_count > 0", fetch='one'
+        )
 
-        return jsonify(result)
+        threshold = average
+        if percentile is not None and customers:
+            # Nearest-rank percentile, read off idx_spending_total
+            rank = max(math.ceil(percentile / 100 * customers), 1)
+            row = yield Query(
+                f"SELECT total_spent FROM {spending} s WHERE order_count > 0 "
+                "ORDER BY total_spent LIMIT 1 OFFSET %s",
+                (rank - 1,),
+                fetch='one',
+            )
+            threshold = row[0]
 
+        rows, next_cursor = [], None
+        if threshold is not None:
+            rows, next_cursor = yield from _spending_page(limit, after, threshold, include_archived)
+
+        return jsonify({
+            'above_average_spenders': rows,
+            'average': average,
+            'threshold': threshold,
+            'above_percentile': percentile,
+            'next_cursor': next_cursor,
+        })
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
\ No newline at end of file
+        return jsonify({'error': str(e)}), 500
@@ -1,7 +1,13 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from app.models.db import mysql
-from MySQLdb.cursors import DictCursor
+from app.models.db import db
+from app.models import repository
+from app.services.cache import entity_cache
+from app.services.kitchen_feed import kitchen_feed
+from app.services.availability import availability
+from app.services import rollups
+from app.services.pagination import get_fields_arg, get_page_args
+from app.services.patching import get_patch_args
 
 # Blueprint for customer operations
 customer_bp = Blueprint('customer', __name__)
@@ -33,19 +39,15 @@ def add_customer():
     contact_details = data['contact_details']
 
     try:
-        cursor = mysql.connection.cursor()
-        cursor.execute(
-            "INSERT INTO Customers (name, contact_details) VALUES (%s, %s)",
-            (name, contact_details)
-        )
-        mysql.connection.commit()
-        cursor.close()
+        customer_id = repository.insert('Customers', {'name': name, 'contact_details': contact_details})
+        db.commit()
+        entity_cache.invalidate('Customers', customer_id)
         return jsonify({"msg": "Customer added successfully"}), 201
     except Exception as e:
         return jsonify({"msg": f"Database error: {str(e)}"}), 500
 
 
-# GET /api/customers - Fetch all customers
+# GET /api/customers?limit=&after= - Fetch one page of customers
 @customer_bp.route('', methods=['GET'])
 @jwt_required()
 def get_customers():
@@ -55,14 +57,18 @@ def get_customers():
     if not is_admin(current_user):
         return jsonify({"msg": "Unauthorized. Admin or user privileges required."}), 403
 
+    limit, after, error = get_page_args()
+    if error:
+        return jsonify({"msg": error}), 400
+
+    fields, error = get_fields_arg('Customers')
+    if error:
+        return jsonify({"msg": error}), 400
+
     try:
-        # Use DictCursor to fetch rows as dictionaries
-        cursor = mysql.connection.cursor(DictCursor)
-        cursor.execute("SELECT * FROM Customers")
-        customers = cursor.fetchall()
-        cursor.close()
+        customers, next_cursor = repository.list_page('Customers', limit, after, fields=fields)
 
-        return jsonify(customers), 200
+        return jsonify({"customers": customers, "next_cursor": next_cursor}), 200
     except Exception as e:
         return jsonify({"msg": f"Database error: {str(e)}"}), 500
 
@@ -77,12 +83,12 @@ def get_customer(customer_id):
     if not is_admin_or_user(current_user):
         return jsonify({"msg": "Unauthorized. Admin or user privileges required."}), 403
 
+    fields, error = get_fields_arg('Customers')
+    if error:
+        return jsonify({"msg": error}), 400
+
     try:
-        # Use DictCursor to fetch the customer as a dictionary
-        cursor = mysql.connection.cursor(DictCursor)
-        cursor.execute("SELECT * FROM Customers WHERE customer_id = %s", (customer_id,))
-        customer = cursor.fetchone()
-        cursor.close()
+        customer = entity_cache.get_by_id('Customers', customer_id, fields=fields)
 
         if not customer:
             return jsonify({"msg": "Customer not found"}), 404
@@ -92,8 +98,8 @@ def get_customer(customer_id):
         return jsonify({"msg": f"Database error: {str(e)}"}), 500
 
 
-# PUT /api/customers/<id> - Update a customer
-@customer_bp.route('/<int:customer_id>', methods=['PUT'])
+# PUT or PATCH /api/customers/<id> - Update a customer (only the fields given)
+@customer_bp.route('/<int:customer_id>', methods=['PUT', 'PATCH'])
 @jwt_required()
 def update_customer(customer_id):
     current_user = get_jwt_identity()
@@ -102,48 +108,21 @@ def update_customer(customer_id):
     if not is_admin(current_user):
         return jsonify({"msg": "Unauthorized. Admin privileges required."}), 403
 
-    data = request.get_json()
-
-    if not data:
-        return jsonify({"msg": "Request body is empty"}), 422
-
-    # Validate required fields
-    if 'name' not in data and 'contact_details' not in data:
-        return jsonify({"msg": "Missing required fields: name or contact_details"}), 422
+    values, error = get_patch_args('Customers')
+    if error:
+        return jsonify({"msg": error}), 422
 
     try:
-        cursor = mysql.connection.cursor(DictCursor)
-
-        # Fetch existing customer data
-        cursor.execute("SELECT * FROM Customers WHERE customer_id = %s", (customer_id,))
-        customer = cursor.fetchone()
-
-        if not customer:
+        if not repository.update_by_id('Customers', customer_id, values):
             return jsonify({"msg": "Customer not found"}), 404
-
-        # Extract fields from the incoming data or use existing ones
-        name = data.get('name', customer['name'])
-        contact_details = data.get('contact_details', customer['contact_details'])
-
-        # Update customer
-        cursor.execute(
-            """
-            UPDATE Customers
-            SET name = %s, contact_details = %s
-            WHERE customer_id = %s
-            """,
-            (name, contact_details, customer_id)
-        )
-        mysql.connection.commit()
+        db.commit()
+        entity_cache.invalidate('Customers', customer_id)
 
         return jsonify({"msg": "Customer updated successfully"}), 200
 
     except Exception as e:
         return jsonify({"msg": f"Database error: {str(e)}"}), 500
 
-    finally:
-        cursor.close()
-
 
 # DELETE /api/customers/<id> - Delete a customer
 @customer_bp.route('/<int:customer_id>', methods=['DELETE'])
@@ -157,19 +136,17 @@ def delete_customer(customer_id):
 
     try:
 
-        # Check if the customer exists, if not return 404
-        cursor = mysql.connection.cursor()
-        cursor.execute("SELECT * FROM Customers WHERE customer_id = %s", (customer_id,))
-        customer = cursor.fetchone()
-        cursor.close()
+        # Reservations, orders and items go with the customer (ON DELETE CASCADE)
+        sales = rollups.sales_of_customer(customer_id)
 
-        if not customer:
+        # Delete the customer; no row deleted means it did not exist
+        if not repository.delete_by_id('Customers', customer_id):
             return jsonify({"msg": "Customer not found"}), 404
-
-        cursor = mysql.connection.cursor()
-        cursor.execute("DELETE FROM Customers WHERE customer_id = %s", (customer_id,))
-        mysql.connection.commit()
-        cursor.close()
+        rollups.add_dish_sales(sales, -1)
+        db.commit()
+        entity_cache.invalidate('Customers', customer_id, cascade=True)
+        kitchen_feed.reload()
+        availability.reset()
 
         return jsonify({"msg": "Customer deleted successfully"}), 200
     except Exception as e:
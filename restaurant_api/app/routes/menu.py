@@ -1,6 +1,13 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, Response, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from app.models.db import mysql
+from app.models.db import db
+from app.models import repository
+from app.services.cache import entity_cache
+from app.services.kitchen_feed import kitchen_feed
+from app.services.filtering import get_filter_args, get_sort_arg
+from app.services.menu_snapshot import menu_snapshot
+from app.services.pagination import get_fields_arg, get_page_args
+from app.services.patching import get_patch_args
 
 # -------------------- MENU ENDPOINTS --------------------
 menu_bp = Blueprint('menu', __name__)
@@ -24,16 +31,13 @@ def add_dish():
         return jsonify({'msg': 'Missing required fields: dish_name, category, price'}), 422
 
     try:
-        query = "INSERT INTO Menu (dish_name, category, price) VALUES (%s, %s, %s)"
-        values = (data['dish_name'], data['category'], data['price'])
-        cursor = mysql.connection.cursor()
-        cursor.execute(query, values)
-        mysql.connection.commit()
+        values = {'dish_name': data['dish_name'], 'category': data['category'], 'price': data['price']}
+        repository.insert('Menu', values)
+        db.commit()
+        menu_snapshot.invalidate()
         return jsonify({'msg': 'Dish added successfully!'}), 201
     except Exception as e:
         return jsonify({'msg': f'Database error: {str(e)}'}), 500
-    finally:
-        cursor.close()
 
 
 # Get a specific dish by name
@@ -44,21 +48,22 @@ def get_dish(dish_name):
     if not is_admin_or_user(current_user):
         return jsonify({'msg': 'Unauthorized. Admin or customer privileges required.'}), 403
 
+    fields, error = get_fields_arg('Menu')
+    if error:
+        return jsonify({'msg': error}), 400
+
     try:
-        query = "SELECT * FROM Menu WHERE dish_name = %s"
-        cursor = mysql.connection.cursor()
-        cursor.execute(query, (dish_name,))
-        dish = cursor.fetchone()
+        dish = repository.find_one('Menu', fields=fields, dish_name=dish_name)
         if not dish:
             return jsonify({'msg': 'Dish not found.'}), 404
         return jsonify({'dish': dish}), 200
     except Exception as e:
         return jsonify({'msg': f'Database error: {str(e)}'}), 500
-    finally:
-        cursor.close()
 
 
-# Get all menu items
+# Get one page of menu items (?limit=&after=&fields= plus the filters and
+# sort of app/services/filtering.py). Without parameters the prebuilt
+# snapshot is served, with its ETag
 @menu_bp.route('', methods=['GET'])
 @jwt_required()
 def get_menu():
@@ -66,16 +71,41 @@ def get_menu():
     if not is_admin_or_user(current_user):
         return jsonify({'msg': 'Unauthorized. Admin or customer privileges required.'}), 403
 
+    where, error = get_filter_args('Menu')
+    if error:
+        return jsonify({'msg': error}), 400
+
+    # Plain GET: cached bytes, or 304 if the client already has them
+    if not where and not {'limit', 'after', 'fields', 'sort'} & request.args.keys():
+        try:
+            body, etag = menu_snapshot.get()
+        except Exception as e:
+            return jsonify({'msg': f'Database error: {str(e)}'}), 500
+
+        if request.if_none_match.contains(etag):
+            response = Response(status=304)
+        else:
+            response = Response(body, mimetype='application/json')
+        response.set_etag(etag)
+        return response
+
+    sort, error = get_sort_arg('Menu')
+    if error:
+        return jsonify({'msg': error}), 400
+
+    limit, after, error = get_page_args(sort)
+    if error:
+        return jsonify({'msg': error}), 400
+
+    fields, error = get_fields_arg('Menu')
+    if error:
+        return jsonify({'msg': error}), 400
+
     try:
-        query = "SELECT * FROM Menu"
-        cursor = mysql.connection.cursor()
-        cursor.execute(query)
-        menu = cursor.fetchall()
-        return jsonify({'menu': menu}), 200
+        menu, next_cursor = repository.list_page('Menu', limit, after, dictionary=False, fields=fields, where=where, sort=sort)
+        return jsonify({'menu': menu, 'next_cursor': next_cursor}), 200
     except Exception as e:
         return jsonify({'msg': f'Database error: {str(e)}'}), 500
-    finally:
-        cursor.close()
 
 
 # Delete a dish
@@ -88,94 +118,41 @@ def delete_dish(dish_id):
 
     try:
 
-        # check if the dish_id exists in the database, if not return an error
-        cursor = mysql.connection.cursor()
-        cursor.execute("SELECT * FROM Menu WHERE dish_id = %s", (dish_id,))
-        dish = cursor.fetchone()
-        cursor.close()
-
-        if not dish:
-            return jsonify({'msg': 'Dish not found.'}), 404
-    
-
-        query = "DELETE FROM Menu WHERE dish_id = %s"
-        cursor = mysql.connection.cursor()
-        cursor.execute(query, (dish_id,))
-        mysql.connection.commit()
-        if cursor.rowcount == 0:
+        # delete the dish; no row deleted means the dish_id does not exist
+        if not repository.delete_by_id('Menu', dish_id):
             return jsonify({'msg': 'Dish not found.'}), 404
+        db.commit()
+        menu_snapshot.invalidate()
+        # Order_Items rows for this dish went with it (ON DELETE CASCADE)
+        entity_cache.invalidate('Menu', dish_id, cascade=True)
+        kitchen_feed.reload()
         return jsonify({'msg': 'Dish deleted successfully!'}), 200
     except Exception as e:
         return jsonify({'msg': f'Database error: {str(e)}'}), 500
-    finally:
-        cursor.close()
 
 
-# Update a dish
-@menu_bp.route('/<int:dish_id>', methods=['PUT'])
+# PUT or PATCH /api/menu/<id> - Update a dish (only the fields given)
+@menu_bp.route('/<int:dish_id>', methods=['PUT', 'PATCH'])
 @jwt_required()
 def update_dish(dish_id):
     current_user = get_jwt_identity()
     if not is_admin(current_user):
         return jsonify({'msg': 'Unauthorized. Admin privileges required.'}), 403
 
-    data = request.get_json()
-    if not data:
-        return jsonify({'msg': 'Request body is empty.'}), 422
-
-    # if data is empty, return an error
-    if 'dish_name' not in data and 'category' not in data and 'price' not in data:
-        return jsonify({'msg': 'Missing required fields: dish_name, category, price'}), 422
-
-    if not isinstance(data['price'], (int, float)) or data['price'] < 0:
-        return jsonify({'msg': 'Price must be a non-negative number.'}), 422
-    
-    # check if the dish_id exists in the database, if not return an error
-    cursor = mysql.connection.cursor()
-    cursor.execute("SELECT * FROM Menu WHERE dish_id = %s", (dish_id,))
-    dish = cursor.fetchone()
-    cursor.close()
-
-    if not dish:
-        return jsonify({'msg': 'Dish not found.'}), 404
-    
-
-    dish_name, category, price = None, None, None
-
-    if 'dish_name' in data:
-        dish_name = data['dish_name']
-    else:
-        cursor = mysql.connection.cursor()
-        cursor.execute("SELECT dish_name FROM Menu WHERE dish_id = %s", (dish_id,))
-        dish_name = cursor.fetchone()[0]
-        cursor.close()
-    if 'category' in data:
-        category = data['category']
-    else:
-        cursor = mysql.connection.cursor()
-        cursor.execute("SELECT category FROM Menu WHERE dish_id = %s", (dish_id,))
-        category = cursor.fetchone()[0]
-        cursor.close()
-    if 'price' in data:
-        price = data['price']
-    else:
-        cursor = mysql.connection.cursor()
-        cursor.execute("SELECT price FROM Menu WHERE dish_id = %s", (dish_id,))
-        price = cursor.fetchone()[0]
-        cursor.close()   
-        
+    values, error = get_patch_args('Menu')
+    if error:
+        return jsonify({'msg': error}), 422
 
     try:
-        cursor = mysql.connection.cursor()
-
-        query = "UPDATE Menu SET dish_name = %s, category = %s, price = %s WHERE dish_id = %s"
-        values = (dish_name, category, price, dish_id)
-        cursor.execute(query, values)
+        if not repository.update_by_id('Menu', dish_id, values):
+            return jsonify({'msg': 'Dish not found.'}), 404
 
-        mysql.connection.commit()
+        db.commit()
+        menu_snapshot.invalidate()
+        # Kitchen displays show dish names
+        if 'dish_name' in values:
+            kitchen_feed.reload()
         return jsonify({'msg': 'Dish updated successfully!'}), 200
     except Exception as e:
-        mysql.connection.rollback()
+        db.rollback()
         return jsonify({'msg': f'Database error: {str(e)}'}), 500
-    finally:
-        cursor.close()
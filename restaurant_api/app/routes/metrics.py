@@ -0,0 +1,25 @@
+import hmac
+from flask import Blueprint, Response, current_app, jsonify, request
+from app.services.metrics import metrics
+
+# Blueprint for the Prometheus scrape endpoint (see app/services/metrics.py)
+metrics_bp = Blueprint('metrics', __name__)
+
+# GET /metrics - Per-endpoint request and database metrics in the Prometheus
+# text format. With METRICS_TOKEN set the scraper must send
+# "Authorization: Bearer <METRICS_TOKEN>".
+@metrics_bp.route('/metrics', methods=['GET'])
+def get_metrics():
+    if not current_app.config['METRICS_ENABLED']:
+        return jsonify({"msg": "Metrics are disabled"}), 404
+
+    token = current_app.config['METRICS_TOKEN']
+    if token and not hmac.compare_digest(request.headers.get('Authorization', ''), f"Bearer {token}"):
+        return jsonify({"msg": "Invalid or missing metrics token"}), 401
+
+    try:
+        body = metrics.render()
+    except OSError as e:
+        return jsonify({"msg": f"Could not read metrics: {str(e)}"}), 500
+
+    return Response(body, content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -1,7 +1,16 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, current_app, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from app.models.db import mysql
-from flask_mysqldb import MySQLdb
+from app.models.db import db
+from app.models import repository
+from app.models.plan import plan_view
+from app.services.cache import entity_cache
+from app.services.kitchen_feed import kitchen_feed
+from app.services import rollups
+from app.services.filtering import get_filter_args, get_sort_arg
+from app.services.pagination import get_fields_arg, get_page_args
+from app.services.patching import get_patch_args
+from app.services.export import EXPORT_FORMATS, stream_export
+from app.services.bulk import read_bulk_rows, validate_rows
 
 # Blueprint for orders
 orders_bp = Blueprint('orders', __name__)
@@ -13,7 +22,8 @@ def is_admin(user):
 def is_admin_or_user(user):
     return user.get('role') in ['admin', 'user']
 
-# POST /api/orders - Add a new order
+# POST /api/orders - Add a new order, optionally with its items
+# ({"items": [{"dish_id", "quantity"}, ...]}) in the same transaction
 @orders_bp.route('/add', methods=['POST'])
 @jwt_required()
 def add_order():
@@ -34,22 +44,69 @@ def add_order():
     else:
         order_status = "Pending"
 
+    # Validate nested items before writing anything
+    items = data.get('items', [])
+    if not isinstance(items, list):
+        return jsonify({"msg": "items must be a JSON array"}), 422
+    max_rows = current_app.config['BULK_MAX_ROWS']
+    if len(items) > max_rows:
+        return jsonify({"msg": f"Too many items. At most {max_rows} per order"}), 413
+    item_rows, errors = validate_rows(items, ['dish_id', 'quantity'])
+    if errors:
+        return jsonify({"msg": "Invalid items, nothing was inserted", "errors": errors}), 422
+
+    try:
+        order_id = repository.insert('Orders', {
+            'reservation_id': reservation_id,
+            'total_amount': total_amount,
+            'order_status': order_status,
+        })
+        rollups.order_added(reservation_id, total_amount)
+        item_ids = repository.insert_many('Order_Items', [{'order_id': order_id, **row} for row in item_rows])
+        rollups.order_items_added(item_ids)
+        db.commit()
+        entity_cache.invalidate('Orders', order_id)
+        entity_cache.invalidate_many('Order_Items', item_ids)
+        kitchen_feed.orders_changed([order_id])
+
+        response = {"msg": "Order added successfully", "order_id": order_id}
+        if items:
+            response["items"] = [{"index": index, "order_item_id": item_id} for index, item_id in enumerate(item_ids)]
+        return jsonify(response), 201
+    except Exception as e:
+        db.rollback()
+        return jsonify({"msg": f"Database error: {str(e)}"}), 500
+
+# POST /api/orders/bulk - Add many orders in one transaction
+@orders_bp.route('/bulk', methods=['POST'])
+@jwt_required()
+def add_orders_bulk():
+    current_user = get_jwt_identity()
+
+    # Only admin can create orders
+    if not is_admin(current_user):
+        return jsonify({"msg": "Unauthorized. Admin privileges required."}), 403
+
+    rows, error = read_bulk_rows(['reservation_id', 'total_amount'], {'order_status': 'Pending'})
+    if error:
+        return error
+
     try:
-        cursor = mysql.connection.cursor()
-        cursor.execute(
-            "INSERT INTO Orders (reservation_id, total_amount, order_status) VALUES (%s, %s, %s)",
-            (reservation_id, total_amount, order_status)
-        )
-        
-        mysql.connection.commit()
-        cursor.close()
-        return jsonify({"msg": "Order added successfully"}), 201
+        ids = repository.insert_many('Orders', rows)
+        rollups.orders_added(rows)
+        db.commit()
+        entity_cache.invalidate_many('Orders', ids)
+        kitchen_feed.orders_changed(ids)
+        results = [{"index": index, "order_id": row_id} for index, row_id in enumerate(ids)]
+        return jsonify({"msg": f"{len(ids)} orders added successfully", "results": results}), 201
     except Exception as e:
+        db.rollback()
         return jsonify({"msg": f"Database error: {str(e)}"}), 500
 
-# GET /api/orders - Fetch all orders
+# GET /api/orders?limit=&after= - Fetch one page of orders
 @orders_bp.route('', methods=['GET'])
 @jwt_required()
+@plan_view
 def get_orders():
     current_user = get_jwt_identity()
 
@@ -57,20 +114,65 @@ def get_orders():
     if not is_admin_or_user(current_user):
         return jsonify({"msg": "Unauthorized. Admin or user privileges required."}), 403
 
+    sort, error = get_sort_arg('Orders')
+    if error:
+        return jsonify({"msg": error}), 400
+
+    limit, after, error = get_page_args(sort)
+    if error:
+        return jsonify({"msg": error}), 400
+
+    fields, error = get_fields_arg('Orders')
+    if error:
+        return jsonify({"msg": error}), 400
+
+    where, error = get_filter_args('Orders')
+    if error:
+        return jsonify({"msg": error}), 400
+
     try:
-        # Use DictCursor to fetch rows as dictionaries
-        cursor = mysql.connection.cursor(MySQLdb.cursors.DictCursor)
-        cursor.execute("SELECT * FROM Orders")
-        orders = cursor.fetchall()
-        cursor.close()
+        orders, next_cursor = yield from repository.list_page_plan('Orders', limit, after, fields=fields, where=where, sort=sort)
+
+        return jsonify({"orders": orders, "next_cursor": next_cursor}), 200
+    except Exception as e:
+        return jsonify({"msg": f"Database error: {str(e)}"}), 500
+
+# GET /api/orders/export?format=ndjson|csv - Stream every order
+@orders_bp.route('/export', methods=['GET'])
+@jwt_required()
+def export_orders():
+    current_user = get_jwt_identity()
 
-        return jsonify(orders), 200
+    # Only admin can export whole tables
+    if not is_admin(current_user):
+        return jsonify({"msg": "Unauthorized. Admin privileges required."}), 403
+
+    fmt = request.args.get('format', 'ndjson')
+    if fmt not in EXPORT_FORMATS:
+        return jsonify({"msg": f"Invalid format. Allowed values: {', '.join(EXPORT_FORMATS)}"}), 400
+
+    return stream_export('Orders', fmt)
+
+# GET /api/orders/pending/stream - Server-Sent Events feed of the pending
+# orders for kitchen displays (see app/services/kitchen_feed.py)
+@orders_bp.route('/pending/stream', methods=['GET'])
+@jwt_required()
+def stream_pending_orders():
+    current_user = get_jwt_identity()
+
+    # Allow access only to admin or user roles
+    if not is_admin_or_user(current_user):
+        return jsonify({"msg": "Unauthorized. Admin or user privileges required."}), 403
+
+    try:
+        return kitchen_feed.stream()
     except Exception as e:
         return jsonify({"msg": f"Database error: {str(e)}"}), 500
 
 # GET /api/orders/<id> - Fetch a specific order
 @orders_bp.route('/<int:order_id>', methods=['GET'])
 @jwt_required()
+@plan_view
 def get_order(order_id):
     current_user = get_jwt_identity()
 
@@ -78,12 +180,12 @@ def get_order(order_id):
     if not is_admin_or_user(current_user):
         return jsonify({"msg": "Unauthorized. Admin or user privileges required."}), 403
 
+    fields, error = get_fields_arg('Orders')
+    if error:
+        return jsonify({"msg": error}), 400
+
     try:
-        # Use DictCursor to fetch the order as a dictionary
-        cursor = mysql.connection.cursor(MySQLdb.cursors.DictCursor)
-        cursor.execute("SELECT * FROM Orders WHERE order_id = %s", (order_id,))
-        order = cursor.fetchone()
-        cursor.close()
+        order = yield from entity_cache.get_by_id_plan('Orders', order_id, fields=fields)
 
         if not order:
             return jsonify({"msg": "Order not found"}), 404
@@ -92,8 +194,8 @@ def get_order(order_id):
     except Exception as e:
         return jsonify({"msg": f"Database error: {str(e)}"}), 500
 
-# PUT /api/orders/<id> - Update an order
-@orders_bp.route('/<int:order_id>', methods=['PUT'])
+# PUT or PATCH /api/orders/<id> - Update an order (only the fields given)
+@orders_bp.route('/<int:order_id>', methods=['PUT', 'PATCH'])
 @jwt_required()
 def update_order(order_id):
     current_user = get_jwt_identity()
@@ -102,42 +204,35 @@ def update_order(order_id):
     if not is_admin(current_user):
         return jsonify({"msg": "Unauthorized. Admin privileges required."}), 403
 
-    data = request.get_json()
-
-    if not data:
-        return jsonify({"msg": "Request body is empty"}), 422
+    values, error = get_patch_args('Orders')
+    if error:
+        return jsonify({"msg": error}), 422
 
     try:
-        cursor = mysql.connection.cursor(MySQLdb.cursors.DictCursor)
-
-        # Fetch existing order data
-        cursor.execute("SELECT * FROM Orders WHERE order_id = %s", (order_id,))
-        order = cursor.fetchone()
+        # The spending rollup needs the old amount and reservation, read with
+        # the row locked so a concurrent update cannot apply the same delta;
+        # a status change (the kitchen's everyday update) is the UPDATE alone
+        order = None
+        if 'reservation_id' in values or 'total_amount' in values:
+            order = repository.get_by_id('Orders', order_id, for_update=True)
+            if not order:
+                return jsonify({"msg": "Order not found"}), 404
 
-        if not order:
+        if not repository.update_by_id('Orders', order_id, values):
             return jsonify({"msg": "Order not found"}), 404
-
-        # Extract fields from the incoming data or use existing ones
-        reservation_id = data.get('reservation_id', order['reservation_id'])
-        total_amount = data.get('total_amount', order['total_amount'])
-        order_status = data.get('order_status', order['order_status'])
-
-        # Update the order
-        cursor.execute(
-            """
-            UPDATE Orders
-            SET reservation_id = %s, total_amount = %s, order_status = %s
-            WHERE order_id = %s
-            """,
-            (reservation_id, total_amount, order_status, order_id)
-        )
-        mysql.connection.commit()
+        if order:
+            rollups.order_updated(
+                order,
+                values.get('reservation_id', order['reservation_id']),
+                values.get('total_amount', order['total_amount']),
+            )
+        db.commit()
+        entity_cache.invalidate('Orders', order_id)
+        kitchen_feed.orders_changed([order_id])
 
         return jsonify({"msg": "Order updated successfully"}), 200
     except Exception as e:
         return jsonify({"msg": f"Database error: {str(e)}"}), 500
-    finally:
-        cursor.close()
 
 # DELETE /api/orders/<id> - Delete an order
 @orders_bp.route('/<int:order_id>', methods=['DELETE'])
@@ -150,19 +245,24 @@ def delete_order(order_id):
         return jsonify({"msg": "Unauthorized. Admin privileges required."}), 403
 
     try:
-        # check if order exists
-        cursor = mysql.connection.cursor(MySQLdb.cursors.DictCursor)
-        cursor.execute("SELECT * FROM Orders WHERE order_id = %s", (order_id,))
-        order = cursor.fetchone()
-
+        # Locked until the commit, so a concurrent delete waits and then finds nothing
+        order = repository.get_by_id('Orders', order_id, for_update=True)
         if not order:
             return jsonify({"msg": "Order not found"}), 404
-        
-        # delete the order
-        cursor.execute("DELETE FROM Orders WHERE order_id = %s", (order_id,))
-        mysql.connection.commit()
-        cursor.close()
-        
+        customer_id = rollups.customer_of_reservation(order['reservation_id'])
+
+        # Its items go with it (ON DELETE CASCADE)
+        sales = rollups.sales_of_order(order_id)
+
+        # No row deleted means another request deleted it first
+        if not repository.delete_by_id('Orders', order_id):
+            return jsonify({"msg": "Order not found"}), 404
+        rollups.refresh_customer_spending([customer_id])
+        rollups.add_dish_sales(sales, -1)
+        db.commit()
+        entity_cache.invalidate('Orders', order_id, cascade=True)
+        kitchen_feed.orders_changed([order_id])
+
         return jsonify({"msg": "Order deleted successfully"}), 200
     except Exception as e:
         return jsonify({"msg": f"Database error: {str(e)}"}), 500
@@ -1,7 +1,16 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from app.models.db import mysql
-from MySQLdb.cursors import DictCursor
+from app.models.db import db
+from app.models import repository
+from app.models.plan import plan_view
+from app.services.cache import entity_cache
+from app.services.kitchen_feed import kitchen_feed
+from app.services import rollups
+from app.services.filtering import get_filter_args, get_sort_arg
+from app.services.pagination import get_fields_arg, get_page_args
+from app.services.patching import get_patch_args
+from app.services.export import EXPORT_FORMATS, stream_export
+from app.services.bulk import read_bulk_rows
 
 # Blueprint for order items
 order_items_bp = Blueprint('order_items', __name__)
@@ -33,20 +42,45 @@ def add_order_item():
     quantity = data['quantity']
 
     try:
-        cursor = mysql.connection.cursor()
-        cursor.execute(
-            "INSERT INTO Order_Items (order_id, dish_id, quantity) VALUES (%s, %s, %s)",
-            (order_id, dish_id, quantity)
-        )
-        mysql.connection.commit()
-        cursor.close()
+        order_item_id = repository.insert('Order_Items', {'order_id': order_id, 'dish_id': dish_id, 'quantity': quantity})
+        rollups.order_items_added([order_item_id])
+        db.commit()
+        entity_cache.invalidate('Order_Items', order_item_id)
+        kitchen_feed.orders_changed([order_id])
         return jsonify({"msg": "Order item added successfully"}), 201
     except Exception as e:
         return jsonify({"msg": f"Database error: {str(e)}"}), 500
 
-# GET /api/order_items - Fetch all order items
+# POST /api/order_items/bulk - Add many order items in one transaction
+@order_items_bp.route('/bulk', methods=['POST'])
+@jwt_required()
+def add_order_items_bulk():
+    current_user = get_jwt_identity()
+
+    # Only admin can create order items
+    if not is_admin(current_user):
+        return jsonify({"msg": "Unauthorized. Admin privileges required."}), 403
+
+    rows, error = read_bulk_rows(['order_id', 'dish_id', 'quantity'])
+    if error:
+        return error
+
+    try:
+        ids = repository.insert_many('Order_Items', rows)
+        rollups.order_items_added(ids)
+        db.commit()
+        entity_cache.invalidate_many('Order_Items', ids)
+        kitchen_feed.orders_changed(row['order_id'] for row in rows)
+        results = [{"index": index, "order_item_id": row_id} for index, row_id in enumerate(ids)]
+        return jsonify({"msg": f"{len(ids)} order items added successfully", "results": results}), 201
+    except Exception as e:
+        db.rollback()
+        return jsonify({"msg": f"Database error: {str(e)}"}), 500
+
+# GET /api/order_items?limit=&after= - Fetch one page of order items
 @order_items_bp.route('', methods=['GET'])
 @jwt_required()
+@plan_view
 def get_order_items():
     current_user = get_jwt_identity()
 
@@ -54,18 +88,48 @@ def get_order_items():
     if not is_admin_or_user(current_user):
         return jsonify({"msg": "Unauthorized. Admin or user privileges required."}), 403
 
+    sort, error = get_sort_arg('Order_Items')
+    if error:
+        return jsonify({"msg": error}), 400
+
+    limit, after, error = get_page_args(sort)
+    if error:
+        return jsonify({"msg": error}), 400
+
+    fields, error = get_fields_arg('Order_Items')
+    if error:
+        return jsonify({"msg": error}), 400
+
+    where, error = get_filter_args('Order_Items')
+    if error:
+        return jsonify({"msg": error}), 400
+
     try:
-        cursor = mysql.connection.cursor(DictCursor)
-        cursor.execute("SELECT * FROM Order_Items")
-        order_items = cursor.fetchall()
-        cursor.close()
-        return jsonify(order_items), 200
+        order_items, next_cursor = yield from repository.list_page_plan('Order_Items', limit, after, fields=fields, where=where, sort=sort)
+        return jsonify({"order_items": order_items, "next_cursor": next_cursor}), 200
     except Exception as e:
         return jsonify({"msg": f"Database error: {str(e)}"}), 500
 
+# GET /api/order_items/export?format=ndjson|csv - Stream every order item
+@order_items_bp.route('/export', methods=['GET'])
+@jwt_required()
+def export_order_items():
+    current_user = get_jwt_identity()
+
+    # Only admin can export whole tables
+    if not is_admin(current_user):
+        return jsonify({"msg": "Unauthorized. Admin privileges required."}), 403
+
+    fmt = request.args.get('format', 'ndjson')
+    if fmt not in EXPORT_FORMATS:
+        return jsonify({"msg": f"Invalid format. Allowed values: {', '.join(EXPORT_FORMATS)}"}), 400
+
+    return stream_export('Order_Items', fmt)
+
 # GET /api/order_items/<id> - Fetch a specific order item
 @order_items_bp.route('/<int:order_item_id>', methods=['GET'])
 @jwt_required()
+@plan_view
 def get_order_item(order_item_id):
     current_user = get_jwt_identity()
 
@@ -73,11 +137,12 @@ def get_order_item(order_item_id):
     if not is_admin_or_user(current_user):
         return jsonify({"msg": "Unauthorized. Admin or user privileges required."}), 403
 
+    fields, error = get_fields_arg('Order_Items')
+    if error:
+        return jsonify({"msg": error}), 400
+
     try:
-        cursor = mysql.connection.cursor(DictCursor)
-        cursor.execute("SELECT * FROM Order_Items WHERE order_item_id = %s", (order_item_id,))
-        order_item = cursor.fetchone()
-        cursor.close()
+        order_item = yield from entity_cache.get_by_id_plan('Order_Items', order_item_id, fields=fields)
 
         if not order_item:
             return jsonify({"msg": "Order item not found"}), 404
@@ -86,8 +151,8 @@ def get_order_item(order_item_id):
     except Exception as e:
         return jsonify({"msg": f"Database error: {str(e)}"}), 500
 
-# PUT /api/order_items/<id> - Update an order item
-@order_items_bp.route('/<int:order_item_id>', methods=['PUT'])
+# PUT or PATCH /api/order_items/<id> - Update an order item (only the fields given)
+@order_items_bp.route('/<int:order_item_id>', methods=['PUT', 'PATCH'])
 @jwt_required()
 def update_order_item(order_item_id):
     current_user = get_jwt_identity()
@@ -96,37 +161,32 @@ def update_order_item(order_item_id):
     if not is_admin(current_user):
         return jsonify({"msg": "Unauthorized. Admin privileges required."}), 403
 
-    data = request.get_json()
-
-    if not data:
-        return jsonify({"msg": "Request body is empty"}), 422
+    values, error = get_patch_args('Order_Items')
+    if error:
+        return jsonify({"msg": error}), 422
 
     try:
-        cursor = mysql.connection.cursor(DictCursor)
-
-        # Fetch existing order item
-        cursor.execute("SELECT * FROM Order_Items WHERE order_item_id = %s", (order_item_id,))
-        order_item = cursor.fetchone()
+        # The kitchen feed needs the order the item was on. The row stays
+        # locked until the commit, so the sales taken out below are the ones
+        # this update replaces.
+        order_item = repository.get_by_id('Order_Items', order_item_id, fields=['order_item_id', 'order_id'], for_update=True)
 
         if not order_item:
             return jsonify({"msg": "Order item not found"}), 404
 
-        # Extract fields or use existing values
-        order_id = data.get('order_id', order_item['order_id'])
-        dish_id = data.get('dish_id', order_item['dish_id'])
-        quantity = data.get('quantity', order_item['quantity'])
-
-        # Update the order item
-        cursor.execute(
-            """
-            UPDATE Order_Items
-            SET order_id = %s, dish_id = %s, quantity = %s
-            WHERE order_item_id = %s
-            """,
-            (order_id, dish_id, quantity, order_item_id)
-        )
-        mysql.connection.commit()
-        cursor.close()
+        # Take the old quantity/dish out of the sales rollup, then add the new ones
+        old_sales = rollups.sales_of_items([order_item_id])
+        if 'dish_id' in values:
+            # Priced again at the new dish's menu price
+            values['unit_price'] = None
+
+        repository.update_by_id('Order_Items', order_item_id, values)
+        rollups.add_dish_sales(old_sales, -1)
+        rollups.order_items_added([order_item_id])
+        db.commit()
+        entity_cache.invalidate('Order_Items', order_item_id)
+        # The item may have moved to another order
+        kitchen_feed.orders_changed([order_item['order_id'], values.get('order_id', order_item['order_id'])])
 
         return jsonify({"msg": "Order item updated successfully"}), 200
     except Exception as e:
@@ -143,21 +203,17 @@ def delete_order_item(order_item_id):
         return jsonify({"msg": "Unauthorized. Admin privileges required."}), 403
 
     try:
-        # check if order item exists
-        cursor = mysql.connection.cursor(DictCursor)
-        cursor.execute("SELECT * FROM Order_Items WHERE order_item_id = %s", (order_item_id,))
-        order_item = cursor.fetchone()
-        cursor.close()
-
+        order_item = repository.get_by_id('Order_Items', order_item_id, for_update=True)
         if not order_item:
             return jsonify({"msg": "Order item not found"}), 404
-        
-        cursor = mysql.connection.cursor()
-        cursor.execute("DELETE FROM Order_Items WHERE order_item_id = %s", (order_item_id,))
-        mysql.connection.commit()
-        cursor.close()
+        sales = rollups.sales_of_items([order_item_id])
+
+        repository.delete_by_id('Order_Items', order_item_id)
+        rollups.add_dish_sales(sales, -1)
+        db.commit()
+        entity_cache.invalidate('Order_Items', order_item_id, cascade=True)
+        kitchen_feed.orders_changed([order_item['order_id']])
 
-        
         return jsonify({"msg": "Order item deleted successfully"}), 200
     except Exception as e:
         return jsonify({"msg": f"Database error: {str(e)}"}), 500
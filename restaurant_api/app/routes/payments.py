@@ -1,7 +1,13 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from app.models.db import mysql
-from MySQLdb.cursors import DictCursor
+from app.models.db import db
+from app.models import repository
+from app.services.cache import entity_cache
+from app.services.filtering import get_filter_args, get_sort_arg
+from app.services.pagination import get_fields_arg, get_page_args
+from app.services.patching import get_patch_args
+from app.services.export import EXPORT_FORMATS, stream_export
+from app.services.bulk import read_bulk_rows
 
 payments_bp = Blueprint('payments', __name__)
 
@@ -28,19 +34,45 @@ def add_payment():
     if 'order_id' not in data or 'amount_paid' not in data or 'payment_method' not in data:
         return jsonify({"msg": "Missing required fields: order_id, amount_paid, payment_method"}), 422
 
-    query = "INSERT INTO Payments (order_id, amount_paid, payment_method) VALUES (%s, %s, %s)"
-    values = (data['order_id'], data['amount_paid'], data['payment_method'])
+    values = {
+        'order_id': data['order_id'],
+        'amount_paid': data['amount_paid'],
+        'payment_method': data['payment_method'],
+    }
 
     try:
-        cursor = mysql.connection.cursor()
-        cursor.execute(query, values)
-        mysql.connection.commit()
-        cursor.close()
+        payment_id = repository.insert('Payments', values)
+        db.commit()
+        entity_cache.invalidate('Payments', payment_id)
         return jsonify({"msg": "Payment added successfully!"}), 201
     except Exception as e:
         return jsonify({"msg": f"Database error: {str(e)}"}), 500
 
-# GET /api/payments - Get All Payments
+# POST /api/payments/bulk - Add many payments in one transaction
+@payments_bp.route('/bulk', methods=['POST'])
+@jwt_required()
+def add_payments_bulk():
+    current_user = get_jwt_identity()
+
+    # Only admin can create payments
+    if not is_admin(current_user):
+        return jsonify({"msg": "Unauthorized. Admin privileges required."}), 403
+
+    rows, error = read_bulk_rows(['order_id', 'amount_paid', 'payment_method'])
+    if error:
+        return error
+
+    try:
+        ids = repository.insert_many('Payments', rows)
+        db.commit()
+        entity_cache.invalidate_many('Payments', ids)
+        results = [{"index": index, "payment_id": row_id} for index, row_id in enumerate(ids)]
+        return jsonify({"msg": f"{len(ids)} payments added successfully", "results": results}), 201
+    except Exception as e:
+        db.rollback()
+        return jsonify({"msg": f"Database error: {str(e)}"}), 500
+
+# GET /api/payments?limit=&after= - Get one page of payments
 @payments_bp.route('', methods=['GET'])
 @jwt_required()
 def get_payments():
@@ -50,45 +82,63 @@ def get_payments():
     if not is_admin(current_user):
         return jsonify({"msg": "Unauthorized. Admin privileges required."}), 403
 
+    sort, error = get_sort_arg('Payments')
+    if error:
+        return jsonify({"msg": error}), 400
+
+    limit, after, error = get_page_args(sort)
+    if error:
+        return jsonify({"msg": error}), 400
+
+    fields, error = get_fields_arg('Payments')
+    if error:
+        return jsonify({"msg": error}), 400
+
+    where, error = get_filter_args('Payments')
+    if error:
+        return jsonify({"msg": error}), 400
+
     try:
-        cursor = mysql.connection.cursor(DictCursor)
-        cursor.execute("SELECT * FROM Payments")
-        payments = cursor.fetchall()
-        cursor.close()
-        return jsonify(payments), 200
+        payments, next_cursor = repository.list_page('Payments', limit, after, fields=fields, where=where, sort=sort)
+        return jsonify({"payments": payments, "next_cursor": next_cursor}), 200
     except Exception as e:
         return jsonify({"msg": f"Database error: {str(e)}"}), 500
 
-# PUT /api/payments/<payment_id> - Update a Payment
-@payments_bp.route('/<int:payment_id>', methods=['PUT'])
+# GET /api/payments/export?format=ndjson|csv - Stream every payment
+@payments_bp.route('/export', methods=['GET'])
 @jwt_required()
-def update_payment(payment_id):
+def export_payments():
     current_user = get_jwt_identity()
 
-    # Only admin can update payments
+    # Only admin can export whole tables
     if not is_admin(current_user):
         return jsonify({"msg": "Unauthorized. Admin privileges required."}), 403
 
-    data = request.get_json()
+    fmt = request.args.get('format', 'ndjson')
+    if fmt not in EXPORT_FORMATS:
+        return jsonify({"msg": f"Invalid format. Allowed values: {', '.join(EXPORT_FORMATS)}"}), 400
+
+    return stream_export('Payments', fmt)
+
+# PUT or PATCH /api/payments/<payment_id> - Update a Payment (only the fields given)
+@payments_bp.route('/<int:payment_id>', methods=['PUT', 'PATCH'])
+@jwt_required()
+def update_payment(payment_id):
+    current_user = get_jwt_identity()
 
-    if 'amount_paid' not in data or 'payment_method' not in data:
-        return jsonify({"msg": "Missing required fields: amount_paid, payment_method"}), 422
+    # Only admin can update payments
+    if not is_admin(current_user):
+        return jsonify({"msg": "Unauthorized. Admin privileges required."}), 403
 
-    query = "UPDATE Payments SET amount_paid = %s, payment_method = %s WHERE payment_id = %s"
-    values = (data['amount_paid'], data['payment_method'], payment_id)
+    values, error = get_patch_args('Payments')
+    if error:
+        return jsonify({"msg": error}), 422
 
     try:
-        # Check if payment exists
-        cursor = mysql.connection.cursor()
-        cursor.execute("SELECT * FROM Payments WHERE payment_id = %s", (payment_id,))
-        payment = cursor.fetchone()
-        if not payment:
+        if not repository.update_by_id('Payments', payment_id, values):
             return jsonify({"msg": "Payment not found"}), 404
-        
-        cursor.execute(query, values)
-        mysql.connection.commit()
-        cursor.close()
-
+        db.commit()
+        entity_cache.invalidate('Payments', payment_id)
 
         return jsonify({"msg": "Payment updated successfully!"}), 200
     except Exception as e:
@@ -105,16 +155,11 @@ def delete_payment(payment_id):
         return jsonify({"msg": "Unauthorized. Admin privileges required."}), 403
 
     try:
-        # Check if payment exists
-        cursor = mysql.connection.cursor()
-        cursor.execute("SELECT * FROM Payments WHERE payment_id = %s", (payment_id,))
-        payment = cursor.fetchone()
-        if not payment:
+        # delete the payment; no row deleted means it did not exist
+        if not repository.delete_by_id('Payments', payment_id):
             return jsonify({"msg": "Payment not found"}), 404
-        
-        cursor.execute("DELETE FROM Payments WHERE payment_id = %s", (payment_id,))
-        mysql.connection.commit()      
-        cursor.close()
+        db.commit()
+        entity_cache.invalidate('Payments', payment_id, cascade=True)
 
         return jsonify({"msg": "Payment deleted successfully!"}), 200
     except Exception as e:
@@ -1,8 +1,18 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, current_app, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from app.models.db import mysql
-from datetime import timedelta
-from flask_mysqldb import MySQLdb
+from app.models.db import db
+from app.models import repository
+from app.models.plan import plan_view
+from app.services.cache import entity_cache
+from app.services.kitchen_feed import kitchen_feed
+from app.services.availability import availability, to_minutes, MINUTES_PER_DAY
+from app.services.table_registry import table_registry
+from app.services import rollups
+from datetime import date
+from app.services.filtering import get_filter_args, get_sort_arg
+from app.services.pagination import get_fields_arg, get_page_args
+from app.services.patching import get_patch_args
+from app.services.export import EXPORT_FORMATS, stream_export
 
 
 # Blueprint for reservations
@@ -15,20 +25,14 @@ def is_admin(user):
 def is_admin_or_user(user):
     return user.get('role') in ['admin', 'user']
 
-from MySQLdb.cursors import DictCursor
-
+# Capacity check against the in-process table registry (no query once loaded)
 def check_table_capacity(table_id, person_count):
     try:
-        cursor = mysql.connection.cursor(DictCursor)  # Use DictCursor here
-        print(table_id)
-        cursor.execute("SELECT capacity FROM Tables WHERE table_id = %s", (table_id,))
-        table = cursor.fetchone()
-        cursor.close()
-        print(table)
+        table = table_registry.get(table_id)
         if not table:
             return False, "Table does not exist."
-        if int(person_count) > int(table['capacity']):
-            return False, f"Table capacity is insufficient. Available capacity: {table['capacity']}"
+        if int(person_count) > int(table.capacity):
+            return False, f"Table capacity is insufficient. Available capacity: {table.capacity}"
         return True, None
     except Exception as e:
         return False, f"Database error: {str(e)}"
@@ -63,20 +67,31 @@ def add_reservation():
         return jsonify({"msg": error}), 400
 
     try:
-        cursor = mysql.connection.cursor()
-        cursor.execute(
-            "INSERT INTO Reservations (customer_id, table_id, reservation_date,reservation_time, status, person_count) VALUES (%s, %s, %s, %s, %s, %s)",
-            (customer_id, table_id, reservation_date,reservation_time, status, person_count)
-        )
-        mysql.connection.commit()
-        cursor.close()
+        reservation_id = repository.insert('Reservations', {
+            'customer_id': customer_id,
+            'table_id': table_id,
+            'reservation_date': reservation_date,
+            'reservation_time': reservation_time,
+            'status': status,
+            'person_count': person_count,
+        })
+        db.commit()
+        entity_cache.invalidate('Reservations', reservation_id)
+        availability.reservation_changed(new={
+            'reservation_id': reservation_id,
+            'table_id': table_id,
+            'reservation_date': reservation_date,
+            'reservation_time': reservation_time,
+            'status': status,
+        })
         return jsonify({"msg": "Reservation added successfully"}), 201
     except Exception as e:
         return jsonify({"msg": f"Database error: {str(e)}"}), 500
 
-# GET /api/reservations - Fetch all reservations
+# GET /api/reservations?limit=&after= - Fetch one page of reservations
 @reservations_bp.route('', methods=['GET'])
 @jwt_required()
+@plan_view
 def get_reservations():
     current_user = get_jwt_identity()
 
@@ -84,26 +99,97 @@ def get_reservations():
     if not is_admin_or_user(current_user):
         return jsonify({"msg": "Unauthorized. Admin or user privileges required."}), 403
 
+    sort, error = get_sort_arg('Reservations')
+    if error:
+        return jsonify({"msg": error}), 400
+
+    limit, after, error = get_page_args(sort)
+    if error:
+        return jsonify({"msg": error}), 400
+
+    fields, error = get_fields_arg('Reservations')
+    if error:
+        return jsonify({"msg": error}), 400
+
+    where, error = get_filter_args('Reservations')
+    if error:
+        return jsonify({"msg": error}), 400
+
+    try:
+        reservations, next_cursor = yield from repository.list_page_plan('Reservations', limit, after, fields=fields, where=where, sort=sort)
+
+        return jsonify({"reservations": reservations, "next_cursor": next_cursor}), 200
+    except Exception as e:
+        return jsonify({"msg": f"Database error: {str(e)}"}), 500
+
+# GET /api/reservations/export?format=ndjson|csv - Stream every reservation
+@reservations_bp.route('/export', methods=['GET'])
+@jwt_required()
+def export_reservations():
+    current_user = get_jwt_identity()
+
+    # Only admin can export whole tables
+    if not is_admin(current_user):
+        return jsonify({"msg": "Unauthorized. Admin privileges required."}), 403
+
+    fmt = request.args.get('format', 'ndjson')
+    if fmt not in EXPORT_FORMATS:
+        return jsonify({"msg": f"Invalid format. Allowed values: {', '.join(EXPORT_FORMATS)}"}), 400
+
+    return stream_export('Reservations', fmt)
+
+# GET /api/reservations/availability?date=&time=&party_size=&duration=
+# Tables free for the whole slot, smallest fitting first, and the next times
+# that day when other fitting tables open up (see app/services/availability.py)
+@reservations_bp.route('/availability', methods=['GET'])
+@jwt_required()
+def get_availability():
+    current_user = get_jwt_identity()
+
+    # Allow access only to admin or user roles
+    if not is_admin_or_user(current_user):
+        return jsonify({"msg": "Unauthorized. Admin or user privileges required."}), 403
+
+    if 'date' not in request.args or 'time' not in request.args or 'party_size' not in request.args:
+        return jsonify({"msg": "Missing required parameters: date, time, party_size"}), 400
+
+    try:
+        day = date.fromisoformat(request.args['date']).isoformat()
+    except ValueError:
+        return jsonify({"msg": "date must be a date (YYYY-MM-DD)"}), 400
+
+    time = request.args['time']
     try:
-        # Use DictCursor to fetch rows as dictionaries
-        cursor = mysql.connection.cursor(MySQLdb.cursors.DictCursor)
-        cursor.execute("SELECT * FROM Reservations")
-        reservations = cursor.fetchall()
-        cursor.close()
-
-        # Example handling of potential non-JSON-serializable fields
-        for reservation in reservations:
-            for key, value in reservation.items():
-                if isinstance(value, timedelta):
-                    reservation[key] = str(value)  # Convert timedelta to string
-
-        return jsonify(reservations), 200
+        to_minutes(time)
+    except ValueError:
+        return jsonify({"msg": "time must be a time of day (HH:MM)"}), 400
+
+    try:
+        party_size = int(request.args['party_size'])
+        duration = int(request.args.get('duration', current_app.config['RESERVATION_DURATION']))
+    except ValueError:
+        return jsonify({"msg": "party_size and duration must be positive integers"}), 400
+    if party_size < 1 or not 0 < duration <= MINUTES_PER_DAY:
+        return jsonify({"msg": "party_size and duration must be positive integers"}), 400
+
+    try:
+        free_tables, next_slots = availability.search(day, time, party_size, duration)
+
+        return jsonify({
+            "date": day,
+            "time": time,
+            "party_size": party_size,
+            "duration": duration,
+            "free_tables": free_tables,
+            "next_slots": next_slots,
+        }), 200
     except Exception as e:
         return jsonify({"msg": f"Database error: {str(e)}"}), 500
 
 # GET /api/reservations/<id> - Fetch a specific reservation
 @reservations_bp.route('/<int:reservation_id>', methods=['GET'])
 @jwt_required()
+@plan_view
 def get_reservation(reservation_id):
     current_user = get_jwt_identity()
 
@@ -111,29 +197,22 @@ def get_reservation(reservation_id):
     if not is_admin_or_user(current_user):
         return jsonify({"msg": "Unauthorized. Admin or user privileges required."}), 403
 
+    fields, error = get_fields_arg('Reservations')
+    if error:
+        return jsonify({"msg": error}), 400
+
     try:
-        # Use DictCursor to fetch the reservation as a dictionary
-        cursor = mysql.connection.cursor(MySQLdb.cursors.DictCursor)
-        cursor.execute("SELECT * FROM Reservations WHERE reservation_id = %s", (reservation_id,))
-        reservation = cursor.fetchone()
-        cursor.close()
+        reservation = yield from entity_cache.get_by_id_plan('Reservations', reservation_id, fields=fields)
 
         if not reservation:
             return jsonify({"msg": "Reservation not found"}), 404
 
-        # Handle non-serializable data types (e.g., timedelta) if necessary
-        for key, value in reservation.items():
-            if isinstance(value, timedelta):
-                reservation[key] = str(value)
-
         return jsonify(reservation), 200
     except Exception as e:
         return jsonify({"msg": f"Database error: {str(e)}"}), 500
 
-from flask_mysqldb import MySQLdb
-
-# PUT /api/reservations/<id> - Update a reservation
-@reservations_bp.route('/<int:reservation_id>', methods=['PUT'])
+# PUT or PATCH /api/reservations/<id> - Update a reservation (only the fields given)
+@reservations_bp.route('/<int:reservation_id>', methods=['PUT', 'PATCH'])
 @jwt_required()
 def update_reservation(reservation_id):
     current_user = get_jwt_identity()
@@ -142,56 +221,40 @@ def update_reservation(reservation_id):
     if not is_admin(current_user):
         return jsonify({"msg": "Unauthorized. Admin privileges required."}), 403
 
-    data = request.get_json()
-
-    if not data:
-        return jsonify({"msg": "Request body is empty"}), 422
-
-    # Use DictCursor for dictionary-based results
-    cursor = mysql.connection.cursor(MySQLdb.cursors.DictCursor)
-
-    
+    values, error = get_patch_args('Reservations')
+    if error:
+        return jsonify({"msg": error}), 422
 
     try:
-        # Fetch existing reservation data
-        cursor.execute("SELECT * FROM Reservations WHERE reservation_id = %s", (reservation_id,))
-        reservation = cursor.fetchone()
+        # The old row is needed for the capacity check, the spending rollup
+        # and the availability index
+        reservation = repository.get_by_id('Reservations', reservation_id)
 
         if not reservation:
             return jsonify({"msg": "Reservation not found"}), 404
-
-        # Extract fields from the incoming data or use existing ones
-        customer_id = data.get('customer_id', reservation['customer_id'])
-        table_id = data.get('table_id', reservation['table_id'])
-        reservation_date = data.get('reservation_date', reservation['reservation_date'])
-        status = data.get('status', reservation['status'])
-        person_count = data.get('person_count', reservation['person_count'])
+        new = {**reservation, **values}
 
         # Validate table capacity if table_id or person_count is updated
-        if table_id != reservation['table_id'] or person_count != reservation['person_count']:
-            valid, error = check_table_capacity(table_id, person_count)
+        if new['table_id'] != reservation['table_id'] or new['person_count'] != reservation['person_count']:
+            valid, error = check_table_capacity(new['table_id'], new['person_count'])
             if not valid:
                 return jsonify({"msg": error}), 400
 
-        # Update the reservation
-        cursor.execute(
-            """
-            UPDATE Reservations
-            SET customer_id = %s, table_id = %s, reservation_date = %s, status = %s, person_count = %s
-            WHERE reservation_id = %s
-            """,
-            (customer_id, table_id, reservation_date, status, person_count, reservation_id)
-        )
-        mysql.connection.commit()
+        # No row matched means it was deleted since the read above
+        if not repository.update_by_id('Reservations', reservation_id, values):
+            return jsonify({"msg": "Reservation not found"}), 404
+        # The reservation's orders now count for another customer
+        if str(new['customer_id']) != str(reservation['customer_id']):
+            rollups.refresh_customer_spending([new['customer_id'], reservation['customer_id']])
+        db.commit()
+        entity_cache.invalidate('Reservations', reservation_id)
+        availability.reservation_changed(old=reservation, new=new)
 
         return jsonify({"msg": "Reservation updated successfully"}), 200
 
     except Exception as e:
         return jsonify({"msg": f"Database error: {str(e)}"}), 500
 
-    finally:
-        cursor.close()
-
 
 # DELETE /api/reservations/<id> - Delete a reservation
 @reservations_bp.route('/<int:reservation_id>', methods=['DELETE'])
@@ -204,17 +267,23 @@ def delete_reservation(reservation_id):
         return jsonify({"msg": "Unauthorized. Admin privileges required."}), 403
 
     try:
-        cursor = mysql.connection.cursor()
-
-        # Check if reservation exists
-        cursor.execute("SELECT * FROM Reservations WHERE reservation_id = %s", (reservation_id,))
-        reservation = cursor.fetchone()
+        # Locked until the commit, so a concurrent delete waits and then finds nothing
+        reservation = repository.get_by_id('Reservations', reservation_id, for_update=True)
         if not reservation:
             return jsonify({"msg": "Reservation not found"}), 404
+        customer_id = reservation['customer_id']
 
-        cursor.execute("DELETE FROM Reservations WHERE reservation_id = %s", (reservation_id,))
-        mysql.connection.commit()
-        cursor.close()
+        # Its orders and their items go with it (ON DELETE CASCADE)
+        sales = rollups.sales_of_reservation(reservation_id)
+        # No row deleted means another request deleted it first
+        if not repository.delete_by_id('Reservations', reservation_id):
+            return jsonify({"msg": "Reservation not found"}), 404
+        rollups.refresh_customer_spending([customer_id])
+        rollups.add_dish_sales(sales, -1)
+        db.commit()
+        entity_cache.invalidate('Reservations', reservation_id, cascade=True)
+        kitchen_feed.reload()
+        availability.reservation_changed(old=reservation)
         return jsonify({"msg": "Reservation deleted successfully"}), 200
     except Exception as e:
-        return jsonify({"msg": f"Database error: {str(e)}"}), 500
\ No newline at end of file
+        return jsonify({"msg": f"Database error: {str(e)}"}), 500
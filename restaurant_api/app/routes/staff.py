@@ -1,6 +1,11 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from app.models.db import mysql
+from app.models.db import db
+from app.models import repository
+from app.services.cache import entity_cache
+from app.services.filtering import get_filter_args, get_sort_arg
+from app.services.pagination import get_fields_arg, get_page_args
+from app.services.patching import get_patch_args
 
 # Create a Blueprint for 'staff'
 staff_bp = Blueprint('staff', __name__)
@@ -41,20 +46,16 @@ def add_staff():
         return jsonify({"msg": f"Invalid shift. Allowed values: {', '.join(valid_shifts)}"}), 422
 
     try:
-        cursor = mysql.connection.cursor()
-        cursor.execute(
-            "INSERT INTO Staff (name, role, shift) VALUES (%s, %s, %s)",
-            (name, role, shift)
-        )
-        mysql.connection.commit()
-        cursor.close()
+        staff_id = repository.insert('Staff', {'name': name, 'role': role, 'shift': shift})
+        db.commit()
+        entity_cache.invalidate('Staff', staff_id)
 
         return jsonify({"msg": "Staff member added successfully"}), 201
     except Exception as e:
         return jsonify({"msg": f"Error: {str(e)}"}), 500
 
 
-# GET /api/staff - Fetch all staff members
+# GET /api/staff?limit=&after= - Fetch one page of staff members
 @staff_bp.route('', methods=['GET'])
 @jwt_required()
 def get_all_staff():
@@ -64,13 +65,26 @@ def get_all_staff():
     if not is_admin_or_user(current_user):
         return jsonify({"msg": "Unauthorized. Admin or user privileges required."}), 403
 
+    sort, error = get_sort_arg('Staff')
+    if error:
+        return jsonify({"msg": error}), 400
+
+    limit, after, error = get_page_args(sort)
+    if error:
+        return jsonify({"msg": error}), 400
+
+    fields, error = get_fields_arg('Staff')
+    if error:
+        return jsonify({"msg": error}), 400
+
+    where, error = get_filter_args('Staff')
+    if error:
+        return jsonify({"msg": error}), 400
+
     try:
-        cursor = mysql.connection.cursor()
-        cursor.execute("SELECT * FROM Staff")
-        staff = cursor.fetchall()
-        cursor.close()
+        staff, next_cursor = repository.list_page('Staff', limit, after, dictionary=False, fields=fields, where=where, sort=sort)
 
-        return jsonify(staff), 200
+        return jsonify({"staff": staff, "next_cursor": next_cursor}), 200
     except Exception as e:
         return jsonify({"msg": f"Error: {str(e)}"}), 500
 
@@ -85,11 +99,12 @@ def get_staff_by_id(staff_id):
     if not is_admin_or_user(current_user):
         return jsonify({"msg": "Unauthorized. Admin or user privileges required."}), 403
 
+    fields, error = get_fields_arg('Staff')
+    if error:
+        return jsonify({"msg": error}), 400
+
     try:
-        cursor = mysql.connection.cursor()
-        cursor.execute("SELECT * FROM Staff WHERE staff_id = %s", (staff_id,))
-        staff_member = cursor.fetchone()
-        cursor.close()
+        staff_member = entity_cache.get_by_id('Staff', staff_id, dictionary=False, fields=fields)
 
         if not staff_member:
             return jsonify({"msg": "Staff member not found"}), 404
@@ -99,8 +114,8 @@ def get_staff_by_id(staff_id):
         return jsonify({"msg": f"Error: {str(e)}"}), 500
 
 
-# PUT /api/staff/<id> - Update details for a staff member
-@staff_bp.route('/<int:staff_id>', methods=['PUT'])
+# PUT or PATCH /api/staff/<id> - Update details for a staff member (only the fields given)
+@staff_bp.route('/<int:staff_id>', methods=['PUT', 'PATCH'])
 @jwt_required()
 def update_staff(staff_id):
     current_user = get_jwt_identity()
@@ -109,68 +124,19 @@ def update_staff(staff_id):
     if not is_admin(current_user):
         return jsonify({"msg": "Unauthorized. Admin privileges required."}), 403
 
-    data = request.get_json()
-
-    # try getting the values from the request data if they exist, if not, get them from the database
-    name, role, shift = None, None, None
-
-    if 'name' in data:
-        name = data['name']
-    else:
-        cursor = mysql.connection.cursor()
-        cursor.execute("SELECT name FROM Staff WHERE staff_id = %s", (staff_id,))
-        name = cursor.fetchone()[0]
-        cursor.close()
-
-    if 'role' in data:
-        role = data['role']
-    else:
-        cursor = mysql.connection.cursor()
-        cursor.execute("SELECT role FROM Staff WHERE staff_id = %s", (staff_id,))
-        role = cursor.fetchone()[0]
-        cursor.close()
-
-    if 'shift' in data:
-        shift = data['shift']
-    else:
-        cursor = mysql.connection.cursor()
-        cursor.execute("SELECT shift FROM Staff WHERE staff_id = %s", (staff_id,))
-        shift = cursor.fetchone()[0]
-        cursor
-
-    # Validate role and shift if provided
-    valid_roles = ['Waiter', 'Chef', 'Manager', 'Host']
-    valid_shifts = ['Morning', 'Afternoon', 'Evening']
-    if role and role not in valid_roles:
-        return jsonify({"msg": f"Invalid role. Allowed values: {', '.join(valid_roles)}"}), 422
-    if shift and shift not in valid_shifts:
-        return jsonify({"msg": f"Invalid shift. Allowed values: {', '.join(valid_shifts)}"}), 422
+    values, error = get_patch_args('Staff')
+    if error:
+        return jsonify({"msg": error}), 422
 
     try:
-        cursor = mysql.connection.cursor()
-
-        # Update query with dynamic fields
-        query = "UPDATE Staff SET "
-        params = []
-        if name:
-            query += "name = %s, "
-            params.append(name)
-        if role:
-            query += "role = %s, "
-            params.append(role)
-        if shift:
-            query += "shift = %s, "
-            params.append(shift)
-        query = query.rstrip(', ') + " WHERE staff_id = %s"
-        params.append(staff_id)
-
-        cursor.execute(query, params)
-        mysql.connection.commit()
-        cursor.close()
+        if not repository.update_by_id('Staff', staff_id, values):
+            return jsonify({"msg": "Staff member not found"}), 404
+        db.commit()
+        entity_cache.invalidate('Staff', staff_id)
 
         return jsonify({"msg": "Staff member updated successfully"}), 200
     except Exception as e:
-        return jsonify({"msg": f"Error: {str(e)}"}), 500
+        return jsonify({"msg": f"Database error: {str(e)}"}), 500
 
 
 # DELETE /api/staff/<id> - Delete a staff member
@@ -184,21 +150,13 @@ def delete_staff(staff_id):
         return jsonify({"msg": "Unauthorized. Admin privileges required."}), 403
 
     try:
-        # chek if the staff member exists in the database if not return a 404 error, else delete the staff member
-        cursor = mysql.connection.cursor()
-        cursor.execute("SELECT * FROM Staff WHERE staff_id = %s", (staff_id,))
-        staff_member = cursor.fetchone()
-        cursor.close()
-
-        if not staff_member:
+        # delete the staff member; no row deleted means it does not exist, return a 404 error
+        if not repository.delete_by_id('Staff', staff_id):
             return jsonify({"msg": "Staff member not found"}), 404
-        
-        cursor = mysql.connection.cursor()
-        cursor.execute("DELETE FROM Staff WHERE staff_id = %s", (staff_id,))
-        mysql.connection.commit()
-        cursor.close()
+        db.commit()
+        entity_cache.invalidate('Staff', staff_id, cascade=True)
 
         return jsonify({"msg": "Staff member deleted successfully"}), 200
     except Exception as e:
         return jsonify({"msg": f"Error: {str(e)}"}), 500
-    
+
@@ -0,0 +1,48 @@
+from flask import Blueprint, jsonify
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from app.models.db import db
+from app.services.cache import entity_cache
+from app.services.hashing import password_hasher
+
+# Blueprint for operational endpoints (pool sizing, caches, password hashing)
+system_bp = Blueprint('system', __name__)
+
+# Helper function for role validation
+def is_admin(user):
+    return user.get('role') == 'admin'
+
+# GET /api/system/pool - Connection pool / engine statistics for this worker
+@system_bp.route('/pool', methods=['GET'])
+@jwt_required()
+def pool_stats():
+    current_user = get_jwt_identity()
+
+    # Only admin can inspect the pool
+    if not is_admin(current_user):
+        return jsonify({"msg": "Unauthorized. Admin privileges required."}), 403
+
+    return jsonify(db.stats()), 200
+
+# GET /api/system/cache - Entity cache hit/miss statistics for this worker
+@system_bp.route('/cache', methods=['GET'])
+@jwt_required()
+def cache_stats():
+    current_user = get_jwt_identity()
+
+    # Only admin can inspect the cache
+    if not is_admin(current_user):
+        return jsonify({"msg": "Unauthorized. Admin privileges required."}), 403
+
+    return jsonify(entity_cache.stats()), 200
+
+# GET /api/system/hashing - Password hashing pool statistics for this worker
+@system_bp.route('/hashing', methods=['GET'])
+@jwt_required()
+def hashing_stats():
+    current_user = get_jwt_identity()
+
+    # Only admin can inspect the hashing pool
+    if not is_admin(current_user):
+        return jsonify({"msg": "Unauthorized. Admin privileges required."}), 403
+
+    return jsonify(password_hasher.stats()), 200
@@ -1,6 +1,11 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from app.models.db import mysql
+from app.models.db import db
+from app.models import repository
+from app.services.cache import entity_cache
+from app.services.table_registry import table_registry
+from app.services.pagination import get_fields_arg, get_page_args
+from app.services.patching import get_patch_args
 
 # Create a Blueprint for 'tables'
 tables_bp = Blueprint('tables', __name__)
@@ -21,7 +26,7 @@ def add_table():
     # Validate required fields
     if 'capacity' not in data or 'location' not in data:
         return jsonify({"msg": "Missing required fields: capacity, location"}), 422
-    
+
 
     # Get current user identity (the username or user ID from JWT)
     current_user = get_jwt_identity()
@@ -34,21 +39,19 @@ def add_table():
     location = data['location']
 
     try:
-        # Get MySQL connection
-        cursor = mysql.connection.cursor()
-
         # Insert data into the Tables table
-        cursor.execute('''INSERT INTO Tables (capacity, location) VALUES (%s, %s)''', (capacity, location))
-        mysql.connection.commit()
-
-        cursor.close()
+        table_id = repository.insert('Tables', {'capacity': capacity, 'location': location})
+        db.commit()
+        entity_cache.invalidate('Tables', table_id)
+        table_registry.invalidate()
 
         return jsonify({"msg": "Table created successfully"}), 201
     except Exception as e:
         return jsonify({"msg": f"Error: {str(e)}"}), 500
-    
 
-# GET /api/tables - Fetch all tables
+
+# GET /api/tables?limit=&after=&location=&min_capacity= - Fetch one page of tables
+# (served from the table registry)
 @tables_bp.route('', methods=['GET'])
 @jwt_required()
 def get_tables():
@@ -58,13 +61,26 @@ def get_tables():
     if not is_admin_or_user(current_user):
         return jsonify({"msg": "Unauthorized. Admin or user privileges required."}), 403
 
+    limit, after, error = get_page_args()
+    if error:
+        return jsonify({"msg": error}), 400
+
+    fields, error = get_fields_arg('Tables')
+    if error:
+        return jsonify({"msg": error}), 400
+
+    location = request.args.get('location')
+    min_capacity = request.args.get('min_capacity')
+    if min_capacity is not None:
+        try:
+            min_capacity = int(min_capacity)
+        except ValueError:
+            return jsonify({"msg": "min_capacity must be an integer"}), 400
+
     try:
-        cursor = mysql.connection.cursor()
-        cursor.execute("SELECT * FROM Tables")
-        tables = cursor.fetchall()
-        cursor.close()
+        tables, next_cursor = table_registry.page(limit, after, location, min_capacity, fields)
 
-        return jsonify(tables), 200
+        return jsonify({"tables": tables, "next_cursor": next_cursor}), 200
     except Exception as e:
         return jsonify({"msg": f"Database error: {str(e)}"}), 500
 
@@ -79,11 +95,12 @@ def get_table_by_id(table_id):
     if not is_admin_or_user(current_user):
         return jsonify({"msg": "Unauthorized. Admin or user privileges required."}), 403
 
+    fields, error = get_fields_arg('Tables')
+    if error:
+        return jsonify({"msg": error}), 400
+
     try:
-        cursor = mysql.connection.cursor()
-        cursor.execute("SELECT * FROM Tables WHERE table_id = %s", (table_id,))
-        table = cursor.fetchone()
-        cursor.close()
+        table = table_registry.get(table_id, fields)
 
         if not table:
             return jsonify({"msg": "Table not found"}), 404
@@ -93,8 +110,8 @@ def get_table_by_id(table_id):
         return jsonify({"msg": f"Database error: {str(e)}"}), 500
 
 
-# PUT /api/tables/<id> - Update a table
-@tables_bp.route('/<int:table_id>', methods=['PUT'])
+# PUT or PATCH /api/tables/<id> - Update a table (only the fields given)
+@tables_bp.route('/<int:table_id>', methods=['PUT', 'PATCH'])
 @jwt_required()
 def update_table(table_id):
     current_user = get_jwt_identity()
@@ -103,33 +120,16 @@ def update_table(table_id):
     if not is_admin(current_user):
         return jsonify({"msg": "Unauthorized. Admin privileges required."}), 403
 
-    data = request.get_json()
-
-    # Validate input
-    capacity = data.get('capacity')
-    location = data.get('location')
-
-    if not capacity and not location:
-        return jsonify({"msg": "At least one field (capacity, location) must be provided"}), 422
+    values, error = get_patch_args('Tables')
+    if error:
+        return jsonify({"msg": error}), 422
 
     try:
-        cursor = mysql.connection.cursor()
-
-        # Build dynamic query for updates
-        query = "UPDATE Tables SET "
-        params = []
-        if capacity:
-            query += "capacity = %s, "
-            params.append(capacity)
-        if location:
-            query += "location = %s, "
-            params.append(location)
-        query = query.rstrip(', ') + " WHERE table_id = %s"
-        params.append(table_id)
-
-        cursor.execute(query, tuple(params))
-        mysql.connection.commit()
-        cursor.close()
+        if not repository.update_by_id('Tables', table_id, values):
+            return jsonify({"msg": "Table not found"}), 404
+        db.commit()
+        entity_cache.invalidate('Tables', table_id)
+        table_registry.invalidate()
 
         return jsonify({"msg": "Table updated successfully"}), 200
     except Exception as e:
@@ -147,25 +147,20 @@ def delete_table(table_id):
         return jsonify({"msg": "Unauthorized. Admin privileges required."}), 403
 
     try:
-        cursor = mysql.connection.cursor()
-
         # Check if the table exists
-        cursor.execute("SELECT * FROM Tables WHERE table_id = %s", (table_id,))
-        table = cursor.fetchone()
-        if not table:
+        if not table_registry.get(table_id):
             return jsonify({"msg": "Table not found"}), 404
 
         # Check if the table is referenced in Reservations
-        cursor.execute("SELECT * FROM Reservations WHERE table_id = %s", (table_id,))
-        reservation = cursor.fetchone()
-        if reservation:
+        if repository.exists('Reservations', table_id=table_id):
             return jsonify({"msg": "Cannot delete table. It is referenced in reservations."}), 409
 
         # Delete the table if not referenced
-        cursor.execute("DELETE FROM Tables WHERE table_id = %s", (table_id,))
-        mysql.connection.commit()
-        cursor.close()
+        repository.delete_by_id('Tables', table_id)
+        db.commit()
+        entity_cache.invalidate('Tables', table_id, cascade=True)
+        table_registry.invalidate()
 
         return jsonify({"msg": "Table deleted successfully!"}), 200
     except Exception as e:
-        return jsonify({"msg": f"Database error: {str(e)}"}), 500
\ No newline at end of file
+        return jsonify({"msg": f"Database error: {str(e)}"}), 500
@@ -0,0 +1,218 @@
+import time
+import click
+from datetime import date, datetime, timedelta
+from flask import current_app
+from flask.cli import AppGroup, with_appcontext
+
+from app.models.db import db
+from app.services import rollups
+from app.services.availability import availability
+from app.services.cache import entity_cache
+
+# Moves finished history out of the live tables into the *_Archive tables
+# (app/migrations/versions.py, version 4):
+#   - Completed / Cancelled orders created before the cutoff, with their
+#     Order_Items and Payments
+#   - reservations dated before the cutoff that have no live orders left
+#
+# Rows are moved in primary-key order, ARCHIVE_CHUNK_SIZE at a time, each
+# chunk in its own short transaction (copy, delete, rollups, commit) with
+# ARCHIVE_PAUSE seconds between chunks, so the live tables are never locked
+# for long and a run can be stopped and restarted at any point. The cutoff is
+# ARCHIVE_AFTER_DAYS days before today.
+#
+# Run from cron with "flask --app run archive run". Archived rows leave the
+# list and get-by-id routes; the analytics routes add them back with
+# ?include_archived=1.
+
+FINISHED_ORDER_STATUSES = ('Completed', 'Cancelled')
+
+ORDER_COLUMNS = "order_id, reservation_id, total_amount, order_status, created_at"
+ORDER_ITEM_COLUMNS = "order_item_id, order_id, dish_id, quantity, created_at, unit_price"
+PAYMENT_COLUMNS = "payment_id, order_id, amount_paid, payment_method, payment_date"
+RESERVATION_COLUMNS = "reservation_id, customer_id, table_id, reservation_date, reservation_time, person_count, status"
+
+
+def _placeholders(values):
+    return ", ".join(["%s"] * len(values))
+
+
+# MySQL locks the chunk's rows until it commits, so a route cannot change an
+# order (or add one to a reservation) between the copy and the delete.
+# SQLite has no row locks; its writers are serialised from the first INSERT.
+def _lock():
+    return " FOR UPDATE" if db.dialect == 'mysql' else ""
+
+
+def _ids(cursor, query, params):
+    cursor.execute(query, params)
+    return [row[0] for row in cursor.fetchall()]
+
+
+# Archive one chunk of finished orders after order_id `after`.
+# Returns the order ids moved (empty when there are none left).
+def archive_orders_chunk(cutoff, after, chunk):
+    statuses = _placeholders(FINISHED_ORDER_STATUSES)
+    cursor = db.cursor()
+    try:
+        order_ids = _ids(
+            cursor,
+            f"SELECT order_id FROM Orders WHERE order_id > %s AND order_status IN ({statuses}) "
+            f"AND created_at < %s ORDER BY order_id LIMIT %s{_lock()}",
+            (after, *FINISHED_ORDER_STATUSES, cutoff, chunk),
+        )
+        if not order_ids:
+            return []
+        ids = _placeholders(order_ids)
+        item_ids = _ids(cursor, f"SELECT order_item_id FROM Order_Items WHERE order_id IN ({ids})", tuple(order_ids))
+        payment_ids = _ids(cursor, f"SELECT payment_id FROM Payments WHERE order_id IN ({ids})", tuple(order_ids))
+
+        cursor.execute(
+            f"""
+            INSERT INTO Orders_Archive ({ORDER_COLUMNS}, customer_id)
+            SELECT o.order_id, o.reservation_id, o.total_amount, o.order_status, o.created_at, r.customer_id
+            FROM Orders o
+            JOIN Reservations r ON r.reservation_id = o.reservation_id
+            WHERE o.order_id IN ({ids})
+            """,
+            tuple(order_ids),
+        )
+        cursor.execute(
+            f"INSERT INTO Order_Items_Archive ({ORDER_ITEM_COLUMNS}) "
+            f"SELECT {ORDER_ITEM_COLUMNS} FROM Order_Items WHERE order_id IN ({ids})",
+            tuple(order_ids),
+        )
+        cursor.execute(
+            f"INSERT INTO Payments_Archive ({PAYMENT_COLUMNS}) "
+            f"SELECT {PAYMENT_COLUMNS} FROM Payments WHERE order_id IN ({ids})",
+            tuple(order_ids),
+        )
+        customers = rollups.orders_archived(order_ids)
+
+        cursor.execute(f"DELETE FROM Payments WHERE order_id IN ({ids})", tuple(order_ids))
+        cursor.execute(f"DELETE FROM Order_Items WHERE order_id IN ({ids})", tuple(order_ids))
+        cursor.execute(f"DELETE FROM Orders WHERE order_id IN ({ids})", tuple(order_ids))
+        rollups.refresh_customer_spending(customers)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        cursor.close()
+
+    entity_cache.invalidate_many('Orders', order_ids)
+    entity_cache.invalidate_many('Order_Items', item_ids)
+    entity_cache.invalidate_many('Payments', payment_ids)
+    return order_ids
+
+
+# Archive one chunk of past reservations (without live orders) after
+# reservation_id `after`. Returns the reservation ids moved.
+def archive_reservations_chunk(cutoff, after, chunk):
+    cursor = db.cursor(dictionary=True)
+    try:
+        cursor.execute(
+            f"""
+            SELECT {RESERVATION_COLUMNS} FROM Reservations r
+            WHERE r.reservation_id > %s AND r.reservation_date < %s
+              AND NOT EXISTS (SELECT 1 FROM Orders o WHERE o.reservation_id = r.reservation_id)
+            ORDER BY r.reservation_id LIMIT %s{_lock()}
+            """,
+            (after, cutoff, chunk),
+        )
+        reservations = list(cursor.fetchall())
+        if not reservations:
+            return []
+        reservation_ids = [row['reservation_id'] for row in reservations]
+        ids = _placeholders(reservation_ids)
+
+        # Checked again: deleting a reservation would cascade to an order
+        # added since the SELECT
+        no_orders = "NOT EXISTS (SELECT 1 FROM Orders o WHERE o.reservation_id = r.reservation_id)"
+        cursor.execute(
+            f"INSERT INTO Reservations_Archive ({RESERVATION_COLUMNS}) "
+            f"SELECT {RESERVATION_COLUMNS} FROM Reservations r WHERE reservation_id IN ({ids}) AND {no_orders}",
+            tuple(reservation_ids),
+        )
+        cursor.execute(
+            f"DELETE FROM Reservations WHERE reservation_id IN ({ids}) AND NOT EXISTS "
+            f"(SELECT 1 FROM Orders o WHERE o.reservation_id = Reservations.reservation_id)",
+            tuple(reservation_ids),
+        )
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        cursor.close()
+
+    entity_cache.invalidate_many('Reservations', reservation_ids)
+    for reservation in reservations:
+        availability.reservation_changed(old=reservation)
+    return reservation_ids
+
+
+# Archive everything older than `days` days in chunks of `chunk`, sleeping
+# `pause` seconds between chunks. `progress(table, count)` is called after
+# every chunk. Returns {'Orders': n, 'Reservations': n}.
+def run(days=None, chunk=None, pause=None, max_chunks=None, progress=None):
+    config = current_app.config
+    days = config['ARCHIVE_AFTER_DAYS'] if days is None else days
+    chunk = config['ARCHIVE_CHUNK_SIZE'] if chunk is None else chunk
+    pause = config['ARCHIVE_PAUSE'] if pause is None else pause
+
+    cutoff_day = date.today() - timedelta(days=days)
+    cutoff_time = datetime.combine(cutoff_day, datetime.min.time()).strftime('%Y-%m-%d %H:%M:%S')
+
+    # Orders first, so their reservations can follow in the same run
+    jobs = [
+        ('Orders', archive_orders_chunk, cutoff_time),
+        ('Reservations', archive_reservations_chunk, cutoff_day.isoformat()),
+    ]
+    moved = {table: 0 for table, _, _ in jobs}
+    chunks = 0
+    for table, archive_chunk, cutoff in jobs:
+        after = 0
+        while max_chunks is None or chunks < max_chunks:
+            ids = archive_chunk(cutoff, after, chunk)
+            if not ids:
+                break
+            chunks += 1
+            after = ids[-1]
+            moved[table] += len(ids)
+            if progress:
+                progress(table, moved[table])
+            if pause:
+                time.sleep(pause)
+    return moved
+
+
+# -------------------- CLI --------------------
+
+archive_cli = AppGroup('archive', help='Move old orders and reservations to the archive tables.')
+
+
+@archive_cli.command('run', help='Archive finished orders and past reservations older than the cutoff.')
+@click.option('--days', type=click.IntRange(min=0), default=None, help='Age cutoff in days (default ARCHIVE_AFTER_DAYS).')
+@click.option('--chunk', type=click.IntRange(min=1), default=None, help='Rows per transaction (default ARCHIVE_CHUNK_SIZE).')
+@click.option('--pause', type=click.FloatRange(min=0), default=None, help='Seconds between chunks (default ARCHIVE_PAUSE).')
+@click.option('--max-chunks', type=click.IntRange(min=1), default=None, help='Stop after this many chunks.')
+@with_appcontext
+def run_command(days, chunk, pause, max_chunks):
+    moved = run(days, chunk, pause, max_chunks, progress=lambda table, count: click.echo(f"{table}: {count}"))
+    click.echo(f"Archived {moved['Orders']} orders and {moved['Reservations']} reservations")
+
+
+@archive_cli.command('status', help='Count the live and archived rows.')
+@with_appcontext
+def status_command():
+    cursor = db.cursor()
+    try:
+        for table in ('Orders', 'Order_Items', 'Payments', 'Reservations'):
+            cursor.execute(f"SELECT COUNT(*) FROM {table}")
+            live = cursor.fetchone()[0]
+            cursor.execute(f"SELECT COUNT(*) FROM {table}_Archive")
+            archived = cursor.fetchone()[0]
+            click.echo(f"{table}: {live} live, {archived} archived")
+    finally:
+        cursor.close()
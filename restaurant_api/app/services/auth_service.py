@@ -1,12 +1,9 @@
 from flask import Blueprint, request, jsonify
-from flask_jwt_extended import create_access_token
-from werkzeug.security import generate_password_hash, check_password_hash
+from flask_jwt_extended import create_access_token, create_refresh_token, jwt_required, get_jwt_identity
 
-from flask import Blueprint, request, jsonify
-from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity
-from werkzeug.security import generate_password_hash, check_password_hash
-
-from app.models.db import mysql
+from app.models.db import db
+from app.models import repository
+from app.services.hashing import password_hasher
 
 # Blueprint for Authentication
 auth_bp = Blueprint('auth', __name__)
@@ -23,14 +20,12 @@ def register():
     if not username or not password:
         return jsonify({"msg": "Missing username or password"}), 400
     
-    # Hash password
-    hashed_password = generate_password_hash(password)
+    # Hash password (on the bounded hashing pool)
+    hashed_password = password_hasher.generate(password)
     
-    # Insert user into MySQL
-    cursor = mysql.connection.cursor()
-    cursor.execute("INSERT INTO users (username, password, role) VALUES (%s, %s, %s)", (username, hashed_password, role))
-    mysql.connection.commit()
-    cursor.close()
+    # Insert user into the database
+    repository.insert('users', {'username': username, 'password': hashed_password, 'role': role})
+    db.commit()
 
     return jsonify({"msg": "User registered successfully"}), 201
 
@@ -43,14 +38,28 @@ def login():
     password = data.get('password')
     
     # Fetch user from database
-    cursor = mysql.connection.cursor()
-    cursor.execute("SELECT * FROM users WHERE username = %s", (username,))
-    user = cursor.fetchone()
-    cursor.close()
-
-    if user and check_password_hash(user[2], password):  # user[2] is the password
-        # Create a JWT token
-        access_token = create_access_token(identity={"username": user[1], "role": user[3]})  # user[1] = username, user[3] = role
-        return jsonify(access_token=access_token), 200
+    user = repository.find_one('users', username=username)
+
+    if user and password_hasher.check(user[2], password):  # user[2] is the password
+        # Create a short-lived access token and a refresh token to renew it
+        identity = {"username": user[1], "role": user[3]}  # user[1] = username, user[3] = role
+        access_token = create_access_token(identity=identity)
+        refresh_token = create_refresh_token(identity=identity)
+        return jsonify(access_token=access_token, refresh_token=refresh_token), 200
     else:
-        return jsonify({"msg": "Invalid credentials"}), 401
\ No newline at end of file
+        return jsonify({"msg": "Invalid credentials"}), 401
+
+# Renew an access token (Authorization: Bearer <refresh_token>)
+# No password hash here; the user row is re-read so a deleted user or a
+# changed role takes effect on the next renewal.
+@auth_bp.route('/refresh', methods=['POST'])
+@jwt_required(refresh=True)
+def refresh():
+    identity = get_jwt_identity()
+
+    user = repository.find_one('users', username=identity.get('username'))
+    if not user:
+        return jsonify({"msg": "Invalid credentials"}), 401
+
+    access_token = create_access_token(identity={"username": user[1], "role": user[3]})
+    return jsonify(access_token=access_token), 200
\ No newline at end of file
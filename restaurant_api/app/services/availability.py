@@ -0,0 +1,214 @@
+import bisect
+import threading
+import time
+from collections import OrderedDict
+from datetime import timedelta
+from flask import current_app
+
+from app.models.db import db
+from app.services.broadcast import broadcast
+from app.services.table_registry import table_registry
+
+# In-memory interval index behind GET /api/reservations/availability.
+#
+# For each date that has been looked up, the index keeps the reservations of
+# every table as start-sorted (start, end, reservation_id) intervals in
+# minutes since midnight. Reservations have no end time, so each one is taken
+# to last RESERVATION_DURATION minutes. A date is read from the database
+# once (one query on idx_reservations_date); after that the reservation
+# routes publish every row they write on the broadcast channel and each
+# worker moves that one interval, so an availability check is a bisect per
+# table rather than a scan of Reservations. Capacities come from
+# app/services/table_registry.py.
+# A date is read again AVAILABILITY_INDEX_TTL seconds after it was loaded,
+# which bounds how long workers the messages do not reach (BROADCAST_BACKEND
+# "local", writes made outside the API) answer from an old copy.
+
+TOPIC = 'reservations.changed'
+
+# Statuses that do not hold a table
+FREE_STATUSES = ('Cancelled', 'Completed')
+
+MINUTES_PER_DAY = 24 * 60
+
+
+# "19:30", "19:30:00" or a TIME column (timedelta on MySQL) -> minutes since midnight
+def to_minutes(value):
+    if isinstance(value, timedelta):
+        return int(value.total_seconds()) // 60
+    hours, minutes = str(value).split(':')[:2]
+    hours, minutes = int(hours), int(minutes)
+    if not (0 <= hours < 24 and 0 <= minutes < 60):
+        raise ValueError(value)
+    return hours * 60 + minutes
+
+
+def format_minutes(minutes):
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+
+# JSON-safe copy of the Reservations columns the index uses
+def reservation_message(reservation):
+    if reservation is None:
+        return None
+    return {
+        'reservation_id': reservation['reservation_id'],
+        'table_id': int(reservation['table_id']),
+        'reservation_date': str(reservation['reservation_date']),
+        'reservation_time': str(reservation['reservation_time']),
+        'status': reservation.get('status') or 'Pending',
+    }
+
+
+class DayIndex:
+    def __init__(self, duration, expires_at):
+        self.duration = duration
+        self.expires_at = expires_at
+        self.tables = {}     # table_id -> sorted [(start, end, reservation_id)]
+
+    def add(self, reservation):
+        if reservation['status'] in FREE_STATUSES:
+            return
+        try:
+            start = to_minutes(reservation['reservation_time'])
+        except ValueError:
+            return
+        interval = (start, start + self.duration, reservation['reservation_id'])
+        bisect.insort(self.tables.setdefault(int(reservation['table_id']), []), interval)
+
+    def remove(self, reservation_id):
+        for intervals in self.tables.values():
+            for position, interval in enumerate(intervals):
+                if interval[2] == reservation_id:
+                    del intervals[position]
+                    return
+
+    # Earliest start >= start at which the table is free for `length` minutes,
+    # or None if that runs past midnight. Intervals all have the same length,
+    # so their ends are sorted too and one bisect finds the first that matters.
+    def next_free(self, table_id, start, length):
+        intervals = self.tables.get(table_id, ())
+        position = bisect.bisect_right(intervals, (start - self.duration, float('inf')))
+        for interval_start, interval_end, _ in intervals[position:]:
+            if interval_start >= start + length:
+                break
+            start = max(start, interval_end)
+        return start if start + length <= MINUTES_PER_DAY else None
+
+
+class Index:
+    def __init__(self, duration, max_days, ttl):
+        self._lock = threading.Lock()
+        self.duration = duration
+        self.max_days = max_days
+        self.ttl = ttl
+        self.days = OrderedDict()    # date string -> DayIndex, least recently used first
+        self.version = 0             # bumped by every message, to drop stale loads
+        self.loads = 0
+
+    def publish(self, message):
+        with self._lock:
+            self.version += 1
+            if message.get('reset'):
+                self.days.clear()
+            for key in ('old', 'new'):
+                reservation = message.get(key)
+                if reservation is None:
+                    continue
+                day = self.days.get(reservation['reservation_date'])
+                if day is None:
+                    continue
+                if key == 'old':
+                    day.remove(reservation['reservation_id'])
+                else:
+                    day.add(reservation)
+
+    # DayIndex for a date, loading it if needed or expired; needs an app context
+    def get(self, day):
+        with self._lock:
+            index = self.days.get(day)
+            if index is not None and index.expires_at > time.monotonic():
+                self.days.move_to_end(day)
+                return index
+            version = self.version
+
+        index = self._load_day(day)
+
+        with self._lock:
+            # Only keep what we read if nothing was written meanwhile
+            if self.version == version:
+                self.days[day] = index
+                while len(self.days) > self.max_days:
+                    self.days.popitem(last=False)
+                self.loads += 1
+        return index
+
+    # `tables`: the fitting tables, smallest first
+    def search(self, day, start, tables, duration, slots):
+        index = self.get(day)
+
+        free_tables, openings = [], {}
+        with self._lock:
+            for table in tables:
+                free_at = index.next_free(table.table_id, start, duration)
+                if free_at == start:
+                    free_tables.append(table._asdict())
+                elif free_at is not None:
+                    openings.setdefault(free_at, []).append(table.table_id)
+
+        next_slots = [
+            {'time': format_minutes(minutes), 'table_ids': openings[minutes]}
+            for minutes in sorted(openings)[:slots]
+        ]
+        return free_tables, next_slots
+
+    def _load_day(self, day):
+        cursor = db.cursor(dictionary=True)
+        try:
+            cursor.execute(
+                "SELECT reservation_id, table_id, reservation_time, status FROM Reservations "
+                "WHERE reservation_date = %s",
+                (day,),
+            )
+            rows = cursor.fetchall()
+        finally:
+            cursor.close()
+        index = DayIndex(self.duration, time.monotonic() + self.ttl)
+        for row in rows:
+            index.add(row)
+        return index
+
+
+class AvailabilityIndex:
+    def init_app(self, app):
+        app.config.setdefault('RESERVATION_DURATION', 120)
+        app.config.setdefault('AVAILABILITY_INDEX_DAYS', 60)
+        app.config.setdefault('AVAILABILITY_INDEX_TTL', 30)
+        index = Index(
+            app.config['RESERVATION_DURATION'],
+            app.config['AVAILABILITY_INDEX_DAYS'],
+            app.config['AVAILABILITY_INDEX_TTL'],
+        )
+        app.extensions['availability'] = index
+        app.extensions['broadcast'].subscribe(TOPIC, index.publish)
+
+    @property
+    def index(self):
+        return current_app.extensions['availability']
+
+    # Free tables for the party at `time` (best fit first) and the next times
+    # after it when more tables open up
+    def search(self, day, time, party_size, duration, slots=5):
+        return self.index.search(day, to_minutes(time), table_registry.fitting(party_size), duration, slots)
+
+    # Call after committing a write to Reservations. old/new are the row
+    # before and after (None for an add / delete).
+    def reservation_changed(self, old=None, new=None):
+        broadcast.publish(TOPIC, {'old': reservation_message(old), 'new': reservation_message(new)})
+
+    # Call after a write that removes reservations indirectly (customer delete)
+    def reset(self):
+        broadcast.publish(TOPIC, {'reset': True})
+
+
+availability = AvailabilityIndex()
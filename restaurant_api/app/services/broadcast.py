@@ -0,0 +1,66 @@
+import importlib
+import logging
+import threading
+from flask import current_app
+
+# Publish/subscribe channel used to tell every worker about writes
+# (cache invalidation, menu changes, ...).
+#
+# A backend is any class taking the app config with two methods:
+#   publish(topic, message)     - message is a JSON-serialisable dict
+#   subscribe(topic, callback)  - callback(message) runs for every message on
+#                                 topic, including the ones this worker sent
+# BROADCAST_BACKEND selects it: "local" (default) or "package.module:ClassName"
+# for a shared one (e.g. Redis pub/sub) so other gunicorn workers and nodes
+# see the same messages.
+#
+# Messages go out after a write has committed, so a failed publish or
+# subscriber is logged and never fails the request that made the write.
+
+log = logging.getLogger(__name__)
+
+
+# In-process stand-in: delivers synchronously to this worker's subscribers only
+class LocalBroadcast:
+    def __init__(self, config=None):
+        self._subscribers = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self, topic, callback):
+        with self._lock:
+            self._subscribers.setdefault(topic, []).append(callback)
+
+    def publish(self, topic, message):
+        with self._lock:
+            callbacks = list(self._subscribers.get(topic, ()))
+        for callback in callbacks:
+            try:
+                callback(message)
+            except Exception:
+                log.exception("Subscriber to %s failed", topic)
+
+
+BACKENDS = {'local': LocalBroadcast}
+
+
+def load_backend(name):
+    if name in BACKENDS:
+        return BACKENDS[name]
+    module_name, _, class_name = name.partition(':')
+    return getattr(importlib.import_module(module_name), class_name)
+
+
+class Broadcast:
+    def init_app(self, app):
+        app.config.setdefault('BROADCAST_BACKEND', 'local')
+        backend = load_backend(app.config['BROADCAST_BACKEND'])
+        app.extensions['broadcast'] = backend(app.config)
+
+    def publish(self, topic, message):
+        try:
+            current_app.extensions['broadcast'].publish(topic, message)
+        except Exception:
+            log.exception("Could not publish to %s", topic)
+
+
+broadcast = Broadcast()
@@ -0,0 +1,47 @@
+from flask import current_app, request, jsonify
+
+# Request handling for the /bulk insert endpoints.
+# A bulk body is a JSON array of the same objects the single /add endpoint
+# takes. The whole array is validated before anything is written, so a bad row
+# rejects the batch instead of leaving half a ticket in the database.
+
+
+# Check every item of `data` (a list) for the required fields.
+# Returns (rows, errors); errors is a list of {"index", "msg"} and rows only
+# holds `required` + `optional` columns, with defaults filled in.
+def validate_rows(data, required, optional=None):
+    optional = optional or {}
+    rows, errors = [], []
+    for index, item in enumerate(data):
+        if not isinstance(item, dict):
+            errors.append({"index": index, "msg": "Row must be a JSON object"})
+            continue
+        missing = [field for field in required if field not in item]
+        if missing:
+            errors.append({"index": index, "msg": f"Missing required fields: {', '.join(missing)}"})
+            continue
+        row = {field: item[field] for field in required}
+        for field, default in optional.items():
+            row[field] = item.get(field, default)
+        rows.append(row)
+
+    return rows, errors
+
+
+# Read and validate a bulk body.
+# Returns (rows, error); rows are dicts with exactly `required` + `optional`
+# columns (missing optional ones get their default), error is a ready
+# (response, status) tuple.
+def read_bulk_rows(required, optional=None):
+    max_rows = current_app.config['BULK_MAX_ROWS']
+    data = request.get_json(silent=True)
+
+    if not isinstance(data, list) or not data:
+        return None, (jsonify({"msg": "Request body must be a non-empty JSON array"}), 422)
+    if len(data) > max_rows:
+        return None, (jsonify({"msg": f"Too many rows. At most {max_rows} per request"}), 413)
+
+    rows, errors = validate_rows(data, required, optional)
+    if errors:
+        return None, (jsonify({"msg": "Invalid rows, nothing was inserted", "errors": errors}), 422)
+    return rows, None
@@ -0,0 +1,191 @@
+import threading
+import time
+from collections import OrderedDict
+from flask import current_app
+
+from app.models import repository
+from app.models.plan import run_plan
+from app.services.broadcast import broadcast
+from app.services.pagination import project_row
+
+# Read-through cache for the get-by-id routes.
+# Entries are keyed by (table, id), bounded by ENTITY_CACHE_SIZE (least
+# recently used goes first) and expire after ENTITY_CACHE_TTL seconds, which
+# also bounds staleness from writes made outside the API. Routes that write a
+# row call entity_cache.invalidate(); the message goes through the broadcast
+# channel so every worker subscribed to it drops its copy.
+# ENTITY_CACHE_SIZE = 0 turns the cache off.
+
+INVALIDATE_TOPIC = 'entity_cache.invalidate'
+
+# ON DELETE CASCADE children (see __init__.sql). Deleting a parent removes
+# child rows whose ids the route does not know, so their types are flushed.
+CASCADES = {
+    'Customers': ['Reservations'],
+    'Tables': ['Reservations'],
+    'Reservations': ['Orders'],
+    'Orders': ['Order_Items', 'Payments'],
+    'Menu': ['Order_Items'],
+}
+
+
+def cascade_of(table):
+    tables, pending = [], list(CASCADES.get(table, ()))
+    while pending:
+        child = pending.pop()
+        if child not in tables:
+            tables.append(child)
+            pending.extend(CASCADES.get(child, ()))
+    return tables
+
+
+# Generation counters for rows are striped: a drop bumps its key's stripe,
+# so memory stays bounded and a collision only skips one store
+GENERATION_STRIPES = 1024
+
+
+class LRUCache:
+    def __init__(self, max_entries, ttl):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._table_generations = {}
+        self._row_generations = [0] * GENERATION_STRIPES
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    # Returns (found, value)
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return False, None
+            value, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return False, None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return True, value
+
+    def _generation(self, key):
+        return (self._table_generations.get(key[0], 0), self._row_generations[hash(key[:2]) % GENERATION_STRIPES])
+
+    # Take before reading a row from the database and pass to set(), which
+    # then skips the store if the row was dropped in between
+    def generation(self, key):
+        with self._lock:
+            return self._generation(key)
+
+    def set(self, key, value, generation=None):
+        with self._lock:
+            if generation is not None and generation != self._generation(key):
+                return
+            self._entries[key] = (value, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    # Drop every key starting with `prefix` (e.g. ('Orders', 5) or ('Orders',))
+    def drop(self, prefix):
+        with self._lock:
+            if len(prefix) == 1:
+                self._table_generations[prefix[0]] = self._table_generations.get(prefix[0], 0) + 1
+            else:
+                self._row_generations[hash(prefix[:2]) % GENERATION_STRIPES] += 1
+            stale = [key for key in self._entries if key[:len(prefix)] == prefix]
+            for key in stale:
+                del self._entries[key]
+            self.invalidations += len(stale)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+            }
+
+
+class EntityCache:
+    def init_app(self, app):
+        app.config.setdefault('ENTITY_CACHE_SIZE', 10000)
+        app.config.setdefault('ENTITY_CACHE_TTL', 30)
+
+        store = LRUCache(app.config['ENTITY_CACHE_SIZE'], app.config['ENTITY_CACHE_TTL'])
+        app.extensions['entity_cache'] = store
+
+        # Runs in every worker for every invalidation, including our own
+        def on_invalidate(message):
+            table = message['table']
+            if message.get('id') is None:
+                store.drop((table,))
+            else:
+                store.drop((table, message['id']))
+            for child in message.get('cascade', ()):
+                store.drop((child,))
+
+        app.extensions['broadcast'].subscribe(INVALIDATE_TOPIC, on_invalidate)
+
+    @property
+    def store(self):
+        return current_app.extensions['entity_cache']
+
+    # repository.get_by_id through the cache. Missing rows are not cached.
+    # Full rows are cached and `fields` is picked from them, so every
+    # fieldset shares one entry; without a cache it goes into the SELECT.
+    def get_by_id(self, table, row_id, dictionary=True, fields=None):
+        return run_plan(self.get_by_id_plan(table, row_id, dictionary, fields))
+
+    # get_by_id as a plan (app/models/plan.py); a hit runs no query
+    def get_by_id_plan(self, table, row_id, dictionary=True, fields=None):
+        store = self.store
+        if store.max_entries <= 0:
+            return (yield from repository.get_by_id_plan(table, row_id, dictionary=dictionary, fields=fields))
+
+        key = (table, row_id, dictionary)
+        found, row = store.get(key)
+        if not found:
+            generation = store.generation(key)
+            row = yield from repository.get_by_id_plan(table, row_id, dictionary=dictionary)
+            if row is None:
+                return None
+            # Not kept if a write invalidated the row while it was read
+            store.set(key, row, generation)
+        if fields is not None:
+            return project_row(table, row, fields)
+        # Callers may edit dict rows before returning them
+        return dict(row) if dictionary else row
+
+    # Call after committing a write. row_id=None drops the whole table;
+    # cascade=True also drops the tables an ON DELETE CASCADE reaches.
+    def invalidate(self, table, row_id=None, cascade=False):
+        message = {"table": table, "id": row_id}
+        if cascade:
+            message["cascade"] = cascade_of(table)
+        broadcast.publish(INVALIDATE_TOPIC, message)
+
+    def invalidate_many(self, table, row_ids):
+        for row_id in row_ids:
+            self.invalidate(table, row_id)
+
+    def stats(self):
+        return self.store.stats()
+
+
+entity_cache = EntityCache()
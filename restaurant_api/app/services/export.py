@@ -0,0 +1,84 @@
+import csv
+import io
+from datetime import date, timedelta
+from decimal import Decimal
+
+from flask import Response, current_app, stream_with_context
+
+from app.models.db import db
+from app.models.schema import TABLES
+
+# Streaming table export for nightly jobs.
+# Rows are read through an unbuffered server-side cursor (SSCursor on MySQL) and
+# written to the client in chunks of EXPORT_CHUNK_ROWS, so a worker never
+# holds more than one chunk in memory and the first bytes leave immediately.
+
+EXPORT_FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
+
+
+# Convert MySQL column values that csv cannot handle directly
+def _export_value(value):
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, timedelta):
+        return str(value)
+    return value
+
+
+# app.json encodes Decimal/date/TIME values itself (see app/services/json_provider.py)
+def _ndjson_chunk(dumps, columns, rows):
+    return "\n".join(dumps(dict(zip(columns, row))) for row in rows) + "\n"
+
+
+def _csv_chunk(writer, buffer, rows):
+    for row in rows:
+        writer.writerow([_export_value(value) for value in row])
+    data = buffer.getvalue()
+    buffer.seek(0)
+    buffer.truncate(0)
+    return data
+
+
+# Build a streaming response with every row of `table` in primary key order.
+# `fmt` must be one of EXPORT_FORMATS (validated by the caller).
+def stream_export(table, fmt):
+    t = TABLES[table]
+    chunk_rows = current_app.config['EXPORT_CHUNK_ROWS']
+    dumps = current_app.json.dumps
+
+    def generate():
+        cursor = db.cursor(unbuffered=True)
+        try:
+            cursor.execute(f"SELECT * FROM {t.name} ORDER BY {t.pk}")
+            columns = [column[0] for column in cursor.description]
+
+            if fmt == 'csv':
+                buffer = io.StringIO()
+                writer = csv.writer(buffer)
+                writer.writerow(columns)
+                yield _csv_chunk(writer, buffer, [])
+
+            while True:
+                rows = cursor.fetchmany(chunk_rows)
+                if not rows:
+                    break
+                if fmt == 'csv':
+                    yield _csv_chunk(writer, buffer, rows)
+                else:
+                    yield _ndjson_chunk(dumps, columns, rows)
+        finally:
+            # An unbuffered cursor must be drained/closed before the
+            # connection can run another statement.
+            cursor.close()
+
+    filename = f"{t.name.lower()}.{fmt}"
+    return Response(
+        stream_with_context(generate()),
+        mimetype=EXPORT_FORMATS[fmt],
+        headers={'Content-Disposition': f'attachment; filename={filename}'},
+    )
@@ -0,0 +1,167 @@
+from datetime import date, datetime, timedelta
+from decimal import Decimal, InvalidOperation
+from flask import request
+
+# Whitelisted filters and sort orders for the list routes.
+# Query strings are turned into (column, operator, value) conditions that
+# app.models.repository.list_page adds to its WHERE clause as placeholders,
+# so only the columns and operators below ever reach the SQL text:
+#   ?column=value          equality
+#   ?column=a,b,c          IN list (ids and enum columns)
+#   ?column_from=&_to=     inclusive range (amounts, dates, timestamps);
+#                          a bare date matches the whole day on timestamps
+#   ?sort=column|-column   order by that column, then the primary key
+#                          (next_cursor then becomes an opaque string)
+
+# Column kinds. A tuple is an enum: only those values are accepted.
+ID = 'id'
+TEXT = 'text'
+AMOUNT = 'amount'
+DATE = 'date'
+TIMESTAMP = 'timestamp'
+
+RANGE_KINDS = (AMOUNT, DATE, TIMESTAMP)
+
+# Shown when a value does not parse
+HINTS = {
+    ID: "Must be an integer",
+    AMOUNT: "Must be a number",
+    DATE: "Must be YYYY-MM-DD",
+    TIMESTAMP: "Must be YYYY-MM-DD or YYYY-MM-DDTHH:MM:SS",
+}
+
+MAX_IN_VALUES = 100
+
+FILTERS = {
+    'Orders': {
+        'reservation_id': ID,
+        'order_status': ('Pending', 'In Progress', 'Completed', 'Cancelled'),
+        'total_amount': AMOUNT,
+        'created_at': TIMESTAMP,
+    },
+    'Reservations': {
+        'customer_id': ID,
+        'table_id': ID,
+        'reservation_date': DATE,
+        'status': ('Pending', 'Confirmed', 'Completed', 'Cancelled'),
+    },
+    'Payments': {
+        'order_id': ID,
+        'payment_method': ('Cash', 'Credit Card', 'Mobile Payment'),
+        'amount_paid': AMOUNT,
+        'payment_date': TIMESTAMP,
+    },
+    'Order_Items': {
+        'order_id': ID,
+        'dish_id': ID,
+        'created_at': TIMESTAMP,
+    },
+    'Menu': {
+        'dish_name': TEXT,
+        'category': ('Appetizer', 'Main Course', 'Dessert', 'Beverage'),
+        'price': AMOUNT,
+    },
+    'Staff': {
+        'name': TEXT,
+        'role': ('Waiter', 'Chef', 'Manager', 'Host'),
+        'shift': ('Morning', 'Afternoon', 'Evening'),
+    },
+}
+
+# Columns a list may be sorted by (all NOT NULL or filled by a default)
+SORTS = {
+    'Orders': ('created_at', 'total_amount'),
+    'Reservations': ('reservation_date', 'person_count'),
+    'Payments': ('payment_date', 'amount_paid'),
+    'Order_Items': ('created_at', 'quantity'),
+    'Menu': ('dish_name', 'price'),
+    'Staff': ('name',),
+}
+
+
+# One query-string value as the column's type. Timestamps come back as
+# (value, is_date) so a bare date can stand for the whole day.
+def _parse(kind, value):
+    if isinstance(kind, tuple):
+        if value not in kind:
+            raise ValueError(f"Allowed values: {', '.join(kind)}")
+        return value
+    if kind == ID:
+        return int(value)
+    if kind == AMOUNT:
+        try:
+            amount = Decimal(value)
+        except InvalidOperation:
+            amount = None
+        if amount is None or not amount.is_finite():
+            raise ValueError(value)
+        return amount
+    if kind == DATE:
+        return date.fromisoformat(value).isoformat()
+    if kind == TIMESTAMP:
+        if len(value) == 10:
+            return date.fromisoformat(value), True
+        return datetime.fromisoformat(value).strftime('%Y-%m-%d %H:%M:%S'), False
+    return value
+
+
+# Conditions for one timestamp bound, widening a bare date to its day
+def _timestamp_conditions(column, op, value):
+    value, is_date = value
+    if not is_date:
+        return [(column, op, value)]
+    start = value.strftime('%Y-%m-%d 00:00:00')
+    end = (value + timedelta(days=1)).strftime('%Y-%m-%d 00:00:00')
+    if op == '>=':
+        return [(column, '>=', start)]
+    if op == '<=':
+        return [(column, '<', end)]
+    return [(column, '>=', start), (column, '<', end)]
+
+
+# Read the whitelisted filters of `table` from the query string.
+# Returns (conditions, error); conditions is a list of (column, op, value)
+# with op one of =, IN, >=, <=, < (empty when no filter was given).
+def get_filter_args(table):
+    conditions = []
+    for column, kind in FILTERS.get(table, {}).items():
+        bounds = [(column, '=')]
+        if kind in RANGE_KINDS:
+            bounds += [(f"{column}_from", '>='), (f"{column}_to", '<=')]
+
+        for param, op in bounds:
+            value = request.args.get(param)
+            if value is None:
+                continue
+            values = [value]
+            if op == '=' and (kind == ID or isinstance(kind, tuple)):
+                values = [item.strip() for item in value.split(',') if item.strip()]
+                if not values or len(values) > MAX_IN_VALUES:
+                    return None, f"{param} takes 1 to {MAX_IN_VALUES} comma-separated values"
+            try:
+                values = [_parse(kind, item) for item in values]
+            except ValueError as e:
+                hint = str(e) if isinstance(kind, tuple) else HINTS[kind]
+                return None, f"Invalid {param}: {value}. {hint}"
+
+            if kind == TIMESTAMP:
+                conditions.extend(_timestamp_conditions(column, op, values[0]))
+            elif len(values) > 1:
+                conditions.append((column, 'IN', values))
+            else:
+                conditions.append((column, op, values[0]))
+    return conditions, None
+
+
+# Read ?sort=column or ?sort=-column (descending) for `table`.
+# Returns ((column, descending) or None, error).
+def get_sort_arg(table):
+    sort = request.args.get('sort')
+    if sort is None:
+        return None, None
+    descending = sort.startswith('-')
+    column = sort.lstrip('-')
+    allowed = SORTS.get(table, ())
+    if column not in allowed:
+        return None, f"Invalid sort: {sort}. Allowed values: {', '.join(allowed)} (prefix - for descending)"
+    return (column, descending), None
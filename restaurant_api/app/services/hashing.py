@@ -0,0 +1,97 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from flask import current_app
+from werkzeug.security import generate_password_hash, check_password_hash
+
+# Password hashing off the request threads.
+# Hashes are deliberately slow, so a burst of logins (every POS at shift
+# change) would otherwise keep every server thread busy hashing. Here at most
+# PASSWORD_HASH_WORKERS hashes run at once and at most PASSWORD_HASH_QUEUE
+# more wait; anything beyond that, or a hash not finished within
+# PASSWORD_HASH_TIMEOUT seconds, fails fast with HashPoolBusy (503) so the
+# rest of the API keeps its threads.
+
+
+class HashPoolBusy(Exception):
+    pass
+
+
+class HashPool:
+    def __init__(self, workers, queue, timeout):
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='password-hash')
+        self._slots = threading.BoundedSemaphore(workers + queue)
+        self._lock = threading.Lock()
+        self.workers = workers
+        self.queue = queue
+        self.timeout = timeout
+        self.in_flight = 0
+        self.completed = 0
+        self.rejected = 0
+        self.timeouts = 0
+
+    def run(self, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.rejected += 1
+            raise HashPoolBusy("Too many logins in progress, retry shortly")
+        with self._lock:
+            self.in_flight += 1
+        try:
+            future = self._executor.submit(fn, *args)
+        except Exception:
+            self._done(None)
+            raise
+        future.add_done_callback(self._done)
+
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeout:
+            with self._lock:
+                self.timeouts += 1
+            raise HashPoolBusy("Password check timed out, retry shortly")
+
+    def _done(self, future):
+        with self._lock:
+            self.in_flight -= 1
+            self.completed += 1
+        self._slots.release()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'workers': self.workers,
+                'queue': self.queue,
+                'in_flight': self.in_flight,
+                'completed': self.completed,
+                'rejected': self.rejected,
+                'timeouts': self.timeouts,
+            }
+
+
+class PasswordHasher:
+    def init_app(self, app):
+        app.config.setdefault('PASSWORD_HASH_WORKERS', os.cpu_count() or 1)
+        app.config.setdefault('PASSWORD_HASH_QUEUE', 32)
+        app.config.setdefault('PASSWORD_HASH_TIMEOUT', 5)
+        app.extensions['password_hasher'] = HashPool(
+            app.config['PASSWORD_HASH_WORKERS'],
+            app.config['PASSWORD_HASH_QUEUE'],
+            app.config['PASSWORD_HASH_TIMEOUT'],
+        )
+
+    @property
+    def pool(self):
+        return current_app.extensions['password_hasher']
+
+    def generate(self, password):
+        return self.pool.run(generate_password_hash, password)
+
+    def check(self, password_hash, password):
+        return self.pool.run(check_password_hash, password_hash, password)
+
+    def stats(self):
+        return self.pool.stats()
+
+
+password_hasher = PasswordHasher()
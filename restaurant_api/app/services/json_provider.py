@@ -0,0 +1,78 @@
+import dataclasses
+from datetime import date, time, timedelta
+from decimal import Decimal
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# App-wide JSON encoding (app.json), so routes can jsonify database rows as
+# they come back from the cursor:
+#   Decimal              -> string ("12.50"), no float rounding
+#   date / datetime/time -> ISO 8601 ("2024-05-01", "2024-05-01T19:30:00")
+#   timedelta (TIME)     -> "19:30:00"
+#   tuples / namedtuples -> arrays
+# JSON_BACKEND picks the encoder: "auto" (default) uses orjson when it is
+# installed and the standard library otherwise, "json" always uses the
+# standard library. Both produce the same values.
+
+JSON_BACKENDS = ('auto', 'orjson', 'json')
+
+
+# Values neither encoder handles on its own
+def json_default(value):
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, (date, time)):
+        return value.isoformat()
+    if isinstance(value, timedelta):
+        return str(value)
+    if isinstance(value, tuple):
+        return list(value)
+    if dataclasses.is_dataclass(value) and not isinstance(value, type):
+        return dataclasses.asdict(value)
+    if hasattr(value, '__html__'):
+        return str(value.__html__())
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+class JSONProvider(DefaultJSONProvider):
+    default = staticmethod(json_default)
+
+    def __init__(self, app):
+        super().__init__(app)
+        backend = app.config.get('JSON_BACKEND', 'auto')
+        if backend not in JSON_BACKENDS:
+            raise ValueError(f"Unknown JSON_BACKEND {backend!r}. Allowed values: {', '.join(JSON_BACKENDS)}")
+        if backend == 'orjson' and orjson is None:
+            raise ValueError("JSON_BACKEND is 'orjson' but orjson is not installed")
+        self.backend = 'orjson' if orjson is not None and backend != 'json' else 'json'
+
+    def _options(self, indent=False):
+        options = orjson.OPT_NON_STR_KEYS
+        if self.sort_keys:
+            options |= orjson.OPT_SORT_KEYS
+        if indent:
+            options |= orjson.OPT_INDENT_2
+        return options
+
+    def dumps(self, obj, **kwargs):
+        if self.backend == 'json' or kwargs:
+            return super().dumps(obj, **kwargs)
+        return orjson.dumps(obj, default=json_default, option=self._options()).decode()
+
+    def loads(self, s, **kwargs):
+        if self.backend == 'json' or kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    # Encodes straight to the response bytes (no intermediate str)
+    def response(self, *args, **kwargs):
+        if self.backend == 'json':
+            return super().response(*args, **kwargs)
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = (self.compact is None and self._app.debug) or self.compact is False
+        body = orjson.dumps(obj, default=json_default, option=self._options(indent))
+        return self._app.response_class(body + b"\n", mimetype=self.mimetype)
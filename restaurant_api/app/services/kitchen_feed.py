@@ -0,0 +1,236 @@
+import logging
+import threading
+from collections import deque
+from flask import Response, current_app, request
+
+from app.models.db import db
+from app.services.broadcast import broadcast
+
+# Live view of the pending orders for kitchen displays (Server-Sent Events).
+#
+# Each worker keeps one in-memory copy of the pending orders, grouped by
+# order with their items, loaded from the database once. The order and order
+# item routes publish the new state of every order they touch on the
+# broadcast channel after committing; each worker applies it to its copy and
+# wakes its open streams, which send only what changed. However many screens
+# are connected, the database sees one load per worker plus one small read
+# per write.
+#
+# Stream events (id is "<generation>.<seq>"):
+#   snapshot  {"orders": [order, ...]}   on connect and whenever a client must resync
+#   upsert    order                      an order became pending or changed
+#   remove    {"order_id": id}           an order left the pending set or was deleted
+# where order is {order_id, reservation_id, order_status, created_at,
+# items: [{order_item_id, dish_id, dish_name, quantity}]}.
+
+log = logging.getLogger(__name__)
+
+TOPIC = 'kitchen.orders'
+
+# Statuses shown on the kitchen displays
+KITCHEN_STATUSES = ('Pending',)
+
+
+# Orders matching `condition` with their items, as JSON-safe dicts keyed by order_id
+def load_orders(condition, params):
+    cursor = db.cursor(dictionary=True)
+    try:
+        cursor.execute(
+            f"""
+            SELECT o.order_id, o.reservation_id, o.order_status, o.created_at,
+                   oi.order_item_id, oi.dish_id, m.dish_name, oi.quantity
+            FROM Orders o
+            LEFT JOIN Order_Items oi ON oi.order_id = o.order_id
+            LEFT JOIN Menu m ON m.dish_id = oi.dish_id
+            WHERE {condition}
+            ORDER BY o.order_id, oi.order_item_id
+            """,
+            tuple(params),
+        )
+        rows = cursor.fetchall()
+    finally:
+        cursor.close()
+
+    orders = {}
+    for row in rows:
+        order = orders.get(row['order_id'])
+        if order is None:
+            order = orders[row['order_id']] = {
+                'order_id': row['order_id'],
+                'reservation_id': row['reservation_id'],
+                'order_status': row['order_status'],
+                'created_at': None if row['created_at'] is None else str(row['created_at']),
+                'items': [],
+            }
+        if row['order_item_id'] is not None:
+            order['items'].append({
+                'order_item_id': row['order_item_id'],
+                'dish_id': row['dish_id'],
+                'dish_name': row['dish_name'],
+                'quantity': row['quantity'],
+            })
+    return orders
+
+
+class Feed:
+    def __init__(self, backlog):
+        self._cond = threading.Condition()
+        self._load_lock = threading.Lock()
+        self._orders = None      # order_id -> order, None until loaded
+        self._buffer = None      # messages received while loading
+        self._events = deque(maxlen=backlog)
+        self.generation = 0      # bumped when the copy is thrown away
+        self.seq = 0
+        self.loads = 0
+
+    # Load the pending orders if needed; needs an app context
+    def ensure_loaded(self):
+        with self._load_lock:
+            with self._cond:
+                if self._orders is not None:
+                    return
+                generation = self.generation
+                self._buffer = []
+
+            placeholders = ", ".join(["%s"] * len(KITCHEN_STATUSES))
+            orders = load_orders(f"o.order_status IN ({placeholders})", KITCHEN_STATUSES)
+
+            with self._cond:
+                if self.generation != generation:
+                    return
+                # Replay what was published while we were reading
+                self._orders = orders
+                buffer, self._buffer = self._buffer, None
+                for message in buffer:
+                    self._apply(message)
+                self.loads += 1
+                self._cond.notify_all()
+
+    def publish(self, message):
+        with self._cond:
+            if message.get('reload'):
+                self._orders = None
+                self._buffer = None
+                self._events.clear()
+                self.generation += 1
+            elif self._buffer is not None:
+                self._buffer.append(message)
+                return
+            elif self._orders is not None:
+                self._apply(message)
+            else:
+                return
+            self._cond.notify_all()
+
+    def _apply(self, message):
+        order_id = message['order_id']
+        order = message.get('order')
+        if order is not None and order['order_status'] in KITCHEN_STATUSES:
+            if self._orders.get(order_id) != order:
+                self._orders[order_id] = order
+                self._push('upsert', order)
+        elif self._orders.pop(order_id, None) is not None:
+            self._push('remove', {'order_id': order_id})
+
+    def _push(self, event, data):
+        self.seq += 1
+        self._events.append((self.seq, event, data))
+
+    # What a stream that has seen (generation, seq) should send next, waiting
+    # up to `timeout` for a change. Returns (events, generation, seq):
+    #   None           - the copy is not loaded, call ensure_loaded()
+    #   []             - nothing changed before the timeout
+    #   [(seq, event, data), ...]
+    def changes(self, generation, seq, timeout):
+        with self._cond:
+            if self._orders is None:
+                return None, generation, seq
+            if generation == self.generation and seq == self.seq:
+                self._cond.wait(timeout)
+                if self._orders is None:
+                    return None, generation, seq
+
+            if generation != self.generation or seq > self.seq or (
+                    seq < self.seq and (not self._events or self._events[0][0] > seq + 1)):
+                # New copy, or the client fell further behind than the backlog
+                orders = [self._orders[order_id] for order_id in sorted(self._orders)]
+                return [(self.seq, 'snapshot', {'orders': orders})], self.generation, self.seq
+
+            events = [event for event in self._events if event[0] > seq]
+            return events, generation, self.seq
+
+
+class KitchenFeed:
+    def init_app(self, app):
+        app.config.setdefault('KITCHEN_FEED_HEARTBEAT', 15)
+        app.config.setdefault('KITCHEN_FEED_BACKLOG', 1000)
+        feed = Feed(app.config['KITCHEN_FEED_BACKLOG'])
+        app.extensions['kitchen_feed'] = feed
+        app.extensions['broadcast'].subscribe(TOPIC, feed.publish)
+
+    @property
+    def feed(self):
+        return current_app.extensions['kitchen_feed']
+
+    # Call after committing a write to these orders or their items. If they
+    # cannot be read back, every worker reloads its copy instead; the write
+    # has committed, so this never raises.
+    def orders_changed(self, order_ids):
+        order_ids = sorted({int(order_id) for order_id in order_ids if order_id is not None})
+        if not order_ids:
+            return
+        placeholders = ", ".join(["%s"] * len(order_ids))
+        try:
+            orders = load_orders(f"o.order_id IN ({placeholders})", order_ids)
+        except Exception:
+            log.exception("Could not read orders %s for the kitchen feed", order_ids)
+            self.reload()
+            return
+        for order_id in order_ids:
+            broadcast.publish(TOPIC, {'order_id': order_id, 'order': orders.get(order_id)})
+
+    # Call after a write that changes orders indirectly (cascading deletes,
+    # renamed dishes); every worker reloads its copy
+    def reload(self):
+        broadcast.publish(TOPIC, {'reload': True})
+
+    # text/event-stream response; the database connection is only used while
+    # (re)loading, never held by an idle stream
+    def stream(self):
+        app = current_app._get_current_object()
+        feed = self.feed
+        heartbeat = app.config['KITCHEN_FEED_HEARTBEAT']
+        dumps = app.json.dumps
+        feed.ensure_loaded()
+
+        # Resume from Last-Event-ID after a reconnect when the backlog allows
+        generation, seq = -1, 0
+        try:
+            last_generation, last_seq = request.headers.get('Last-Event-ID', '').split('.')
+            generation, seq = int(last_generation), int(last_seq)
+        except ValueError:
+            pass
+
+        def events():
+            nonlocal generation, seq
+            yield "retry: 3000\n\n"
+            while True:
+                changes, generation, seq = feed.changes(generation, seq, heartbeat)
+                if changes is None:
+                    with app.app_context():
+                        feed.ensure_loaded()
+                elif not changes:
+                    yield ": keep-alive\n\n"
+                else:
+                    yield "".join(
+                        f"id: {generation}.{event_seq}\nevent: {event}\ndata: {dumps(data)}\n\n"
+                        for event_seq, event, data in changes
+                    )
+
+        return Response(events(), mimetype='text/event-stream', headers={
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no',
+        })
+
+
+kitchen_feed = KitchenFeed()
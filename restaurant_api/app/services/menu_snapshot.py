@@ -0,0 +1,81 @@
+import hashlib
+import threading
+import time
+from flask import current_app
+
+from app.models import repository
+from app.services.broadcast import broadcast
+
+# Pre-serialized response for the plain GET /api/menu (no limit/after).
+# The menu only changes through add_dish / update_dish / delete_dish, so the
+# JSON bytes and their strong ETag are built once and reused until one of
+# those routes calls menu_snapshot.invalidate(). The ETag is a hash of the
+# bytes, so every worker hands out the same tag for the same menu.
+# Snapshots are also rebuilt after MENU_SNAPSHOT_TTL seconds, which bounds
+# how long workers the invalidation does not reach (BROADCAST_BACKEND
+# "local", writes made outside the API) serve an old menu.
+
+INVALIDATE_TOPIC = 'menu.invalidate'
+
+
+class Snapshot:
+    def __init__(self, ttl):
+        self._lock = threading.Lock()
+        self.ttl = ttl
+        self.version = 0
+        self.body = None
+        self.etag = None
+        self.expires_at = 0
+        self.builds = 0
+
+    def mark_stale(self):
+        with self._lock:
+            self.version += 1
+            self.body = None
+            self.etag = None
+
+    # Returns (body, etag), building them if a write made them stale or they expired
+    def get(self, build):
+        with self._lock:
+            if self.body is not None and self.expires_at > time.monotonic():
+                return self.body, self.etag
+            version = self.version
+
+        body = build()
+        etag = hashlib.sha256(body).hexdigest()[:32]
+
+        with self._lock:
+            # Only keep it if no write happened while we were reading
+            if self.version == version:
+                self.body, self.etag = body, etag
+                self.expires_at = time.monotonic() + self.ttl
+                self.builds += 1
+        return body, etag
+
+
+class MenuSnapshot:
+    def init_app(self, app):
+        app.config.setdefault('MENU_SNAPSHOT_TTL', 30)
+        snapshot = Snapshot(app.config['MENU_SNAPSHOT_TTL'])
+        app.extensions['menu_snapshot'] = snapshot
+        app.extensions['broadcast'].subscribe(INVALIDATE_TOPIC, lambda message: snapshot.mark_stale())
+
+    @property
+    def snapshot(self):
+        return current_app.extensions['menu_snapshot']
+
+    # Same payload get_menu returns for its first page
+    @staticmethod
+    def _build():
+        menu, next_cursor = repository.list_page('Menu', current_app.config['PAGE_SIZE_DEFAULT'], None, dictionary=False)
+        return current_app.json.response({'menu': menu, 'next_cursor': next_cursor}).get_data()
+
+    def get(self):
+        return self.snapshot.get(self._build)
+
+    # Call after committing a write to Menu
+    def invalidate(self):
+        broadcast.publish(INVALIDATE_TOPIC, {})
+
+
+menu_snapshot = MenuSnapshot()
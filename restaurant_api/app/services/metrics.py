@@ -0,0 +1,228 @@
+import glob
+import json
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left
+from flask import current_app, g, has_request_context, request
+
+from app.models.db import db
+
+# Per-endpoint request and database metrics, served by GET /metrics
+# (app/routes/metrics.py) in the Prometheus text format.
+#   http_requests_total{endpoint, method, status}      requests served
+#   http_request_duration_seconds{endpoint, method}    latency histogram (to the response headers)
+#   http_request_db_queries{endpoint}                  statements per request
+#   db_query_duration_seconds{endpoint}                time in cursor.execute per statement
+# Endpoints are Flask endpoint names ("orders.get_orders"); requests that
+# match no route count as "<unmatched>", so clients cannot grow the label set.
+#
+# Each worker counts in memory. With METRICS_DIR set, every worker also
+# writes its totals to METRICS_DIR/<pid>.json every METRICS_FLUSH_INTERVAL
+# seconds and /metrics adds up all the files, so whichever gunicorn worker
+# answers the scrape reports the whole server. Empty METRICS_DIR before
+# starting the server; files of workers that exited stay in the sums, so
+# counters never go backwards.
+
+log = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+# name: (type, help, label names, buckets)
+METRICS = {
+    'http_requests_total': (
+        'counter', 'Requests served.', ('endpoint', 'method', 'status'), None),
+    'http_request_duration_seconds': (
+        'histogram', 'Time from the request to the response headers.', ('endpoint', 'method'), LATENCY_BUCKETS),
+    'http_request_db_queries': (
+        'histogram', 'Database statements run by one request.', ('endpoint',), QUERY_COUNT_BUCKETS),
+    'db_query_duration_seconds': (
+        'histogram', 'Time spent in cursor.execute per statement.', ('endpoint',), QUERY_BUCKETS),
+}
+
+UNMATCHED = '<unmatched>'
+
+
+class Registry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.flusher_pid = None
+        # (name, label values) -> count, or [per-bucket counts..., +Inf count, sum]
+        self._values = {}
+
+    def inc(self, name, labels, amount=1):
+        key = (name, labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def observe(self, name, labels, value):
+        buckets = METRICS[name][3]
+        key = (name, labels)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [0] * (len(buckets) + 2)
+            entry[bisect_left(buckets, value)] += 1
+            entry[-1] += value
+
+    # [[name, [label values], value], ...], the form written to METRICS_DIR
+    def snapshot(self):
+        with self._lock:
+            return [
+                [name, list(labels), list(value) if isinstance(value, list) else value]
+                for (name, labels), value in self._values.items()
+            ]
+
+
+# Sum snapshots (one per worker) into {(name, labels): value}
+def merge(snapshots):
+    totals = {}
+    for snapshot in snapshots:
+        for name, labels, value in snapshot:
+            if name not in METRICS:
+                continue
+            key = (name, tuple(labels))
+            if isinstance(value, list):
+                current = totals.get(key)
+                totals[key] = value if current is None else [a + b for a, b in zip(current, value)]
+            else:
+                totals[key] = totals.get(key, 0) + value
+    return totals
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+# Prometheus text exposition format (version 0.0.4)
+def render(totals):
+    lines = []
+    for name, (kind, help_text, label_names, buckets) in METRICS.items():
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        for (metric, labels), value in sorted(totals.items()):
+            if metric != name:
+                continue
+            if kind == 'counter':
+                lines.append(f"{name}{_labels(label_names, labels)} {_number(value)}")
+                continue
+            cumulative = 0
+            for bound, count in zip(buckets + ('+Inf',), value[:-1]):
+                cumulative += count
+                lines.append(f"{name}_bucket{_labels(label_names, labels, [('le', bound)])} {cumulative}")
+            lines.append(f"{name}_sum{_labels(label_names, labels)} {_number(value[-1])}")
+            lines.append(f"{name}_count{_labels(label_names, labels)} {cumulative}")
+    return "\n".join(lines) + "\n"
+
+
+def _endpoint():
+    return request.endpoint or UNMATCHED
+
+
+class Metrics:
+    def init_app(self, app):
+        app.config.setdefault('METRICS_ENABLED', True)
+        app.config.setdefault('METRICS_DIR', None)
+        app.config.setdefault('METRICS_FLUSH_INTERVAL', 1.0)
+        app.config.setdefault('METRICS_TOKEN', None)
+
+        app.extensions['metrics'] = Registry()
+        if not app.config['METRICS_ENABLED']:
+            return
+
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        db.add_statement_hook(app, self._on_statement)
+
+    def _before_request(self):
+        g.metrics_start = time.perf_counter()
+        g.metrics_queries = 0
+
+    def _after_request(self, response):
+        start = g.pop('metrics_start', None)
+        if start is None:
+            return response
+        endpoint = _endpoint()
+        registry = current_app.extensions['metrics']
+        registry.inc('http_requests_total', (endpoint, request.method, str(response.status_code)))
+        registry.observe('http_request_duration_seconds', (endpoint, request.method), time.perf_counter() - start)
+        registry.observe('http_request_db_queries', (endpoint,), g.pop('metrics_queries', 0))
+        self._start_flusher(current_app._get_current_object())
+        return response
+
+    # db statement hook; statements outside a request (CLI, startup) are not counted
+    def _on_statement(self, sql, params, seconds, rowcount):
+        if not has_request_context():
+            return
+        g.metrics_queries = g.get('metrics_queries', 0) + 1
+        current_app.extensions['metrics'].observe('db_query_duration_seconds', (_endpoint(),), seconds)
+
+    # -------------------- MULTIPROCESS --------------------
+
+    def _path(self, app):
+        return os.path.join(app.config['METRICS_DIR'], f"{os.getpid()}.json")
+
+    def flush(self, app):
+        if not app.config['METRICS_DIR']:
+            return
+        path = self._path(app)
+        tmp = f"{path}.tmp"
+        with open(tmp, 'w') as f:
+            json.dump(app.extensions['metrics'].snapshot(), f)
+        os.replace(tmp, path)
+
+    # One flush thread per worker process, started by its first request
+    # (gunicorn forks after create_app, and threads do not survive a fork)
+    def _start_flusher(self, app):
+        registry = app.extensions['metrics']
+        pid = os.getpid()
+        if not app.config['METRICS_DIR'] or registry.flusher_pid == pid:
+            return
+        registry.flusher_pid = pid
+        interval = float(app.config['METRICS_FLUSH_INTERVAL'])
+
+        def run():
+            while True:
+                time.sleep(interval)
+                try:
+                    self.flush(app)
+                except OSError as e:
+                    log.warning("Could not write metrics to %s: %s", app.config['METRICS_DIR'], e)
+
+        threading.Thread(target=run, name='metrics-flush', daemon=True).start()
+
+    # Totals of every worker (METRICS_DIR) or of this process
+    def collect(self):
+        app = current_app._get_current_object()
+        if not app.config['METRICS_DIR']:
+            return merge([app.extensions['metrics'].snapshot()])
+        self.flush(app)
+        snapshots = []
+        for path in glob.glob(os.path.join(app.config['METRICS_DIR'], '*.json')):
+            try:
+                with open(path) as f:
+                    snapshots.append(json.load(f))
+            except (OSError, ValueError):
+                # Removed or half-written by a worker that is exiting
+                continue
+        return merge(snapshots)
+
+    def render(self):
+        return render(self.collect())
+
+
+metrics = Metrics()
@@ -0,0 +1,104 @@
+import base64
+import json
+from flask import current_app, request
+
+from app.models.schema import TABLES
+
+# Query-string handling for keyset (cursor) pagination and sparse fieldsets.
+# The page itself is read by app.models.repository.list_page, which always
+# runs "WHERE pk > after ORDER BY pk LIMIT n", so each call is an index range
+# scan on the primary key and costs the same no matter how far the client has
+# paged. Filtered and sorted lists (app/services/filtering.py) keep the same
+# shape: "WHERE <filters> AND (sort, pk) after the cursor ORDER BY sort, pk".
+
+
+# Read ?limit= from the query string.
+# Returns (limit, error); limit is clamped to PAGE_SIZE_MAX.
+def get_limit_arg():
+    default_size = current_app.config['PAGE_SIZE_DEFAULT']
+    max_size = current_app.config['PAGE_SIZE_MAX']
+
+    limit = request.args.get('limit', default_size)
+    try:
+        limit = int(limit)
+    except (TypeError, ValueError):
+        return None, "limit must be a positive integer"
+    if limit < 1:
+        return None, "limit must be a positive integer"
+    return min(limit, max_size), None
+
+
+# Read ?limit= and ?after= from the query string.
+# Returns (limit, after, error); limit is clamped to PAGE_SIZE_MAX.
+# With a `sort` (see filtering.get_sort_arg) after is the opaque cursor
+# [sort value, primary key] instead of a primary key.
+def get_page_args(sort=None):
+    limit, error = get_limit_arg()
+    if error:
+        return None, None, error
+
+    after = request.args.get('after')
+    if after is not None and sort is not None:
+        after = decode_cursor(after, 2)
+        if after is None:
+            return None, None, "after must be a next_cursor returned with the same sort"
+    elif after is not None:
+        try:
+            after = int(after)
+        except ValueError:
+            return None, None, "after must be an integer cursor"
+
+    return limit, after, None
+
+
+# Read ?fields=a,b,c (sparse fieldsets) for rows of `table`.
+# Returns (fields, error); fields is None when the parameter is absent, else
+# the validated column names with the primary key first (it is always
+# returned, since it is the row's identity and the pagination cursor).
+def get_fields_arg(table):
+    fields = request.args.get('fields')
+    if fields is None:
+        return None, None
+
+    t = TABLES[table]
+    requested = [field.strip() for field in fields.split(',') if field.strip()]
+    unknown = [field for field in requested if field not in t.columns]
+    if unknown or not requested:
+        return None, f"Invalid fields: {', '.join(unknown) or 'none given'}. Allowed values: {', '.join(t.columns)}"
+
+    fields = [t.pk]
+    for field in requested:
+        if field not in fields:
+            fields.append(field)
+    return fields, None
+
+
+# Pick `fields` out of a full row: a dict, or a tuple in table column order
+# (or in the order of `columns`, when given)
+def project_row(table, row, fields, columns=None):
+    if row is None or fields is None:
+        return row
+    if isinstance(row, dict):
+        return {field: row[field] for field in fields}
+    columns = columns or TABLES[table].columns
+    return tuple(row[columns.index(field)] for field in fields)
+
+
+# Opaque cursors for pages ordered by more than the primary key
+# (e.g. total_spent DESC, customer_id DESC): the last row's sort values,
+# JSON-encoded and base64url'd.
+def encode_cursor(values):
+    raw = json.dumps(list(values), default=str, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+# Returns the list of values, or None if the cursor was not produced by encode_cursor
+def decode_cursor(cursor, size):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        values = json.loads(raw)
+    except (ValueError, TypeError):
+        return None
+    if not isinstance(values, list) or len(values) != size:
+        return None
+    return values
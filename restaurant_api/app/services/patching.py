@@ -0,0 +1,117 @@
+from datetime import date
+from decimal import Decimal, InvalidOperation
+from flask import request
+
+from app.services.filtering import AMOUNT, DATE, ID, TEXT
+
+# Request handling for the update routes (PUT and PATCH /api/<resource>/<id>).
+# The body is a JSON object with any of the table's writable columns below.
+# Every value is checked against its column before anything is written, and
+# app.models.repository.update_by_id then sends one UPDATE that sets only
+# the columns the client gave.
+
+# Positive integer (capacities, quantities, party sizes). The other kinds,
+# including enum tuples, are the ones app.services.filtering uses.
+COUNT = 'count'
+
+HINTS = {
+    ID: "Must be a positive integer",
+    COUNT: "Must be a positive integer",
+    TEXT: "Must be a non-empty string",
+    AMOUNT: "Must be a non-negative number or numeric string",
+    DATE: "Must be YYYY-MM-DD",
+}
+
+PATCHES = {
+    'Tables': {
+        'capacity': COUNT,
+        'location': TEXT,
+    },
+    'Customers': {
+        'name': TEXT,
+        'contact_details': TEXT,
+    },
+    'Reservations': {
+        'customer_id': ID,
+        'table_id': ID,
+        'reservation_date': DATE,
+        'person_count': COUNT,
+        'status': ('Pending', 'Confirmed', 'Completed', 'Cancelled'),
+    },
+    'Menu': {
+        'dish_name': TEXT,
+        'category': ('Appetizer', 'Main Course', 'Dessert', 'Beverage'),
+        'price': AMOUNT,
+    },
+    'Orders': {
+        'reservation_id': ID,
+        'total_amount': AMOUNT,
+        'order_status': ('Pending', 'In Progress', 'Completed', 'Cancelled'),
+    },
+    'Order_Items': {
+        'order_id': ID,
+        'dish_id': ID,
+        'quantity': COUNT,
+    },
+    'Staff': {
+        'name': TEXT,
+        'role': ('Waiter', 'Chef', 'Manager', 'Host'),
+        'shift': ('Morning', 'Afternoon', 'Evening'),
+    },
+    'Payments': {
+        'amount_paid': AMOUNT,
+        'payment_method': ('Cash', 'Credit Card', 'Mobile Payment'),
+    },
+}
+
+
+# A JSON number or numeric string ("30.00", as the GET routes return
+# amounts) as a Decimal, or None when it is not a non-negative amount
+def _amount(value):
+    if isinstance(value, bool) or not isinstance(value, (int, float, str)):
+        return None
+    try:
+        amount = Decimal(str(value))
+    except InvalidOperation:
+        return None
+    if not amount.is_finite() or amount < 0:
+        return None
+    return amount
+
+
+# True when a JSON value fits the column kind
+def _valid(kind, value):
+    if isinstance(kind, tuple):
+        return value in kind
+    if kind in (ID, COUNT):
+        return isinstance(value, int) and not isinstance(value, bool) and value > 0
+    if kind == AMOUNT:
+        return _amount(value) is not None
+    if kind == DATE:
+        try:
+            date.fromisoformat(value)
+        except (TypeError, ValueError):
+            return False
+        return True
+    return isinstance(value, str) and value.strip() != ''
+
+
+# Read the update body for `table`.
+# Returns (values, error); values maps each given column to its new value,
+# error is a message for a 422 response.
+def get_patch_args(table):
+    schema = PATCHES[table]
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict) or not data:
+        return None, "Request body must be a non-empty JSON object"
+
+    unknown = [field for field in data if field not in schema]
+    if unknown:
+        return None, f"Unknown fields: {', '.join(unknown)}. Allowed fields: {', '.join(schema)}"
+
+    for field, value in data.items():
+        kind = schema[field]
+        if not _valid(kind, value):
+            hint = f"Allowed values: {', '.join(kind)}" if isinstance(kind, tuple) else HINTS[kind]
+            return None, f"Invalid {field}: {value}. {hint}"
+    return {field: _amount(value) if schema[field] == AMOUNT else value for field, value in data.items()}, None
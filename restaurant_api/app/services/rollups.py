@@ -0,0 +1,404 @@
+import re
+import click
+from decimal import Decimal
+from flask.cli import AppGroup, with_appcontext
+
+from app.models.db import db
+
+# Rollup tables kept in step with the rows they summarise.
+#
+# Customer_Spending holds one row per customer: total_spent, order_count and
+# last_order_at over that customer's orders (Orders -> Reservations). The
+# order routes update it in the same transaction as the order itself, so the
+# analytics endpoint reads a table the size of the customer list instead of
+# joining the whole order history.
+#
+# Dish_Daily_Sales holds one row per (sales_date, dish_id): quantity, revenue
+# and order_lines (number of Order_Items rows) of the items created that day.
+# Revenue is quantity x Order_Items.unit_price, the menu price stored on the
+# item when it is ordered, so adds, removals and rebuilds agree however the
+# menu changes later.
+#
+# Both cover the live tables only. When app/services/archive.py moves old
+# orders out, their share moves to Customer_Spending_Archive and
+# Dish_Daily_Sales_Archive, and spending_table() / dish_sales_table() add it
+# back for ?include_archived=1.
+#
+# `flask rollups rebuild` recomputes all four from scratch (after imports,
+# restores or manual SQL).
+
+
+# A value written into the SQL as-is instead of as a parameter
+class Raw(str):
+    pass
+
+
+# INSERT ... ON DUPLICATE KEY UPDATE (MySQL) / ON CONFLICT DO UPDATE (SQLite).
+# `updates` maps column -> SQL expression, where NEW(column) is the value the
+# insert would have written.
+def _upsert(cursor, table, key, values, updates):
+    columns = list(values)
+    placeholders = [value if isinstance(value, Raw) else "%s" for value in values.values()]
+    params = [value for value in values.values() if not isinstance(value, Raw)]
+
+    query = f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join(placeholders)})"
+    if db.dialect == 'sqlite':
+        query += f" ON CONFLICT ({key}) DO UPDATE SET "
+        new = "excluded.{}"
+    else:
+        query += " ON DUPLICATE KEY UPDATE "
+        new = "VALUES({})"
+    assignments = ", ".join(f"{column} = {expression}" for column, expression in updates.items())
+    query += re.sub(r"NEW\((\w+)\)", lambda m: new.format(m.group(1)), assignments)
+    cursor.execute(query, tuple(params))
+
+
+def _amount(value):
+    return Decimal(str(value or 0))
+
+
+# -------------------- CUSTOMER SPENDING --------------------
+
+def customer_of_reservation(reservation_id):
+    cursor = db.cursor()
+    try:
+        cursor.execute("SELECT customer_id FROM Reservations WHERE reservation_id = %s", (reservation_id,))
+        row = cursor.fetchone()
+        return row[0] if row else None
+    finally:
+        cursor.close()
+
+
+# Add `amount` and `count` orders to a customer's totals. A new order
+# (count > 0) also moves last_order_at forward to now.
+def add_customer_spending(customer_id, amount, count):
+    cursor = db.cursor()
+    try:
+        if count > 0:
+            _upsert(cursor, 'Customer_Spending', 'customer_id', {
+                'customer_id': customer_id,
+                'total_spent': _amount(amount),
+                'order_count': count,
+                'last_order_at': Raw('CURRENT_TIMESTAMP'),
+            }, {
+                'total_spent': "total_spent + NEW(total_spent)",
+                'order_count': "order_count + NEW(order_count)",
+                'last_order_at': "NEW(last_order_at)",
+            })
+        else:
+            cursor.execute(
+                "UPDATE Customer_Spending SET total_spent = total_spent + %s, order_count = order_count + %s "
+                "WHERE customer_id = %s",
+                (_amount(amount), count, customer_id),
+            )
+    finally:
+        cursor.close()
+
+
+# Recompute the rows of the given customers from Orders. Used where a delta
+# is not enough: deletes (last_order_at may move back) and orders that
+# changed hands.
+def refresh_customer_spending(customer_ids):
+    customer_ids = [customer_id for customer_id in set(customer_ids) if customer_id is not None]
+    if not customer_ids:
+        return
+    placeholders = ", ".join(["%s"] * len(customer_ids))
+    cursor = db.cursor()
+    try:
+        cursor.execute(f"DELETE FROM Customer_Spending WHERE customer_id IN ({placeholders})", tuple(customer_ids))
+        cursor.execute(
+            f"""
+            INSERT INTO Customer_Spending (customer_id, total_spent, order_count, last_order_at)
+            SELECT r.customer_id, SUM(o.total_amount), COUNT(*), MAX(o.created_at)
+            FROM Reservations r
+            JOIN Orders o ON r.reservation_id = o.reservation_id
+            WHERE r.customer_id IN ({placeholders})
+            GROUP BY r.customer_id
+            """,
+            tuple(customer_ids),
+        )
+    finally:
+        cursor.close()
+
+
+# Hooks for the order routes; call before db.commit()
+
+def order_added(reservation_id, total_amount):
+    customer_id = customer_of_reservation(reservation_id)
+    if customer_id is not None:
+        add_customer_spending(customer_id, total_amount, 1)
+
+
+# rows: dicts with reservation_id and total_amount (bulk insert)
+def orders_added(rows):
+    totals = {}
+    for row in rows:
+        amount, count = totals.get(row['reservation_id'], (Decimal(0), 0))
+        totals[row['reservation_id']] = (amount + _amount(row['total_amount']), count + 1)
+
+    per_customer = {}
+    for reservation_id, (amount, count) in totals.items():
+        customer_id = customer_of_reservation(reservation_id)
+        if customer_id is not None:
+            old_amount, old_count = per_customer.get(customer_id, (Decimal(0), 0))
+            per_customer[customer_id] = (old_amount + amount, old_count + count)
+
+    for customer_id, (amount, count) in per_customer.items():
+        add_customer_spending(customer_id, amount, count)
+
+
+def order_updated(old, new_reservation_id, new_total_amount):
+    if str(new_reservation_id) == str(old['reservation_id']):
+        delta = _amount(new_total_amount) - _amount(old['total_amount'])
+        if delta:
+            customer_id = customer_of_reservation(old['reservation_id'])
+            if customer_id is not None:
+                add_customer_spending(customer_id, delta, 0)
+        return
+    refresh_customer_spending([
+        customer_of_reservation(old['reservation_id']),
+        customer_of_reservation(new_reservation_id),
+    ])
+
+
+def rebuild_customer_spending():
+    cursor = db.cursor()
+    try:
+        cursor.execute("DELETE FROM Customer_Spending")
+        cursor.execute(
+            """
+            INSERT INTO Customer_Spending (customer_id, total_spent, order_count, last_order_at)
+            SELECT r.customer_id, SUM(o.total_amount), COUNT(*), MAX(o.created_at)
+            FROM Reservations r
+            JOIN Orders o ON r.reservation_id = o.reservation_id
+            GROUP BY r.customer_id
+            """
+        )
+        cursor.execute("SELECT COUNT(*) FROM Customer_Spending")
+        return cursor.fetchone()[0]
+    finally:
+        cursor.close()
+
+
+# -------------------- DISH DAILY SALES --------------------
+
+# Items counted by Dish_Daily_Sales, for the incremental path and the rebuild alike
+DISH_SALES_SELECT = """
+    SELECT DATE(oi.created_at), oi.dish_id, SUM(oi.quantity), SUM(oi.quantity * oi.unit_price), COUNT(*)
+    FROM Order_Items oi
+    JOIN Orders o ON o.order_id = oi.order_id
+    JOIN Reservations r ON r.reservation_id = o.reservation_id
+"""
+
+
+# (sales_date, dish_id, quantity, revenue, order_lines) of the items matching
+# `condition`, grouped by day and dish
+def _dish_sales(condition, params):
+    cursor = db.cursor()
+    try:
+        cursor.execute(
+            f"{DISH_SALES_SELECT} WHERE {condition} GROUP BY DATE(oi.created_at), oi.dish_id",
+            tuple(params),
+        )
+        return list(cursor.fetchall())
+    finally:
+        cursor.close()
+
+
+def sales_of_items(item_ids):
+    if not item_ids:
+        return []
+    return _dish_sales(f"oi.order_item_id IN ({', '.join(['%s'] * len(item_ids))})", item_ids)
+
+
+# Sales that an ON DELETE CASCADE is about to remove; read them before the delete
+def sales_of_order(order_id):
+    return _dish_sales("oi.order_id = %s", [order_id])
+
+
+def sales_of_reservation(reservation_id):
+    return _dish_sales("o.reservation_id = %s", [reservation_id])
+
+
+def sales_of_customer(customer_id):
+    return _dish_sales("r.customer_id = %s", [customer_id])
+
+
+# Add (sign=1) or subtract (sign=-1) rows from the _dish_sales functions
+def add_dish_sales(sales, sign=1, table='Dish_Daily_Sales'):
+    cursor = db.cursor()
+    try:
+        for sales_date, dish_id, quantity, revenue, order_lines in sales:
+            _upsert(cursor, table, 'sales_date, dish_id', {
+                'sales_date': sales_date,
+                'dish_id': dish_id,
+                'quantity': sign * quantity,
+                'revenue': sign * _amount(revenue),
+                'order_lines': sign * order_lines,
+            }, {
+                'quantity': "quantity + NEW(quantity)",
+                'revenue': "revenue + NEW(revenue)",
+                'order_lines': "order_lines + NEW(order_lines)",
+            })
+            if sign < 0:
+                cursor.execute(
+                    f"DELETE FROM {table} WHERE sales_date = %s AND dish_id = %s AND order_lines <= 0",
+                    (sales_date, dish_id),
+                )
+    finally:
+        cursor.close()
+
+
+# Store the current menu price on items that have none yet (new items, and
+# items whose dish was changed; the update route clears their unit_price)
+def price_items(item_ids):
+    cursor = db.cursor()
+    try:
+        cursor.execute(
+            f"UPDATE Order_Items SET unit_price = (SELECT price FROM Menu m WHERE m.dish_id = Order_Items.dish_id) "
+            f"WHERE order_item_id IN ({', '.join(['%s'] * len(item_ids))}) AND unit_price IS NULL",
+            tuple(item_ids),
+        )
+    finally:
+        cursor.close()
+
+
+# Hook for the order item routes; call after inserting/updating, before db.commit()
+def order_items_added(item_ids):
+    if not item_ids:
+        return
+    price_items(item_ids)
+    add_dish_sales(sales_of_items(item_ids))
+
+
+def rebuild_dish_daily_sales():
+    cursor = db.cursor()
+    try:
+        cursor.execute("DELETE FROM Dish_Daily_Sales")
+        cursor.execute(
+            "INSERT INTO Dish_Daily_Sales (sales_date, dish_id, quantity, revenue, order_lines) "
+            f"{DISH_SALES_SELECT} GROUP BY DATE(oi.created_at), oi.dish_id"
+        )
+        cursor.execute("SELECT COUNT(*) FROM Dish_Daily_Sales")
+        return cursor.fetchone()[0]
+    finally:
+        cursor.close()
+
+
+# -------------------- ARCHIVE --------------------
+
+# FROM targets for the analytics routes: the live rollup, or the live and
+# archived rows summed per key
+def spending_table(include_archived=False):
+    if not include_archived:
+        return "Customer_Spending"
+    return """(
+        SELECT customer_id, SUM(total_spent) AS total_spent, SUM(order_count) AS order_count,
+               MAX(last_order_at) AS last_order_at
+        FROM (
+            SELECT customer_id, total_spent, order_count, last_order_at FROM Customer_Spending
+            UNION ALL
+            SELECT customer_id, total_spent, order_count, last_order_at FROM Customer_Spending_Archive
+        ) s
+        GROUP BY customer_id
+    )"""
+
+
+def dish_sales_table(include_archived=False):
+    if not include_archived:
+        return "Dish_Daily_Sales"
+    return """(
+        SELECT sales_date, dish_id, quantity, revenue, order_lines FROM Dish_Daily_Sales
+        UNION ALL
+        SELECT sales_date, dish_id, quantity, revenue, order_lines FROM Dish_Daily_Sales_Archive
+    )"""
+
+
+# Hook for app/services/archive.py; call after copying the orders to the
+# archive and before deleting them. Moves their sales and spending to the
+# archive rollups and returns the customers whose live spending must be
+# refreshed (refresh_customer_spending) once the orders are gone.
+def orders_archived(order_ids):
+    placeholders = ", ".join(["%s"] * len(order_ids))
+    sales = _dish_sales(f"oi.order_id IN ({placeholders})", order_ids)
+    add_dish_sales(sales, -1)
+    add_dish_sales(sales, 1, table='Dish_Daily_Sales_Archive')
+
+    cursor = db.cursor()
+    try:
+        cursor.execute(
+            f"""
+            SELECT r.customer_id, SUM(o.total_amount), COUNT(*), MAX(o.created_at)
+            FROM Orders o
+            JOIN Reservations r ON r.reservation_id = o.reservation_id
+            WHERE o.order_id IN ({placeholders})
+            GROUP BY r.customer_id
+            """,
+            tuple(order_ids),
+        )
+        spending = list(cursor.fetchall())
+        for customer_id, amount, count, last_order_at in spending:
+            _upsert(cursor, 'Customer_Spending_Archive', 'customer_id', {
+                'customer_id': customer_id,
+                'total_spent': _amount(amount),
+                'order_count': count,
+                'last_order_at': last_order_at,
+            }, {
+                'total_spent': "total_spent + NEW(total_spent)",
+                'order_count': "order_count + NEW(order_count)",
+                'last_order_at': "CASE WHEN last_order_at IS NULL OR NEW(last_order_at) > last_order_at "
+                                 "THEN NEW(last_order_at) ELSE last_order_at END",
+            })
+    finally:
+        cursor.close()
+    return [row[0] for row in spending]
+
+
+def rebuild_archive_rollups():
+    cursor = db.cursor()
+    try:
+        cursor.execute("DELETE FROM Customer_Spending_Archive")
+        cursor.execute(
+            """
+            INSERT INTO Customer_Spending_Archive (customer_id, total_spent, order_count, last_order_at)
+            SELECT o.customer_id, SUM(o.total_amount), COUNT(*), MAX(o.created_at)
+            FROM Orders_Archive o
+            JOIN Customers c ON c.customer_id = o.customer_id
+            GROUP BY o.customer_id
+            """
+        )
+        cursor.execute("DELETE FROM Dish_Daily_Sales_Archive")
+        cursor.execute(
+            """
+            INSERT INTO Dish_Daily_Sales_Archive (sales_date, dish_id, quantity, revenue, order_lines)
+            SELECT DATE(oi.created_at), oi.dish_id, SUM(oi.quantity), SUM(oi.quantity * oi.unit_price), COUNT(*)
+            FROM Order_Items_Archive oi
+            -- Only dishes still on the menu; the rollup rows of a deleted dish go with it
+            JOIN Menu m ON m.dish_id = oi.dish_id
+            GROUP BY DATE(oi.created_at), oi.dish_id
+            """
+        )
+        cursor.execute("SELECT COUNT(*) FROM Customer_Spending_Archive")
+        customers = cursor.fetchone()[0]
+        cursor.execute("SELECT COUNT(*) FROM Dish_Daily_Sales_Archive")
+        return customers, cursor.fetchone()[0]
+    finally:
+        cursor.close()
+
+
+# -------------------- CLI --------------------
+
+rollups_cli = AppGroup('rollups', help='Maintain the analytics rollup tables.')
+
+
+@rollups_cli.command('rebuild', help='Recompute every rollup table from the base tables.')
+@with_appcontext
+def rebuild_command():
+    customers = rebuild_customer_spending()
+    dish_days = rebuild_dish_daily_sales()
+    archived_customers, archived_dish_days = rebuild_archive_rollups()
+    db.commit()
+    click.echo(f"Customer_Spending: {customers} customers")
+    click.echo(f"Dish_Daily_Sales: {dish_days} dish-days")
+    click.echo(f"Customer_Spending_Archive: {archived_customers} customers")
+    click.echo(f"Dish_Daily_Sales_Archive: {archived_dish_days} dish-days")
@@ -0,0 +1,186 @@
+import glob
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import click
+from datetime import datetime
+from flask import current_app, has_request_context, request
+from flask.cli import AppGroup, with_appcontext
+
+from app.models.db import db
+from app.migrations.hot_queries import explain_statement
+
+# Slow-query log. A db statement hook (app/models/db.py) logs every statement
+# slower than SLOW_QUERY_THRESHOLD seconds as a warning on this module's
+# logger, with the route (Flask endpoint, or CLI command) that ran it, the
+# normalized SQL, a fingerprint of the parameters (never their values),
+# the rows and the duration.
+#
+# The first slow occurrence of each normalized statement also gets an
+# EXPLAIN, run on its own connection off the request thread, saved as
+# SLOW_QUERY_DIR/<statement fingerprint>.json (instance/slow_queries by
+# default; the first worker to write it wins). "flask --app run slow-queries
+# list" and "slow-queries show <fingerprint>" read them back.
+
+log = logging.getLogger(__name__)
+
+# Statements EXPLAIN accepts on both engines without running them
+EXPLAINABLE = ('SELECT', 'WITH', 'UPDATE', 'DELETE')
+
+_STRING = re.compile(r"'(?:[^'\\]|\\.|'')*'")
+_NUMBER = re.compile(r"(?<![\w.])\d+(?:\.\d+)?\b")
+_PLACEHOLDER = re.compile(r"%s|\?")
+_SPACE = re.compile(r"\s+")
+_VALUE_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)")
+_REPEATED_LISTS = re.compile(r"\(\.\.\.\)(?:\s*,\s*\(\.\.\.\))+")
+
+
+# SQL with literals and placeholders as ?, value lists as (...) and
+# whitespace collapsed, so one statement shape gets one fingerprint
+# whatever its values, IN-list length or batch size
+def normalize(sql):
+    sql = _STRING.sub('?', sql)
+    sql = _NUMBER.sub('?', sql)
+    sql = _PLACEHOLDER.sub('?', sql)
+    sql = _SPACE.sub(' ', sql).strip().rstrip(';').rstrip()
+    sql = _VALUE_LIST.sub('(...)', sql)
+    return _REPEATED_LISTS.sub('(...)', sql)
+
+
+def fingerprint(text):
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()[:16]
+
+
+def params_fingerprint(params):
+    if not params:
+        return '-'
+    return f"{len(params)}:{hashlib.sha1(repr(tuple(params)).encode('utf-8')).hexdigest()[:12]}"
+
+
+# Flask endpoint, CLI command path, or "-"
+def _route():
+    if has_request_context():
+        return request.endpoint or request.path
+    ctx = click.get_current_context(silent=True)
+    return ctx.command_path if ctx is not None else '-'
+
+
+class SlowQueryLog:
+    def init_app(self, app):
+        app.config.setdefault('SLOW_QUERY_LOG', True)
+        app.config.setdefault('SLOW_QUERY_THRESHOLD', 0.5)
+        app.config.setdefault('SLOW_QUERY_DIR', os.path.join(app.instance_path, 'slow_queries'))
+
+        # Statement fingerprints this process has sent to EXPLAIN
+        app.extensions['slow_queries'] = set()
+        app.extensions['slow_queries_lock'] = threading.Lock()
+        if app.config['SLOW_QUERY_LOG']:
+            db.add_statement_hook(app, self._on_statement)
+
+    # db statement hook
+    def _on_statement(self, sql, params, seconds, rowcount):
+        app = current_app._get_current_object()
+        if seconds < app.config['SLOW_QUERY_THRESHOLD'] or sql.lstrip()[:7].upper() == 'EXPLAIN':
+            return
+
+        statement = normalize(sql)
+        record = {
+            "fingerprint": fingerprint(statement),
+            "statement": statement,
+            "route": _route(),
+            "seconds": round(seconds, 6),
+            "rows": rowcount if rowcount >= 0 else None,
+            "params": params_fingerprint(params),
+        }
+        log.warning(
+            "Slow query %.3fs rows=%s route=%s fingerprint=%s params=%s: %s",
+            seconds, record["rows"], record["route"], record["fingerprint"], record["params"], statement,
+        )
+
+        if statement.split(' ', 1)[0].upper() not in EXPLAINABLE:
+            return
+        with app.extensions['slow_queries_lock']:
+            seen = app.extensions['slow_queries']
+            if record["fingerprint"] in seen:
+                return
+            seen.add(record["fingerprint"])
+        args = (app, sql, tuple(params) if params else (), record)
+        threading.Thread(target=self._capture, args=args, name='slow-query-explain', daemon=True).start()
+
+    # Runs on its own thread and app context, so the EXPLAIN neither waits
+    # behind nor joins the transaction of the request that was slow
+    def _capture(self, app, sql, params, record):
+        directory = app.config['SLOW_QUERY_DIR']
+        path = os.path.join(directory, f"{record['fingerprint']}.json")
+        if os.path.exists(path):
+            return
+        with app.app_context():
+            try:
+                plan, scans = explain_statement(sql, params)
+                error = None
+            except Exception as e:
+                plan, scans, error = [], [], str(e)
+            dialect = db.dialect
+
+        entry = dict(
+            record,
+            first_seen=datetime.now().isoformat(timespec='seconds'),
+            engine=dialect,
+            explain=plan,
+            full_scans=scans,
+            explain_error=error,
+        )
+        try:
+            os.makedirs(directory, exist_ok=True)
+            with open(path, 'x') as f:
+                json.dump(entry, f, indent=2)
+        except FileExistsError:
+            pass
+        except OSError as e:
+            log.warning("Could not save the EXPLAIN of %s to %s: %s", record['fingerprint'], directory, e)
+
+    # Saved entries, slowest first
+    def entries(self):
+        entries = []
+        for path in glob.glob(os.path.join(current_app.config['SLOW_QUERY_DIR'], '*.json')):
+            try:
+                with open(path) as f:
+                    entries.append(json.load(f))
+            except (OSError, ValueError):
+                # Still being written
+                continue
+        return sorted(entries, key=lambda entry: entry['seconds'], reverse=True)
+
+
+slow_queries = SlowQueryLog()
+
+
+# -------------------- CLI --------------------
+
+slow_queries_cli = AppGroup('slow-queries', help='Inspect the EXPLAIN plans saved by the slow-query log.')
+
+
+@slow_queries_cli.command('list', help='List the slow statements seen so far, slowest first.')
+@with_appcontext
+def list_command():
+    entries = slow_queries.entries()
+    for entry in entries:
+        scans = f"  full scan: {', '.join(entry['full_scans'])}" if entry['full_scans'] else ""
+        click.echo(f"{entry['fingerprint']}  {entry['seconds']:.3f}s  {entry['route']}{scans}")
+        click.echo(f"    {entry['statement']}")
+    if not entries:
+        click.echo("No slow queries recorded")
+
+
+@slow_queries_cli.command('show', help='Print one saved entry with its EXPLAIN plan.')
+@click.argument('statement_fingerprint')
+@with_appcontext
+def show_command(statement_fingerprint):
+    for entry in slow_queries.entries():
+        if entry['fingerprint'] == statement_fingerprint:
+            click.echo(json.dumps(entry, indent=2))
+            return
+    raise click.ClickException(f"No saved slow query {statement_fingerprint}")
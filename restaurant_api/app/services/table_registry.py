@@ -0,0 +1,132 @@
+import bisect
+import threading
+import time
+from collections import namedtuple
+from flask import current_app
+
+from app.models.db import db
+from app.services.broadcast import broadcast
+from app.services.pagination import project_row
+
+# In-process copy of the Tables table.
+# The dining room changes a few times a year but every reservation checks a
+# table's capacity, so each worker reads Tables once (at startup, or on first
+# use if the database was not reachable then) and answers from memory. The
+# table routes call table_registry.invalidate() after committing, and every
+# worker the broadcast channel reaches rereads it on next use. With
+# BROADCAST_BACKEND "local" that is only the worker that made the write, so
+# each worker also rereads Tables TABLE_REGISTRY_TTL seconds after loading it.
+
+INVALIDATE_TOPIC = 'tables.invalidate'
+
+# Same column order as SELECT * FROM Tables, so it serialises like the old rows
+TableRow = namedtuple('TableRow', ('table_id', 'capacity', 'location'))
+
+
+# One immutable load of Tables with its lookup indexes
+class TableSet:
+    def __init__(self, rows):
+        self.by_id = {row.table_id: row for row in rows}
+        self.ids = sorted(self.by_id)
+        self.by_capacity = sorted(rows, key=lambda row: (row.capacity, row.table_id))
+        self.capacities = [row.capacity for row in self.by_capacity]
+        self.by_location = {}
+        for table_id in self.ids:
+            row = self.by_id[table_id]
+            self.by_location.setdefault(row.location, []).append(row)
+
+
+class Registry:
+    def __init__(self, ttl):
+        self._lock = threading.Lock()
+        self.ttl = ttl
+        self.tables = None
+        self.expires_at = 0
+        self.version = 0
+        self.loads = 0
+
+    def invalidate(self, message=None):
+        with self._lock:
+            self.version += 1
+            self.tables = None
+
+    # Needs an app context when Tables has to be (re)read
+    def get(self):
+        with self._lock:
+            tables, version = self.tables, self.version
+            if tables is not None and self.expires_at > time.monotonic():
+                return tables
+
+        cursor = db.cursor()
+        try:
+            cursor.execute("SELECT table_id, capacity, location FROM Tables")
+            tables = TableSet([TableRow(*row) for row in cursor.fetchall()])
+        finally:
+            cursor.close()
+
+        with self._lock:
+            # Only keep it if no table was written while we were reading
+            if self.version == version:
+                self.tables = tables
+                self.expires_at = time.monotonic() + self.ttl
+                self.loads += 1
+        return tables
+
+
+class TableRegistry:
+    def init_app(self, app):
+        app.config.setdefault('TABLE_REGISTRY_TTL', 30)
+        registry = Registry(app.config['TABLE_REGISTRY_TTL'])
+        app.extensions['table_registry'] = registry
+        app.extensions['broadcast'].subscribe(INVALIDATE_TOPIC, registry.invalidate)
+
+        # Warm it up; a database that is not up yet is read on first use instead
+        with app.app_context():
+            try:
+                registry.get()
+            except Exception as e:
+                app.logger.warning("Table registry not loaded at startup: %s", e)
+
+    @property
+    def registry(self):
+        return current_app.extensions['table_registry']
+
+    def get(self, table_id, fields=None):
+        try:
+            table_id = int(table_id)
+        except (TypeError, ValueError):
+            return None
+        return project_row('Tables', self.registry.get().by_id.get(table_id), fields)
+
+    # Tables ordered by table_id, optionally filtered, keyset-paged like
+    # repository.list_page. Returns (rows, next_cursor).
+    def page(self, limit, after, location=None, min_capacity=None, fields=None):
+        tables = self.registry.get()
+        if location is not None:
+            rows = tables.by_location.get(location, [])
+        else:
+            rows = [tables.by_id[table_id] for table_id in tables.ids]
+        if min_capacity is not None:
+            rows = [row for row in rows if row.capacity >= min_capacity]
+        if after is not None:
+            rows = rows[bisect.bisect_right([row.table_id for row in rows], after):]
+
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = rows[-1].table_id
+        if fields is not None:
+            rows = [project_row('Tables', row, fields) for row in rows]
+        return rows, next_cursor
+
+    # Tables seating at least `party_size`, smallest first
+    def fitting(self, party_size):
+        tables = self.registry.get()
+        return tables.by_capacity[bisect.bisect_left(tables.capacities, party_size):]
+
+    # Call after committing a write to Tables
+    def invalidate(self):
+        broadcast.publish(INVALIDATE_TOPIC, {})
+
+
+table_registry = TableRegistry()
@@ -0,0 +1,451 @@
+import argparse
+import itertools
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+# End-to-end load generator for the API.
+#
+#   python -m benchmarks.loadtest run --workload mixed --rate 50 --duration 60 --output report.json
+#   python -m benchmarks.loadtest run --self-host --workload lunch_rush
+#   python -m benchmarks.loadtest run --self-host --asgi --workload dashboard
+#   python -m benchmarks.loadtest compare before.json after.json
+#
+# Requests arrive open-loop (Poisson arrivals at --rate per second) and are
+# sent by a pool of --concurrency threads, so a slow server shows up as higher
+# latency instead of silently lowering the offered load. The report holds
+# p50/p95/p99 latency, error rate and throughput per blueprint route.
+
+API_PREFIX = "/api"
+
+
+# -------------------- WORKLOAD STATE --------------------
+
+# IDs discovered (or created) before the run, shared by all worker threads
+class Fixtures:
+    def __init__(self, reservation_ids, dish_ids, order_ids, table_ids, customer_ids):
+        self.reservation_ids = reservation_ids
+        self.dish_ids = dish_ids
+        self.order_ids = order_ids
+        self.table_ids = table_ids
+        self.customer_ids = customer_ids
+        self.reservation_dates = []
+
+        # Order_Items has UNIQUE(order_id, dish_id); hand out each pair once
+        pairs = list(itertools.product(order_ids, dish_ids))
+        random.shuffle(pairs)
+        self._pairs = iter(pairs)
+        self._lock = threading.Lock()
+
+    def next_order_dish(self):
+        with self._lock:
+            return next(self._pairs, None)
+
+
+# Each operation returns (route, method, path, json_body) or None to skip.
+# `route` is the blueprint route template the latency is reported under.
+
+def op_add_order(fx):
+    body = {
+        "reservation_id": random.choice(fx.reservation_ids),
+        "total_amount": round(random.uniform(20, 200), 2),
+        "order_status": "Pending",
+    }
+    return "POST /api/orders/add", "POST", "/orders/add", body
+
+
+# A whole ticket: the order and its items in one call
+def op_add_ticket(fx):
+    dishes = random.sample(fx.dish_ids, min(len(fx.dish_ids), random.randint(1, 4)))
+    body = {
+        "reservation_id": random.choice(fx.reservation_ids),
+        "total_amount": round(random.uniform(20, 200), 2),
+        "items": [{"dish_id": dish_id, "quantity": random.randint(1, 3)} for dish_id in dishes],
+    }
+    return "POST /api/orders/add (items)", "POST", "/orders/add", body
+
+
+def op_add_order_item(fx):
+    pair = fx.next_order_dish()
+    if pair is None:
+        return op_add_order(fx)
+    order_id, dish_id = pair
+    body = {"order_id": order_id, "dish_id": dish_id, "quantity": random.randint(1, 4)}
+    return "POST /api/order_items/add", "POST", "/order_items/add", body
+
+
+def op_get_order(fx):
+    return "GET /api/orders/<id>", "GET", f"/orders/{random.choice(fx.order_ids)}", None
+
+
+def op_get_menu(fx):
+    return "GET /api/menu", "GET", "/menu", None
+
+
+def op_get_reservation(fx):
+    return "GET /api/reservations/<id>", "GET", f"/reservations/{random.choice(fx.reservation_ids)}", None
+
+
+def op_list_reservations(fx):
+    return "GET /api/reservations", "GET", "/reservations?limit=50", None
+
+
+def op_todays_reservations(fx):
+    path = f"/reservations?reservation_date={time.strftime('%Y-%m-%d')}&status=Pending,Confirmed&limit=50"
+    return "GET /api/reservations (today)", "GET", path, None
+
+
+def op_find_table(fx):
+    slot = random.randrange(17 * 60, 22 * 60, 15)
+    path = (f"/reservations/availability?date={time.strftime('%Y-%m-%d')}"
+            f"&time={slot // 60:02d}:{slot % 60:02d}&party_size={random.randint(1, 6)}")
+    return "GET /api/reservations/availability", "GET", path, None
+
+
+def op_get_table(fx):
+    return "GET /api/tables/<id>", "GET", f"/tables/{random.choice(fx.table_ids)}", None
+
+
+def op_get_customer(fx):
+    return "GET /api/customers/<id>", "GET", f"/customers/{random.choice(fx.customer_ids)}", None
+
+
+def op_customer_spending(fx):
+    return "GET /api/analytics/customer_spending", "GET", "/analytics/customer_spending", None
+
+
+def op_popular_dishes(fx):
+    return "GET /api/analytics/popular_dishes", "GET", "/analytics/popular_dishes", None
+
+
+def op_top_sellers_today(fx):
+    today = time.strftime("%Y-%m-%d")
+    path = f"/analytics/popular_dishes?from={today}&to={today}&by=quantity&k=10"
+    return "GET /api/analytics/popular_dishes (today)", "GET", path, None
+
+
+def op_pending_orders(fx):
+    return "GET /api/analytics/pending_orders_details", "GET", "/analytics/pending_orders_details", None
+
+
+def op_above_average(fx):
+    return "GET /api/analytics/above_average_spenders", "GET", "/analytics/above_average_spenders", None
+
+
+def op_top_decile(fx):
+    path = "/analytics/above_average_spenders?above_percentile=90&limit=50"
+    return "GET /api/analytics/above_average_spenders (p90)", "GET", path, None
+
+
+# Weighted operation mixes
+WORKLOADS = {
+    # Lunch rush: servers punching in tickets, kitchen checking orders
+    "lunch_rush": [
+        (op_add_order, 2),
+        (op_add_ticket, 2),
+        (op_add_order_item, 6),
+        (op_get_order, 2),
+        (op_get_menu, 1),
+    ],
+    # Host stand: looking up reservations, tables and guests
+    "host_stand": [
+        (op_get_reservation, 5),
+        (op_list_reservations, 2),
+        (op_todays_reservations, 2),
+        (op_find_table, 3),
+        (op_get_table, 2),
+        (op_get_customer, 2),
+    ],
+    # Manager dashboards refreshing analytics
+    "dashboard": [
+        (op_customer_spending, 1),
+        (op_popular_dishes, 1),
+        (op_top_sellers_today, 2),
+        (op_pending_orders, 2),
+        (op_above_average, 1),
+        (op_top_decile, 1),
+    ],
+}
+WORKLOADS["mixed"] = WORKLOADS["lunch_rush"] + WORKLOADS["host_stand"] + WORKLOADS["dashboard"]
+
+
+# -------------------- SETUP --------------------
+
+def login(base_url, username, password):
+    response = requests.post(f"{base_url}/auth/login", json={"username": username, "password": password})
+    response.raise_for_status()
+    return response.json()["access_token"]
+
+
+def collect_ids(session, base_url, path, key, pk, limit=500):
+    response = session.get(f"{base_url}{path}", params={"limit": limit})
+    response.raise_for_status()
+    rows = response.json()[key]
+    return [row[pk] if isinstance(row, dict) else row[0] for row in rows]
+
+
+# Create a small restaurant worth of rows through the API
+def seed(session, base_url, size):
+    categories = ['Appetizer', 'Main Course', 'Dessert', 'Beverage']
+    run_tag = f"{int(time.time())}{random.randint(0, 999)}"
+    for i in range(size):
+        session.post(f"{base_url}/tables/add", json={"capacity": random.randint(2, 8), "location": f"Zone {i % 4}"})
+        session.post(f"{base_url}/customers/add", json={"name": f"Guest {i}", "contact_details": f"guest{i}.{run_tag}@example.com"})
+        session.post(f"{base_url}/menu/add", json={
+            "dish_name": f"Dish {i}", "category": random.choice(categories), "price": round(random.uniform(5, 50), 2),
+        })
+
+    table_ids = collect_ids(session, base_url, "/tables", "tables", "table_id")
+    customer_ids = collect_ids(session, base_url, "/customers", "customers", "customer_id")
+    for i in range(size):
+        session.post(f"{base_url}/reservations/add", json={
+            "customer_id": random.choice(customer_ids),
+            "table_id": table_ids[i % len(table_ids)],
+            "reservation_date": time.strftime("%Y-%m-%d"),
+            "reservation_time": f"{12 + i % 10:02d}:{(i // 10) % 60:02d}:00",
+            "person_count": 2,
+        })
+
+    reservation_ids = collect_ids(session, base_url, "/reservations", "reservations", "reservation_id")
+    for _ in range(size):
+        session.post(f"{base_url}/orders/add", json={
+            "reservation_id": random.choice(reservation_ids),
+            "total_amount": round(random.uniform(20, 200), 2),
+            "order_status": random.choice(['Pending', 'In Progress', 'Completed']),
+        })
+
+
+def load_fixtures(session, base_url):
+    fixtures = Fixtures(
+        reservation_ids=collect_ids(session, base_url, "/reservations", "reservations", "reservation_id"),
+        dish_ids=collect_ids(session, base_url, "/menu", "menu", "dish_id"),
+        order_ids=collect_ids(session, base_url, "/orders", "orders", "order_id"),
+        table_ids=collect_ids(session, base_url, "/tables", "tables", "table_id"),
+        customer_ids=collect_ids(session, base_url, "/customers", "customers", "customer_id"),
+    )
+    missing = [name for name, ids in vars(fixtures).items() if isinstance(ids, list) and name.endswith('_ids') and not ids]
+    if missing:
+        raise SystemExit(f"No rows found for {', '.join(missing)}; run with --seed-size N to create some")
+    return fixtures
+
+
+# Run the app in-process on the embedded SQLite engine (no MySQL needed),
+# under werkzeug or, with --asgi, under uvicorn (asgi.py).
+# Returns (stop, base_url).
+def start_self_hosted(args):
+    import logging
+    from werkzeug.serving import make_server
+
+    # Per-request access logs would swamp the report
+    logging.getLogger('werkzeug').setLevel(logging.WARNING)
+
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    os.environ.setdefault('SECRET_KEY', 'loadtest-secret-key-change-me-0123456789')
+    from app import create_app
+
+    sqlite_path = args.sqlite_path or os.path.join(tempfile.mkdtemp(prefix="restaurant-bench-"), "bench.db")
+    config = {
+        'DB_ENGINE': 'sqlite',
+        'SQLITE_PATH': sqlite_path,
+        # Identities are dicts; newer flask_jwt_extended rejects non-string subjects by default
+        'JWT_VERIFY_SUB': False,
+    }
+    if args.asgi:
+        import uvicorn
+        from app.asgi import create_asgi_app
+
+        server = uvicorn.Server(uvicorn.Config(create_asgi_app(config), host="127.0.0.1", port=0, log_level="warning"))
+        threading.Thread(target=server.run, daemon=True).start()
+        while not server.started:
+            time.sleep(0.01)
+        port = server.servers[0].sockets[0].getsockname()[1]
+        stop = lambda: setattr(server, 'should_exit', True)
+    else:
+        server = make_server("127.0.0.1", 0, create_app(config), threaded=True)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        port = server.server_port
+        stop = server.shutdown
+
+    base_url = f"http://127.0.0.1:{port}{API_PREFIX}"
+    requests.post(f"{base_url}/auth/register", json={"username": args.username, "password": args.password, "role": "admin"})
+    return stop, base_url
+
+
+# -------------------- RUN --------------------
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, int(round(pct / 100 * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[index]
+
+
+def summarize(samples, elapsed):
+    latencies = sorted(sample[0] for sample in samples)
+    errors = sum(1 for sample in samples if not sample[1])
+    statuses = defaultdict(int)
+    for sample in samples:
+        statuses[str(sample[2])] += 1
+    return {
+        "requests": len(samples),
+        "errors": errors,
+        "error_rate": round(errors / len(samples), 4) if samples else 0.0,
+        "rps": round(len(samples) / elapsed, 2) if elapsed else 0.0,
+        "latency_ms": {
+            "p50": round(percentile(latencies, 50) * 1000, 3) if latencies else None,
+            "p95": round(percentile(latencies, 95) * 1000, 3) if latencies else None,
+            "p99": round(percentile(latencies, 99) * 1000, 3) if latencies else None,
+            "mean": round(sum(latencies) / len(latencies) * 1000, 3) if latencies else None,
+            "max": round(latencies[-1] * 1000, 3) if latencies else None,
+        },
+        "status_codes": dict(statuses),
+    }
+
+
+def run_workload(base_url, token, fixtures, workload, rate, duration, concurrency):
+    operations, weights = zip(*WORKLOADS[workload])
+    headers = {"Authorization": f"Bearer {token}", "Content-Type": "application/json"}
+    local = threading.local()
+    samples = defaultdict(list)
+    samples_lock = threading.Lock()
+
+    def session():
+        if not hasattr(local, "session"):
+            local.session = requests.Session()
+            local.session.headers.update(headers)
+        return local.session
+
+    # Latency counts from the scheduled arrival, not from when a pool thread
+    # got to the request, so time queued behind busy threads is included
+    def send(op, scheduled):
+        planned = op(fixtures)
+        if planned is None:
+            return
+        route, method, path, body = planned
+        try:
+            response = session().request(method, f"{base_url}{path}", json=body, timeout=30)
+            ok, status = response.status_code < 400, response.status_code
+        except requests.RequestException as e:
+            ok, status = False, type(e).__name__
+        latency = time.perf_counter() - scheduled
+        with samples_lock:
+            samples[route].append((latency, ok, status))
+
+    started = time.perf_counter()
+    next_arrival = started
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        while True:
+            next_arrival += random.expovariate(rate)
+            if next_arrival - started >= duration:
+                break
+            delay = next_arrival - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            executor.submit(send, random.choices(operations, weights)[0], next_arrival)
+        # Before the pool drains, so throughput is over the offered window
+        elapsed = time.perf_counter() - started
+
+    all_samples = [sample for route_samples in samples.values() for sample in route_samples]
+    return {
+        "workload": workload,
+        "offered_rate": rate,
+        "duration_s": round(elapsed, 3),
+        "concurrency": concurrency,
+        "overall": summarize(all_samples, elapsed),
+        "routes": {route: summarize(route_samples, elapsed) for route, route_samples in sorted(samples.items())},
+    }
+
+
+def cmd_run(args):
+    random.seed(args.seed)
+    stop = None
+    base_url = args.base_url.rstrip("/")
+    if args.self_host:
+        stop, base_url = start_self_hosted(args)
+        if not args.seed_size:
+            args.seed_size = 50
+
+    token = login(base_url, args.username, args.password)
+    setup = requests.Session()
+    setup.headers.update({"Authorization": f"Bearer {token}"})
+    if args.seed_size:
+        seed(setup, base_url, args.seed_size)
+    fixtures = load_fixtures(setup, base_url)
+
+    report = run_workload(base_url, token, fixtures, args.workload, args.rate, args.duration, args.concurrency)
+    report["target"] = f"self-hosted sqlite ({'asgi' if args.asgi else 'wsgi'})" if args.self_host else base_url
+    report["generated_at"] = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+
+    output = json.dumps(report, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+    if stop is not None:
+        stop()
+
+
+# Print per-route deltas between two reports (e.g. last release vs. this one)
+def cmd_compare(args):
+    with open(args.before) as f:
+        before = json.load(f)
+    with open(args.after) as f:
+        after = json.load(f)
+
+    diff = {}
+    for route in sorted(set(before["routes"]) | set(after["routes"])):
+        old, new = before["routes"].get(route), after["routes"].get(route)
+        if not old or not new:
+            diff[route] = {"only_in": "before" if old else "after"}
+            continue
+        entry = {}
+        for pct in ("p50", "p95", "p99"):
+            a, b = old["latency_ms"][pct], new["latency_ms"][pct]
+            entry[f"{pct}_ms"] = {"before": a, "after": b, "change_pct": round((b - a) / a * 100, 1) if a else None}
+        entry["error_rate"] = {"before": old["error_rate"], "after": new["error_rate"]}
+        entry["rps"] = {"before": old["rps"], "after": new["rps"]}
+        diff[route] = entry
+    print(json.dumps(diff, indent=2, sort_keys=True))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Restaurant API load test")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    run = sub.add_parser("run", help="drive a workload and print a JSON report")
+    run.add_argument("--base-url", default="http://127.0.0.1:5000/api")
+    run.add_argument("--self-host", action="store_true", help="start the app in-process on SQLite")
+    run.add_argument("--sqlite-path", help="database file for --self-host (default: a temp file)")
+    run.add_argument("--asgi", action="store_true", help="with --self-host, serve through asgi.py under uvicorn")
+    run.add_argument("--username", default="root")
+    run.add_argument("--password", default="act")
+    run.add_argument("--workload", choices=sorted(WORKLOADS), default="mixed")
+    run.add_argument("--rate", type=float, default=20.0, help="mean arrivals per second")
+    run.add_argument("--duration", type=float, default=30.0, help="seconds of load")
+    run.add_argument("--concurrency", type=int, default=16, help="max requests in flight")
+    run.add_argument("--seed-size", type=int, default=0, help="create N tables/customers/dishes/reservations/orders first")
+    run.add_argument("--seed", type=int, default=None, help="random seed for a repeatable request mix")
+    run.add_argument("--output", help="write the report here instead of stdout")
+    run.set_defaults(func=cmd_run)
+
+    compare = sub.add_parser("compare", help="diff two reports")
+    compare.add_argument("before")
+    compare.add_argument("after")
+    compare.set_defaults(func=cmd_compare)
+
+    args = parser.parse_args(argv)
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()